@@ -0,0 +1,98 @@
+from itertools import groupby
+
+from sqlalchemy import and_, func
+
+from models import db, Venue, Artist, Show
+from pagination import paginate, paginate_stream
+
+#----------------------------------------------------------------------------#
+# Queries for the listing pages.
+#----------------------------------------------------------------------------#
+
+def _areas(rows):
+    for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state)):
+        yield {
+            'city': city,
+            'state': state,
+            'venues': [{
+                'id': row.id,
+                'name': row.name,
+                'numUpComingShows': row.num_upcoming_shows} for row in venues]}
+
+
+def venue_areas(now, cursor=None, per_page=50, stream=False):
+    """
+    Builds one page of the /venues area listing from a single grouped query.
+    Returns (areas, page) where areas is a list of {"city", "state",
+    "venues": [...]} dicts ordered by state and city, each venue carrying
+    its number of upcoming shows, and page holds the keyset cursors.
+    With stream=True areas is a generator fed from a server-side cursor.
+    """
+    upcoming = func.count(Show.id).label('num_upcoming_shows')
+    query = (
+        db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, upcoming)
+        .outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > now))
+        .group_by(Venue.id, Venue.name, Venue.city, Venue.state)
+    )
+    columns = [Venue.state, Venue.city, Venue.name, Venue.id]
+    if stream:
+        page = paginate_stream(query, columns, cursor, per_page)
+        return _areas(page.items), page
+    page = paginate(query, columns, cursor, per_page)
+    return list(_areas(page.items)), page
+
+
+def artist_listing(cursor=None, per_page=50):
+    """One page of the /artists listing, ordered by name."""
+    query = db.session.query(Artist.id, Artist.name)
+    page = paginate(query, [Artist.name, Artist.id], cursor, per_page)
+    return [{"id": row.id, "name": row.name} for row in page.items], page
+
+
+def _show_item(row):
+    return {
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time,
+        'venue_timezone': row.venue_timezone}
+
+
+def show_listing(cursor=None, per_page=50, stream=False):
+    """
+    One page of the /shows listing, ordered by start time, with venue and
+    artist columns joined in. With stream=True the shows are a generator
+    fed from a server-side cursor.
+    """
+    query = (
+        db.session.query(
+            Show.start_time, Show.id,
+            Venue.id.label('venue_id'), Venue.name.label('venue_name'), Venue.timezone.label('venue_timezone'),
+            Artist.id.label('artist_id'), Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'))
+        .join(Venue, Venue.id == Show.venue_id)
+        .join(Artist, Artist.id == Show.artist_id)
+    )
+    columns = [Show.start_time, Show.id]
+    if stream:
+        page = paginate_stream(query, columns, cursor, per_page)
+        return (_show_item(row) for row in page.items), page
+    page = paginate(query, columns, cursor, per_page)
+    return [_show_item(row) for row in page.items], page
+
+
+def upcoming_show_counts(show_column, ids, now):
+    """
+    Counts upcoming shows for many venues or artists in one grouped query.
+    show_column is Show.venue_id or Show.artist_id; returns {id: count}.
+    """
+    if not ids:
+        return {}
+    rows = (
+        db.session.query(show_column, func.count(Show.id))
+        .filter(show_column.in_(ids), Show.start_time > now)
+        .group_by(show_column)
+    )
+    return dict(rows.all())
@@ -0,0 +1,189 @@
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from pagination import InvalidCursor, paginate
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# Read-only JSON API: /api/v1/venues, /api/v1/artists, /api/v1/shows
+#----------------------------------------------------------------------------#
+# fields=name,city limits both the response and the SELECT to those columns
+# (id is always included). ids=1,2,3 fetches a batch in one query instead of
+# one request per entity. Listings use the same keyset cursors as the pages.
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+
+class Resource:
+    def __init__(self, model, columns, genre_link=None, joins=()):
+        self.model = model
+        # field name -> column expression
+        self.columns = columns
+        # (association table, fk column) when the resource exposes genres
+        self.genre_link = genre_link
+        # (model, onclause, field prefix) joined only when one of its fields is requested
+        self.joins = joins
+
+    @property
+    def fields(self):
+        return list(self.columns) + (['genres'] if self.genre_link is not None else [])
+
+
+def _plain(model, *names):
+    return {name: getattr(model, name) for name in names}
+
+
+RESOURCES = {
+    'venues': Resource(
+        Venue,
+        _plain(Venue, 'id', 'name', 'city', 'state', 'address', 'phone', 'website', 'facebook_link',
+               'image_link', 'seeking_talent', 'seeking_description', 'timezone', 'updated_at'),
+        genre_link=(venue_genres, venue_genres.c.venue_id)),
+    'artists': Resource(
+        Artist,
+        _plain(Artist, 'id', 'name', 'city', 'state', 'phone', 'website', 'facebook_link',
+               'image_link', 'seeking_venue', 'seeking_description', 'updated_at'),
+        genre_link=(artist_genres, artist_genres.c.artist_id)),
+    'shows': Resource(
+        Show,
+        dict(_plain(Show, 'id', 'start_time', 'venue_id', 'artist_id', 'updated_at'),
+             venue_name=Venue.name, venue_image_link=Venue.image_link,
+             artist_name=Artist.name, artist_image_link=Artist.image_link),
+        joins=((Venue, Venue.id == Show.venue_id, 'venue_'),
+               (Artist, Artist.id == Show.artist_id, 'artist_'))),
+}
+
+
+class BadApiRequest(ValueError):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def json_response(payload, status=200):
+    """Serializes with orjson when it is installed, else the standard library."""
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, default=_json_default, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+
+def _requested_fields(resource):
+    raw = request.args.get('fields')
+    if not raw:
+        return resource.fields
+    fields = ['id'] + [f.strip() for f in raw.split(',') if f.strip() and f.strip() != 'id']
+    unknown = [f for f in fields if f not in resource.fields]
+    if unknown:
+        raise BadApiRequest(f'unknown fields: {", ".join(unknown)}; '
+                            f'available: {", ".join(resource.fields)}')
+    return list(dict.fromkeys(fields))
+
+
+def _requested_ids():
+    try:
+        ids = [int(id) for id in request.args['ids'].split(',') if id.strip()]
+    except ValueError:
+        raise BadApiRequest('ids must be a comma separated list of integers')
+    if len(ids) > current_app.config['API_MAX_BATCH_IDS']:
+        raise BadApiRequest(f'at most {current_app.config["API_MAX_BATCH_IDS"]} ids per request')
+    return list(dict.fromkeys(ids))
+
+
+def _query(resource, fields):
+    columns = [resource.columns[f].label(f) for f in fields if f in resource.columns]
+    query = db.session.query(*columns).select_from(resource.model)
+    for model, onclause, prefix in resource.joins:
+        if any(f.startswith(prefix) and not f.endswith('_id') for f in fields):
+            query = query.join(model, onclause)
+    return query
+
+
+def _attach_genres(resource, items):
+    """Adds a genres list to every item with one query for the whole batch."""
+    link, fk = resource.genre_link
+    by_id = {item['id']: item for item in items}
+    for item in items:
+        item['genres'] = []
+    if not by_id:
+        return
+    rows = (
+        db.session.query(fk, Genre.name)
+        .join(Genre, Genre.id == link.c.genre_id)
+        .filter(fk.in_(by_id))
+        .order_by(fk, Genre.name)
+    )
+    for id, name in rows:
+        by_id[id]['genres'].append(name)
+
+
+def _serialize(resource, fields, rows):
+    items = [row._asdict() for row in rows]
+    if 'genres' in fields:
+        _attach_genres(resource, items)
+    return items
+
+
+def _fetch(kind, id=None):
+    resource = RESOURCES[kind]
+    fields = _requested_fields(resource)
+    query = _query(resource, fields)
+    id_column = resource.columns['id']
+
+    if id is not None:
+        items = _serialize(resource, fields, query.filter(id_column == id).all())
+        if not items:
+            return {"error": f"{kind[:-1]} {id} not found"}, 404
+        return {"data": items[0]}, 200
+
+    if 'ids' in request.args:
+        ids = _requested_ids()
+        items = _serialize(resource, fields, query.filter(id_column.in_(ids)).all()) if ids else []
+        found = {item['id']: item for item in items}
+        return {"data": [found[id] for id in ids if id in found],
+                "missing": [id for id in ids if id not in found]}, 200
+
+    per_page = request.args.get('per_page', current_app.config['LISTING_PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['API_MAX_PAGE_SIZE']))
+    try:
+        page = paginate(query, [id_column], request.args.get('cursor'), per_page)
+    except InvalidCursor:
+        raise BadApiRequest('invalid cursor')
+    return {"data": _serialize(resource, fields, page.items),
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor}, 200
+
+
+def _handle(kind, id=None):
+    try:
+        payload, status = _fetch(kind, id)
+    except BadApiRequest as e:
+        return json_response({"error": str(e)}, 400)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error("API request for %s failed: %s", kind, e, exc_info=True)
+        return json_response({"error": "service unavailable"}, 503)
+    return json_response(payload, status)
+
+
+@api_v1.route('/<any(venues, artists, shows):kind>')
+def listing(kind):
+    return _handle(kind)
+
+
+@api_v1.route('/<any(venues, artists, shows):kind>/<int:id>')
+def detail(kind, id):
+    return _handle(kind, id)
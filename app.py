@@ -3,71 +3,112 @@
 #----------------------------------------------------------------------------#
 
 import json
-import dateutil.parser
-import babel
 import datetime
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, Blueprint, current_app, render_template, stream_template, request, session, Response, flash, redirect, url_for, jsonify
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 import logging
-from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
 from models import *
 from flask_migrate import Migrate
 import sys
 from sqlalchemy.exc import SQLAlchemyError
+from aggregates import venue_areas, artist_listing, show_listing
+from formatting import format_datetime
+from pagination import InvalidCursor
+from search import search_entities
+import typeahead
+from loaders import (load_venue_detail, load_artist_detail, load_venue_detail_async, load_artist_detail_async,
+                     load_venue_shows, load_artist_shows)
+from async_db import async_db
+from genres import get_or_create_genres
+from page_cache import page_cache
+from pool_stats import pool_stats
+from query_stats import query_stats
+from log_pipeline import log_pipeline
+from metrics import metrics
+from replicas import replica_router
+from importer import import_cli
+from export import export_bp
+from api import api_v1
+from schema import schema_cli
+from health import health_bp
+from assets import assets
+from conditional import (conditional, venue_validators, artist_validators,
+                         venues_listing_validators, artists_listing_validators, shows_listing_validators)
 
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-migrate = Migrate(app, db)
+main = Blueprint('main', __name__)
+moment = Moment()
+migrate = Migrate()
 
 #----------------------------------------------------------------------------#
 # Helpers
 #----------------------------------------------------------------------------#
-def get_or_create_genres(genre_names):
+def cacheable_request():
+    """Pages rendered with a pending flash message are user specific and bypass the page cache."""
+    return not session.get('_flashes')
+
+def streaming_requested():
+    """Streamed listings are opt-in per deployment (STREAM_LISTINGS) or per request (?stream=1)."""
+    stream = request.args.get('stream', type=int)
+    return bool(current_app.config['STREAM_LISTINGS'] if stream is None else stream)
+
+def _buffered(chunks, size):
+    """Joins the many small chunks Jinja yields into writes of about size bytes."""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def render_listing(template_name, stream, **context):
     """
-    Accepts an iterable of genre names (strings).
-    Returns a list of Genre objects (existing or newly created).
+    Renders a listing page. When stream is set the template is rendered
+    while the response is sent, so generator data is consumed row by row.
     """
-    genres_objs = []
-    for g in genre_names:
-        name = g.strip()
-        if not name:
-            continue
-        genre = Genre.query.filter_by(name=name).first()
-        if not genre:
-            genre = Genre(name=name)
-            db.session.add(genre)
-            db.session.flush()
-            # We don't commit here; commit will be performed by caller
-        genres_objs.append(genre)
-    return genres_objs
+    if not stream:
+        return render_template(template_name, **context)
+    chunks = stream_template(template_name, **context)
+    return Response(_buffered(chunks, current_app.config['STREAM_CHUNK_SIZE']), mimetype='text/html')
+def detail_loader(load, load_async):
+    """
+    The loader for a detail page: load_async, run to completion on this
+    thread, when ASYNC_DETAIL_PAGES is set, otherwise load.
+    """
+    if current_app.config['ASYNC_DETAIL_PAGES']:
+        return current_app.ensure_sync(load_async)
+    return load
+
+def render_show_slice(load, id, section, kind):
+    """Renders the show tiles after ?cursor= for one section of a detail page."""
+    try:
+        shows, cursor = load(id, section, datetime.utcnow(), request.args.get('cursor'),
+                             current_app.config['DETAIL_SHOWS_PER_SECTION'])
+    except InvalidCursor:
+        return "Invalid cursor", 400
+    more_url = url_for(request.endpoint, **dict(request.view_args, cursor=cursor)) if cursor else None
+    return render_template('layouts/show_tiles.html', shows=shows, kind=kind, more_url=more_url)
+
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
-
-app.jinja_env.filters['datetime'] = format_datetime
+main.add_app_template_filter(format_datetime, 'datetime')
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+@main.route('/')
 def index():
   return render_template('pages/home.html')
 
@@ -75,131 +116,88 @@ def index():
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@main.route('/venues')
+@conditional(venues_listing_validators)
 def venues():
   # TODO: replace with real venues data.
   #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
     today=datetime.today()
+    stream = streaming_requested()
     data = []
-    prev=[]
-    prevCity_State=''
+    page = None
     try:
-        venues = Venue.query.order_by(Venue.state, Venue.city).all()
-        for venue in venues:
-            upComingShows = Show.query.filter(Show.venue_id == venue.id, Show.start_time > today).all()
-            venue_data={
-              "id":venue.id,
-              "name":venue.name,
-              "numUpComingShows":len(upComingShows)}
-            if len(data) > 0:
-              prev=data[len(data) - 1]
-              prevCity_State =  prev['city']+ prev['state']
-              if prevCity_State == venue.city + venue.state:
-                prev['venues'].append(venue_data)
-                continue
-            data.append({
-              'city': venue.city,
-              'state': venue.state,
-              'venues': [venue_data]})
+        data, page = venue_areas(today, request.args.get('cursor'), current_app.config['LISTING_PAGE_SIZE'], stream)
+    except InvalidCursor:
+        data, page = venue_areas(today, None, current_app.config['LISTING_PAGE_SIZE'], stream)
     except SQLAlchemyError as e:
         db.session.rollback()
-        app.logger.error("Unexpected error: %s", e, exc_info=True)
+        current_app.logger.error("Unexpected error: %s", e, exc_info=True)
         flash("Oops! Something went wrong. Please try again.")
         return render_template("pages/home.html")
 
     finally:
-        return render_template("pages/venues.html", areas=data)
+        return render_listing("pages/venues.html", stream, areas=data, page=page)
 
-@app.route('/venues/search', methods=['POST'])
+@main.route('/venues/search', methods=['POST'])
 def search_venues():
   # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
     response = {"count": 0, "data": []}
     search_term = request.form.get("search_term", "").strip()
+    page = max(request.form.get("page", 1, type=int), 1)
     try:
-        
-        results = Venue.query.filter(Venue.name.ilike(f"%{search_term}%")).all()
-        for result in results:
-          num_upcoming = db.session.query(Show).filter(Show.venue_id == result.id, Show.start_time > datetime.utcnow()).count()
-          item = {
-            "id": result.id,
-            "name": result.name,
-            "num_upcoming_shows": num_upcoming
-            }
-          response["data"].append(item)
-        response["count"] = len(results)
+        response = search_entities(Venue, search_term, datetime.utcnow(), page=page,
+                                   per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'])
     except Exception as e:
-        app.logger.error("Venue search failed for term '%s': %s", search_term, e, exc_info=True)
+        current_app.logger.error("Venue search failed for term '%s': %s", search_term, e, exc_info=True)
         flash('An error occurred for the search term' +
               request.form.get('search_term', ''))
     finally:
         return render_template('pages/search_venues.html', results=response,search_term=request.form.get('search_term', ''))
 
-@app.route('/venues/<int:venue_id>')
+@main.route('/venues/<int:venue_id>')
+@conditional(venue_validators)
 def show_venue(venue_id):
     """Show venue details, with past and upcoming shows."""
+    now = datetime.utcnow()
+    cacheable = cacheable_request()
+    if cacheable:
+        html = page_cache.get('venue', venue_id)
+        if html is not None:
+            return html
     data = {}
     try:
-        venue = Venue.query.get(venue_id)
-        if not venue:
+        load = detail_loader(load_venue_detail, load_venue_detail_async)
+        data = load(venue_id, now, current_app.config['DETAIL_SHOWS_PER_SECTION'])
+        if data is None:
             flash("This venue does not exist.")
             return render_template("errors/404.html")
-
-        # genres: venue.genres is a list of Genre objects; use .name
-        genres = [g.name for g in venue.genres]
-
-        today = datetime.utcnow()
-        raw_upcoming_shows = db.session.query(Show).join(Artist).filter(Show.venue_id == venue_id, Show.start_time > today).all()
-        upcoming_shows = [{
-            "artist_id": show.artist_id,
-            "artist_name": show.artist.name,
-            "artist_image_link": show.artist.image_link,
-            "start_time": str(show.start_time)
-        } for show in raw_upcoming_shows]
-
-        raw_past_shows = db.session.query(Show).join(Artist).filter(Show.venue_id == venue_id, Show.start_time <= today).all()
-        past_shows = [{
-            "artist_id": show.artist_id,
-            "artist_name": show.artist.name,
-            "artist_image_link": show.artist.image_link,
-            "start_time": str(show.start_time)
-        } for show in raw_past_shows]
-
-        data = {
-            "id": venue.id,
-            "name": venue.name,
-            "city": venue.city,
-            "state": venue.state,
-            "address": venue.address,
-            "genres": genres,
-            "phone": venue.phone,
-            "website": venue.website,
-            "facebook_link": venue.facebook_link,
-            "seeking_talent": venue.seeking_talent,
-            "seeking_description": venue.seeking_description,
-            "image_link": venue.image_link,
-            "upcoming_shows_count": len(upcoming_shows),
-            "upcoming_shows": upcoming_shows,
-            "past_shows_count": len(past_shows),
-            "past_shows": past_shows,
-        }
     except SQLAlchemyError as e:
-        app.logger.error("Failed to fetch venue %s: %s", venue_id, e, exc_info=True)
+        current_app.logger.error("Failed to fetch venue %s: %s", venue_id, e, exc_info=True)
         flash("Oops! Something went wrong. Please try again.")
     finally:
         db.session.close()
 
-    return render_template("pages/show_venue.html", venue=data)
+    html = render_template("pages/show_venue.html", venue=data)
+    if cacheable and data:
+        page_cache.set('venue', venue_id, html, now, data["next_show_start"])
+    return html
+
+@main.route('/venues/<int:venue_id>/shows/<any(past, upcoming):section>')
+def venue_shows(venue_id, section):
+    """The next slice of a venue page section, as tiles for its "Load more" button."""
+    return render_show_slice(load_venue_shows, venue_id, section, 'artist')
+
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
     try:
         form = VenueForm(request.form)
@@ -223,7 +221,7 @@ def create_venue_submission():
         flash("Venue " + venue.name + " has been successfully listed!")
     except SQLAlchemyError as e:
         db.session.rollback()
-        app.logger.error("Failed to create venue: %s", e, exc_info=True)
+        current_app.logger.error("Failed to create venue: %s", e, exc_info=True)
         flash("An error occurred. Venue " + request.form.get("name", "") + " could not be listed.")
     finally:
         db.session.close()
@@ -239,7 +237,7 @@ def create_venue_submission():
   # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
   #return render_template('pages/home.html')
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@main.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
   try:
     venue = Venue.query.get(venue_id)
@@ -249,7 +247,7 @@ def delete_venue(venue_id):
     flash("Venue: " + venue.name + " was successfully deleted.")
   except SQLAlchemyError as e:
     db.session.rollback()
-    app.logger.error("Unexpected error: %s", e, exc_info=True)
+    current_app.logger.error("Unexpected error: %s", e, exc_info=True)
     flash("Venue: " + venue.name + " could not be deleted.")
   finally:
     db.session.close()
@@ -262,97 +260,67 @@ def delete_venue(venue_id):
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@main.route('/artists')
+@conditional(artists_listing_validators)
 def artists():
-  # TODO: replace with real data returned from querying the database
-  
-  return render_template('pages/artists.html', artists=Artist.query.all())
+  try:
+    data, page = artist_listing(request.args.get('cursor'), current_app.config['LISTING_PAGE_SIZE'])
+  except InvalidCursor:
+    data, page = artist_listing(None, current_app.config['LISTING_PAGE_SIZE'])
+  return render_template('pages/artists.html', artists=data, page=page)
 
-@app.route('/artists/search', methods=['POST'])
+@main.route('/artists/search', methods=['POST'])
 def search_artists():
   search_term = request.form.get('search_term','')
-  search_results = Artist.query.filter(Artist.name.ilike('%{}%'.format(search_term))).all()
-  search_response = {"count": len(search_results), "data": []}
-  for result in search_results:
-    num_upcoming = db.session.query(Show).filter(Show.artist_id == result.id, Show.start_time > datetime.utcnow()).count()
-    artist={
-      "id":result.id,
-      "name":result.name,
-      "num_upcoming_shows": num_upcoming,}
-    search_response["data"].append(artist)
+  page = max(request.form.get('page', 1, type=int), 1)
+  search_response = search_entities(Artist, search_term, datetime.utcnow(), page=page,
+                                    per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'])
   return render_template('pages/search_artists.html', results=search_response, search_term=request.form.get('search_term', ''))
   # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
  
 
-@app.route('/artists/<int:artist_id>')
+@main.route('/artists/<int:artist_id>')
+@conditional(artist_validators)
 def show_artist(artist_id):
+    now = datetime.utcnow()
+    cacheable = cacheable_request()
+    if cacheable:
+        html = page_cache.get('artist', artist_id)
+        if html is not None:
+            return html
     data = {}
     try:
-        requested_artist = Artist.query.get(artist_id)
-        if requested_artist is None:
+        load = detail_loader(load_artist_detail, load_artist_detail_async)
+        data = load(artist_id, now, current_app.config['DETAIL_SHOWS_PER_SECTION'])
+        if data is None:
             flash("This artist does not exist.")
             return not_found_error(404)
-
-        genres = [g.name for g in requested_artist.genres]
-
-        today = datetime.utcnow()
-        shows_q = Show.query.filter(Show.artist_id == artist_id)
-        past = shows_q.filter(Show.start_time < today).all()
-        upcoming = shows_q.filter(Show.start_time >= today).all()
-
-        past_shows = []
-        for show in past:
-            venue = Venue.query.get(show.venue_id)
-            past_shows.append({
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time)
-            })
-
-        upcoming_shows = []
-        for show in upcoming:
-            venue = Venue.query.get(show.venue_id)
-            upcoming_shows.append({
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time)
-            })
-
-        data = {
-            "id": requested_artist.id,
-            "name": requested_artist.name,
-            "genres": genres,
-            "city": requested_artist.city,
-            "state": requested_artist.state,
-            "phone": requested_artist.phone,
-            "seeking_venue": requested_artist.seeking_venue,
-            "facebook_link": requested_artist.facebook_link,
-            "image_link": requested_artist.image_link,
-            "past_shows": past_shows,
-            "upcoming_shows": upcoming_shows,
-            "past_shows_count": len(past_shows),
-            "upcoming_shows_count": len(upcoming_shows),
-        }
     except SQLAlchemyError as e:
-        app.logger.error("Failed to fetch artist %s: %s", artist_id, e, exc_info=True)
+        current_app.logger.error("Failed to fetch artist %s: %s", artist_id, e, exc_info=True)
         flash("Oops! Something went wrong. Please try again.")
     finally:
         db.session.close()
 
-    return render_template("pages/show_artist.html", artist=data)
+    html = render_template("pages/show_artist.html", artist=data)
+    if cacheable and data:
+        page_cache.set('artist', artist_id, html, now, data["next_show_start"])
+    return html
 
 
 
   # shows the artist page with the given artist_id
   # TODO: replace with real artist data from the artist table, using artist_id
   
+@main.route('/artists/<int:artist_id>/shows/<any(past, upcoming):section>')
+def artist_shows(artist_id, section):
+    """The next slice of an artist page section, as tiles for its "Load more" button."""
+    return render_show_slice(load_artist_shows, artist_id, section, 'venue')
+
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   try:
     requested_artist = Artist.query.get(artist_id)
@@ -371,16 +339,16 @@ def edit_artist(artist_id):
       image_link=requested_artist.image_link)
 
   except Exception as e:
-        app.logger.error("Error preparing edit artist form: %s", e, exc_info=True)
+        current_app.logger.error("Error preparing edit artist form: %s", e, exc_info=True)
         flash("Oops! Something went wrong. Please try again.")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
   finally:
     db.session.close()
   return render_template('forms/edit_artist.html', form=form, artist=requested_artist)
   # TODO: populate form with fields from artist with ID <artist_id>
   
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
   
   error=False
@@ -408,15 +376,15 @@ def edit_artist_submission(artist_id):
   except SQLAlchemyError as e:
     error = True
     db.session.rollback()
-    app.logger.error("Failed to update artist %s: %s", artist_id, e, exc_info=True)
+    current_app.logger.error("Failed to update artist %s: %s", artist_id, e, exc_info=True)
     flash("An error occurred. Artist " + request.form.get("name", "") + " could not be updated.")
   finally:
     db.session.close()
     if error:
       return render_template('forms/edit_artist.html', form=form, artist=artist)
-  return redirect(url_for('show_artist', artist_id=artist_id))
+  return redirect(url_for('main.show_artist', artist_id=artist_id))
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   form = VenueForm()
   try:
@@ -435,9 +403,9 @@ def edit_venue(venue_id):
     form.seeking_talent.data = venue.seeking_talent
     form.seeking_description.data = venue.seeking_description
   except Exception as e:
-    app.logger.error("Error preparing edit venue form: %s", e, exc_info=True)
+    current_app.logger.error("Error preparing edit venue form: %s", e, exc_info=True)
     flash("Oops! Something went wrong. Please try again.")
-    return redirect(url_for("index"))
+    return redirect(url_for("main.index"))
 
   finally:
     db.session.close()
@@ -448,7 +416,7 @@ def edit_venue(venue_id):
   # TODO: populate form with values from venue with ID <venue_id>
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
   try:
 
@@ -471,12 +439,12 @@ def edit_venue_submission(venue_id):
 
   except SQLAlchemyError as e:
     db.session.rollback()
-    app.logger.error("Unexpected error: %s", e, exc_info=True)
+    current_app.logger.error("Unexpected error: %s", e, exc_info=True)
     flash("Oops! An error occurred. Venue "+ request.form.get("name")+ " could not be updated.")
 
   finally:
     db.session.close()
-  return redirect(url_for('show_venue', venue_id=venue_id))
+  return redirect(url_for('main.show_venue', venue_id=venue_id))
 
   # TODO: take values from the form submitted, and update existing
   # venue record with ID <venue_id> using the new attributes
@@ -484,12 +452,12 @@ def edit_venue_submission(venue_id):
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   try:
     genresList = request.form.getlist("genres")
@@ -510,7 +478,7 @@ def create_artist_submission():
     flash("Artist: " + newArtist.name + " has been successfully listed!")
   except SQLAlchemyError as e:
     db.session.rollback()
-    app.logger.error("Failed to create artist: %s", e, exc_info=True)
+    current_app.logger.error("Failed to create artist: %s", e, exc_info=True)
         # Done: on unsuccessful db insert, flash an error instead.
     flash("An error occurred. Artist could not be listed.")
   finally:
@@ -528,42 +496,59 @@ def create_artist_submission():
   #return render_template('pages/home.html')
 
 
+#  Autocomplete
+#  ----------------------------------------------------------------
+
+@main.route('/api/autocomplete')
+def autocomplete():
+  """Prefix matches for the search boxes, served from the in-process index."""
+  kind = request.args.get('type', '')
+  if kind not in typeahead.indexes:
+    return jsonify({"error": "type must be one of: venue, artist"}), 400
+  limit = min(request.args.get('limit', current_app.config['AUTOCOMPLETE_LIMIT'], type=int),
+              current_app.config['AUTOCOMPLETE_LIMIT'])
+  try:
+    results = typeahead.lookup(kind, request.args.get('q', ''), limit)
+  except SQLAlchemyError as e:
+    current_app.logger.error("Failed to load %s autocomplete index: %s", kind, e, exc_info=True)
+    return jsonify({"error": "autocomplete unavailable"}), 503
+  return jsonify({"type": kind, "data": results})
+
+@main.route('/stats/pool')
+def pool_stats_snapshot():
+  """Connection pool counters per engine, for dashboards and debugging latency spikes."""
+  return jsonify(pool_stats.snapshot())
+
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@main.route('/shows')
+@conditional(shows_listing_validators)
 def shows():
+  stream = streaming_requested()
   data = []
+  page = None
   try:
-    shows = Show.query.all()
-    if shows is None:
-      return not_found_error(404)
-    for show in shows:
-      data.append({
-        'venue_id': show.venue.id,
-        'venue_name': show.venue.name,
-        'artist_id': show.artist.id,
-        'artist_name': show.artist.name,
-        'artist_image_link': show.artist.image_link,
-        'start_time': str(show.start_time)})
-
+    data, page = show_listing(request.args.get('cursor'), current_app.config['LISTING_PAGE_SIZE'], stream)
+  except InvalidCursor:
+    data, page = show_listing(None, current_app.config['LISTING_PAGE_SIZE'], stream)
   except SQLAlchemyError as e:
     db.session.rollback()
-    app.logger.error("Failed to fetch shows: %s", e, exc_info=True)
+    current_app.logger.error("Failed to fetch shows: %s", e, exc_info=True)
     flash("Oops! Something went wrong, please try again.")
 
   finally:
-    return render_template("pages/shows.html", shows=data)
+    return render_listing("pages/shows.html", stream, shows=data, page=page)
   # displays list of shows at /shows
   # TODO: replace with real venues data.
  
-@app.route('/shows/create')
+@main.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
   try:
     form = ShowForm()
@@ -588,7 +573,7 @@ def create_show_submission():
     flash("Show has been successfully listed!")
 
   except Exception as e:
-    app.logger.error("Failed to create show: %s", e, exc_info=True)
+    current_app.logger.error("Failed to create show: %s", e, exc_info=True)
     db.session.rollback()
     flash("Something went wrong and the show was not created. Please try again.")
 
@@ -606,25 +591,72 @@ def create_show_submission():
   # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
   #return render_template('pages/home.html')
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.ERROR)
-    app.logger.addHandler(file_handler)
+#----------------------------------------------------------------------------#
+# App Factory.
+#----------------------------------------------------------------------------#
+
+def configure_logging(app):
+    """(Re)starts the error/access log pipeline; files opened before a fork must not be shared."""
+    if app.debug:
+        return
+    log_pipeline.start(app)
     app.logger.info('errors')
 
+def create_app(config_object='config'):
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    moment.init_app(app)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    replica_router.init_app(app)
+    pool_stats.init_app(app, db, replica_router.engines)
+    query_stats.init_app(app, db, replica_router.engines)
+    log_pipeline.init_app(app)
+    metrics.init_app(app)
+    typeahead.init_app(app)
+    page_cache.init_app(app)
+    async_db.init_app(app)
+    assets.init_app(app)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(schema_cli)
+    app.register_blueprint(main)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(api_v1)
+    app.register_blueprint(health_bp)
+    configure_logging(app)
+    return app
+
+def warm_typeahead(app):
+    """Loads the autocomplete indexes now so no request pays for the table read."""
+    with app.app_context():
+        try:
+            typeahead.warm()
+        except SQLAlchemyError as e:
+            # e.g. the schema is not migrated yet; lookups load the index on first use
+            app.logger.warning("Autocomplete indexes not preloaded: %s", e)
+
+def init_worker(app):
+    """
+    Resets per-process state in a worker forked from a preloaded app
+    (gunicorn post_fork): pooled connections and log file handles
+    inherited from the parent are dropped, never shared. Then loads the
+    autocomplete indexes over the worker's own connections.
+    """
+    with app.app_context():
+        for engine in list(db.engines.values()) + list(replica_router.engines.values()):
+            engine.dispose(close=False)
+    configure_logging(app)
+    warm_typeahead(app)
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
@@ -633,11 +665,11 @@ if not app.debug:
 if __name__ == '__main__':
     import os 
     debug_mode = os.environ.get("FLASK_DEBUG", "0") == "1"
-    app.run(debug=debug_mode)
+    create_app().run(debug=debug_mode)
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
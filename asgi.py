@@ -0,0 +1,21 @@
+"""
+ASGI entry point, e.g. uvicorn asgi:app --port 5000.
+
+This is still the WSGI app: WsgiToAsgi calls it in a worker thread per
+request, so requests are no more concurrent than under a threaded WSGI
+server. With ASYNC_DETAIL_PAGES=1 the detail pages run their async loader
+through async_to_sync, which blocks that thread until it is done; the
+queries run on async_db's background loop as they do under gunicorn.
+"""
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+
+# config.py defaults DEBUG on for `flask run`; a server is not that
+os.environ.setdefault('FLASK_DEBUG', '0')
+
+from app import create_app, warm_typeahead
+
+flask_app = create_app()
+warm_typeahead(flask_app)
+app = WsgiToAsgi(flask_app)
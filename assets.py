@@ -0,0 +1,304 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+#----------------------------------------------------------------------------#
+# Fingerprinted, precompressed static assets.
+#----------------------------------------------------------------------------#
+# `flask assets build` copies every file under static/ to static/build/ with
+# a content hash in its name, concatenates and minifies the BUNDLES the
+# layout loads, and writes .gz and .br siblings next to the text files that
+# compress well. manifest.json maps each source name to its built file.
+#
+# Templates ask for asset_url('img/x.jpg') and asset_urls('css/app.css');
+# with ASSETS_BUILD on they get the hashed URLs, otherwise (or before the
+# first build) the source files. A hashed name changes whenever its content
+# does, so built files are served as immutable for a year, precompressed
+# per Accept-Encoding. url()s in CSS point at the hashed files too.
+#
+# A build keeps the files of the one before it (its manifest moves to
+# manifest.previous.json) and deletes older ones, so pages rendered before a
+# deploy, and workers that have not reloaded yet, still find their assets.
+
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+PREVIOUS_MANIFEST = 'manifest.previous.json'
+
+BUNDLES = {
+    'css/app.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # in load order: the layout loads jQuery (sync) before this deferred bundle runs
+    'js/app.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.eot', '.ttf', '.otf', '.ico'}
+MIN_COMPRESS_BYTES = 1024
+# (Content-Encoding, file suffix), most preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s*([{};,])\s*|\s+')
+
+assets_cli = AppGroup('assets', help='Build the fingerprinted static bundles.')
+assets_bp = Blueprint('assets', __name__)
+
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+def _minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text, keep_bang_comments=True)
+    # comments and whitespace only; good enough without rcssmin
+    return _CSS_SPACE.sub(lambda m: m.group(1) or ' ', _CSS_COMMENT.sub('', text)).strip()
+
+
+def _minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text, keep_bang_comments=True)
+    return text
+
+
+def _rewrite_css_urls(text, source, output, files):
+    """Points the relative url()s of source, moved to output, at their built files."""
+    def rewrite(match):
+        quote, url = match.groups()
+        if re.match(r'^(?:[a-z]+:|/|#)', url, re.I):
+            return match.group(0)
+        path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        built = files[target]['path'] if target in files else target
+        return f'url({quote}{posixpath.relpath(built, posixpath.dirname(output))}{suffix}{quote})'
+    return _CSS_URL.sub(rewrite, text)
+
+
+def _write(out, name, data):
+    """Writes data under its hashed name (and compressed siblings); returns its manifest entry."""
+    root, ext = posixpath.splitext(name)
+    hashed = f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+    target = os.path.join(out, *hashed.split('/'))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+    entry = {'path': f'{BUILD_DIR}/{hashed}', 'size': len(data), 'encodings': {}}
+    if ext not in COMPRESSIBLE or len(data) < MIN_COMPRESS_BYTES:
+        return entry
+    variants = {'gzip': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    for encoding, suffix in ENCODINGS:
+        compressed = variants.get(encoding)
+        # not worth a second file (or the Vary) below a 10% saving
+        if compressed is not None and len(compressed) < len(data) * 0.9:
+            with open(target + suffix, 'wb') as f:
+                f.write(compressed)
+            entry['encodings'][encoding] = len(compressed)
+    return entry
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _prune(out, manifests):
+    """Deletes the built files (and compressed siblings) no manifest in manifests refers to."""
+    prefix = BUILD_DIR + '/'
+    keep = {MANIFEST, PREVIOUS_MANIFEST}
+    for manifest in manifests:
+        for entry in manifest.values():
+            path = entry['path'][len(prefix):]
+            keep.add(path)
+            keep.update(path + suffix for _, suffix in ENCODINGS)
+    for directory, _, filenames in os.walk(out):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.relpath(path, out).replace(os.sep, '/') not in keep:
+                os.remove(path)
+
+
+def build(static_folder, bundles=BUNDLES):
+    """Rebuilds static_folder/build, keeping the previous build's files; returns the manifest."""
+    out = os.path.join(static_folder, BUILD_DIR)
+    previous = _read_manifest(os.path.join(out, MANIFEST))
+    sources = {}
+    for directory, dirnames, filenames in os.walk(static_folder):
+        dirnames[:] = [d for d in dirnames if os.path.join(directory, d) != out]
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            sources[os.path.relpath(path, static_folder).replace(os.sep, '/')] = path
+
+    def read(name):
+        with open(sources[name], 'rb') as f:
+            return f.read()
+
+    files = {}
+    # CSS last, so its url()s can point at the hashed fonts and images
+    for name in sorted(sources, key=lambda name: (name.endswith('.css'), name)):
+        data = read(name)
+        if name.endswith('.css'):
+            text = _rewrite_css_urls(data.decode('utf-8'), name, f'{BUILD_DIR}/{name}', files)
+            data = text.encode('utf-8')
+        files[name] = _write(out, name, data)
+
+    for bundle, members in bundles.items():
+        if bundle.endswith('.css'):
+            text = '\n'.join(_rewrite_css_urls(read(name).decode('utf-8'), name, f'{BUILD_DIR}/{bundle}', files)
+                             for name in members)
+            text = _minify_css(text)
+        else:
+            # a member without a trailing semicolon must not run into the next
+            text = _minify_js(';\n'.join(read(name).decode('utf-8') for name in members))
+        files[bundle] = _write(out, bundle, text.encode('utf-8'))
+        files[bundle]['source_size'] = sum(os.path.getsize(sources[name]) for name in members)
+
+    if previous and previous != files:
+        with open(os.path.join(out, PREVIOUS_MANIFEST), 'w') as f:
+            json.dump(previous, f, indent=1, sort_keys=True)
+    # a rebuild with nothing changed keeps the previous manifest it had
+    _prune(out, [files, _read_manifest(os.path.join(out, PREVIOUS_MANIFEST))])
+    with open(os.path.join(out, MANIFEST), 'w') as f:
+        json.dump(files, f, indent=1, sort_keys=True)
+    return files
+
+
+@assets_cli.command('build')
+def build_command():
+    """Write hashed, minified and precompressed assets to static/build."""
+    manifest = build(current_app.static_folder)
+    for missing, name in ((brotli, 'brotli'), (rcssmin, 'rcssmin'), (rjsmin, 'rjsmin')):
+        if missing is None:
+            click.echo(f'{name} is not installed: skipped what it does', err=True)
+    click.echo(f'{len(manifest)} files -> {os.path.join(current_app.static_folder, BUILD_DIR)}')
+    for bundle in BUNDLES:
+        entry = manifest[bundle]
+        sizes = ', '.join(f'{encoding} {size:,}' for encoding, size in entry['encodings'].items())
+        click.echo(f"{bundle}: {entry['source_size']:,} -> {entry['size']:,} bytes ({sizes}) {entry['path']}")
+    assets.load(current_app)
+
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+class Assets:
+    def __init__(self):
+        self.enabled = False
+        self.manifest = {}
+        # digest of the manifest; changes with any built file
+        self.version = None
+        # built file (relative to static/build) of this build or the previous one -> {encoding: size}
+        self.encodings = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ASSETS_BUILD', False)
+        app.cli.add_command(assets_cli)
+        app.register_blueprint(assets_bp, url_prefix=f'{app.static_url_path}/{BUILD_DIR}')
+        app.add_template_global(asset_url)
+        app.add_template_global(asset_urls)
+        self.load(app)
+
+    def load(self, app):
+        try:
+            with open(os.path.join(app.static_folder, BUILD_DIR, MANIFEST), 'rb') as f:
+                raw = f.read()
+            self.manifest = json.loads(raw)
+            self.version = hashlib.sha1(raw).hexdigest()
+        except FileNotFoundError:
+            self.manifest = {}
+            self.version = None
+            if self.enabled:
+                app.logger.warning("ASSETS_BUILD is on but there is no %s; serving the source files "
+                                   "(run `flask assets build`)", MANIFEST)
+        prefix = BUILD_DIR + '/'
+        previous = _read_manifest(os.path.join(app.static_folder, BUILD_DIR, PREVIOUS_MANIFEST))
+        self.encodings = {entry['path'][len(prefix):]: entry['encodings']
+                          for manifest in (previous, self.manifest) for entry in manifest.values()}
+
+    def built(self, name):
+        return self.manifest.get(name) if self.enabled else None
+
+
+def asset_url(filename):
+    """url_for('static', filename=...) that prefers the hashed build of the file."""
+    entry = assets.built(filename)
+    return url_for('static', filename=entry['path'] if entry else filename)
+
+
+def asset_urls(bundle):
+    """The built bundle's URL, or the URLs of its source files when it is not built."""
+    entry = assets.built(bundle)
+    if entry:
+        return [url_for('static', filename=entry['path'])]
+    return [url_for('static', filename=name) for name in BUNDLES[bundle]]
+
+
+def _negotiate(available):
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding, _ in ENCODINGS:
+        quality = accepted.quality(encoding)
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+@assets_bp.route('/<path:filename>')
+def built(filename):
+    available = assets.encodings.get(filename)
+    if available is None:
+        abort(404)
+    encoding = _negotiate(available)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(os.path.join(current_app.static_folder, BUILD_DIR),
+                                   filename + dict(ENCODINGS)[encoding] if encoding else filename,
+                                   mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+assets = Assets()
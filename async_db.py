@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from pool_stats import pool_stats
+
+#----------------------------------------------------------------------------#
+# asyncio database access for the async detail pages.
+#----------------------------------------------------------------------------#
+# The detail views run the async loaders through app.ensure_sync
+# (async_to_sync), so the request keeps its worker thread until the loader
+# returns, under gunicorn and under asgi.py (which runs the WSGI app in a
+# thread) alike. The event loop the loader gets is not one to keep
+# connections on: a fresh one per call. Pooled asyncpg/aiosqlite
+# connections belong to the loop that opened them, so the engine lives on
+# one background loop per process and loaders hand their queries to it
+# with run(). Each query gets its own connection, which is
+# what lets independent queries run concurrently.
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping', 'pool_use_lifo')
+
+
+def async_url(url):
+    """Maps a sync database URL to the matching asyncio driver."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver configured for {backend}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDatabase:
+    def __init__(self):
+        self.url = None
+        self.options = {}
+        self._engine = None
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.url = app.config.get('ASYNC_DATABASE_URL') or async_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        sync_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        self.options = {k: v for k, v in sync_options.items() if k in POOL_OPTIONS}
+        if sync_options.get('poolclass') is NullPool:
+            # PgBouncer mode: no client-side pool and no prepared statements
+            self.options['poolclass'] = NullPool
+            if make_url(self.url).get_backend_name() == 'postgresql':
+                self.options['connect_args'] = {'statement_cache_size': 0,
+                                                'prepared_statement_cache_size': 0}
+        self._engine = self._loop = self._pid = None
+
+    def _start(self):
+        # the loop thread does not survive a fork; every process starts its own
+        with self._lock:
+            if self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+                self._engine = create_async_engine(self.url, **self.options)
+                pool_stats.instrument('async', self._engine.sync_engine)
+                self._loop, self._pid = loop, os.getpid()
+
+    @property
+    def engine(self):
+        if self._pid != os.getpid():
+            self._start()
+        return self._engine
+
+    async def run(self, coro):
+        """Awaits coro on the database loop from any event loop."""
+        if self._pid != os.getpid():
+            self._start()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def all(self, statement):
+        async with self.engine.connect() as connection:
+            return (await connection.execute(statement)).all()
+
+    async def first(self, statement):
+        async with self.engine.connect() as connection:
+            return (await connection.execute(statement)).first()
+
+    async def scalars(self, statement):
+        async with self.engine.connect() as connection:
+            return (await connection.execute(statement)).scalars().all()
+
+
+async_db = AsyncDatabase()
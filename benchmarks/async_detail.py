@@ -0,0 +1,89 @@
+"""
+Compares p50/p99 latency of the sync and async venue/artist detail pages.
+
+    python benchmarks/async_detail.py [requests] [shows per venue]
+
+Each mode runs in its own process with the page cache off, requesting
+venue and artist pages round-robin. The async loaders overlap their three
+queries, so the gap grows with database round-trip time: run against a
+remote Postgres (BENCHMARK_DATABASE_URL, see benchmarks/scratch.py) to
+see it; on a local SQLite file the queries are too fast for the overlap to
+pay for the thread hand-off.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scratch import use_database
+
+NUM_ENTITIES = 50
+
+
+def seed(shows_per_venue):
+    from app import create_app
+    from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+    app = create_app()
+    now = datetime.utcnow()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(Genre.__table__.insert(), [{'name': f'Genre {i}'} for i in range(10)])
+        db.session.execute(Artist.__table__.insert(), [
+            {'name': f'Artist {i}', 'city': 'Austin', 'state': 'TX'} for i in range(NUM_ENTITIES)])
+        db.session.execute(Venue.__table__.insert(), [
+            {'name': f'Venue {i}', 'city': 'Austin', 'state': 'TX'} for i in range(NUM_ENTITIES)])
+        db.session.execute(venue_genres.insert(), [
+            {'venue_id': v, 'genre_id': g} for v in range(1, NUM_ENTITIES + 1) for g in (1, v % 9 + 2)])
+        db.session.execute(artist_genres.insert(), [
+            {'artist_id': a, 'genre_id': g} for a in range(1, NUM_ENTITIES + 1) for g in (1, a % 9 + 2)])
+        db.session.execute(Show.__table__.insert(), [{
+            'venue_id': i % NUM_ENTITIES + 1,
+            'artist_id': i * 7 % NUM_ENTITIES + 1,
+            'start_time': now + timedelta(hours=i - shows_per_venue * NUM_ENTITIES // 2)}
+            for i in range(shows_per_venue * NUM_ENTITIES)])
+        db.session.commit()
+
+
+def measure(requests):
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+    paths = [f'/{kind}/{i}' for i in range(1, NUM_ENTITIES + 1) for kind in ('venues', 'artists')]
+    for path in paths[:20]:
+        client.get(path)
+    timings = []
+    for n in range(requests):
+        started = time.perf_counter()
+        response = client.get(paths[n % len(paths)])
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.status_code
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    mode = 'async' if app.config['ASYNC_DETAIL_PAGES'] else 'sync'
+    print(f'{mode:<6} p50 {statistics.median(timings):7.2f} ms  p99 {p99:7.2f} ms  '
+          f'mean {statistics.fmean(timings):7.2f} ms  ({requests} requests)')
+
+
+def main(requests, shows_per_venue):
+    env = dict(os.environ, PAGE_CACHE_BACKEND='none')
+    subprocess.run([sys.executable, __file__, 'seed', str(shows_per_venue)], env=env, check=True)
+    for flag in ('0', '1'):
+        subprocess.run([sys.executable, __file__, 'measure', str(requests)],
+                       env=dict(env, ASYNC_DETAIL_PAGES=flag), check=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'seed':
+        seed(int(sys.argv[2]))
+    elif len(sys.argv) > 2 and sys.argv[1] == 'measure':
+        measure(int(sys.argv[2]))
+    else:
+        use_database('async_bench.db')
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+             int(sys.argv[2]) if len(sys.argv) > 2 else 200)
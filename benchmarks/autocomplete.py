@@ -0,0 +1,60 @@
+"""
+Measures typeahead lookup latency and index memory footprint.
+
+    python benchmarks/autocomplete.py [num_venues]
+
+Runs against a throwaway SQLite database unless BENCHMARK_DATABASE_URL is
+set (see benchmarks/scratch.py).
+"""
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from scratch import use_database
+use_database('autocomplete_bench.db')
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, Venue
+import typeahead
+
+app = create_app()
+
+WORDS = ['the', 'musical', 'hop', 'park', 'square', 'live', 'music', 'coffee', 'dueling',
+         'pianos', 'bar', 'hall', 'club', 'jazz', 'lounge', 'theatre', 'garden', 'room']
+
+
+def main(num_venues):
+    rng = random.Random(42)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(Venue.__table__.insert(), [{
+            'name': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))) + f' {i}',
+            'city': 'Austin', 'state': 'TX'} for i in range(num_venues)])
+        db.session.commit()
+
+        started = time.perf_counter()
+        typeahead.warm()
+        print(f'build: {(time.perf_counter() - started) * 1000:.1f} ms for {num_venues} venues')
+        print('stats:', typeahead.indexes['venue'].stats())
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        prefixes = [rng.choice(WORDS)[:rng.randint(1, 4)] for _ in range(10000)]
+        started = time.perf_counter()
+        for prefix in prefixes:
+            typeahead.lookup('venue', prefix)
+        per_lookup = (time.perf_counter() - started) / len(prefixes)
+        print(f'lookup: {per_lookup * 1e6:.1f} us average over {len(prefixes)} prefixes')
+        assert not statements, 'lookups must not query the database'
+        assert per_lookup < 0.001, 'lookups should be sub-millisecond'
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
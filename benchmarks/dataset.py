@@ -0,0 +1,202 @@
+"""
+Generates a deterministic synthetic catalog of venues, artists and shows.
+
+    python benchmarks/dataset.py [--scale small|medium|large] [--venues N]
+                                 [--artists N] [--shows N] [--seed N] [--yes-drop]
+
+Writes into BENCHMARK_DATABASE_URL (a throwaway SQLite file by default;
+any other database needs --yes-drop, see benchmarks/scratch.py), replacing
+whatever is there and building the schema through the migrations so the
+production indexes exist. The same seed and sizes always produce the same
+rows; start times are laid out around midnight UTC of the day it runs, so
+the past/upcoming split stays realistic.
+
+Popularity is skewed the way real catalogs are: a few cities hold most
+venues and artists, a few genres are on most of them, and a few venues and
+artists play most of the shows (Zipf-like weights, see SKEW and SHOW_SKEW).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scratch import use_database
+
+SCALES = {
+    'small': {'venues': 1_000, 'artists': 1_000, 'shows': 10_000},
+    'medium': {'venues': 10_000, 'artists': 10_000, 'shows': 100_000},
+    'large': {'venues': 100_000, 'artists': 100_000, 'shows': 1_000_000},
+}
+SKEW = 1.1
+# gentler for shows: the busiest venue of 1k hosts ~7% of them rather than ~18%
+SHOW_SKEW = 0.8
+NUM_CITIES = 400
+BATCH_SIZE = 10_000
+PAST_DAYS = 365
+UPCOMING_DAYS = 180
+STATES = ['CA', 'NY', 'TX', 'FL', 'IL', 'WA', 'GA', 'CO', 'OR', 'MA', 'TN', 'LA', 'PA', 'MN', 'AZ', 'NV']
+WORDS = ['the', 'musical', 'hop', 'park', 'square', 'live', 'music', 'coffee', 'dueling', 'pianos',
+         'bar', 'hall', 'club', 'jazz', 'lounge', 'theatre', 'garden', 'room', 'wild', 'sax', 'band',
+         'blue', 'red', 'north', 'south', 'electric', 'velvet', 'echo', 'union', 'harbor']
+
+
+def zipf_weights(n, skew=SKEW):
+    """Cumulative weights for rng.choices: item k is picked ~1/(k+1)**skew as often."""
+    return list(accumulate(1 / (k + 1) ** skew for k in range(n)))
+
+
+def _name(rng, suffix):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 3))).title() + f' {suffix}'
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(table, rows):
+    from models import db
+    for batch in _batches(rows):
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+
+def reset_schema():
+    """Drops everything and rebuilds the schema from the migrations."""
+    from flask_migrate import upgrade
+    from sqlalchemy import text
+    from models import db
+    db.drop_all()
+    db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+    upgrade(directory=os.path.join(ROOT, 'migrations'))
+
+
+def generate(venues, artists, shows, seed=1, anchor=None):
+    """
+    Fills an empty, migrated database; needs an app context. Returns the
+    anchor datetime the show start times are laid out around.
+    """
+    from sqlalchemy import text
+    from forms import VenueForm
+    from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres, build_search_text
+
+    rng = random.Random(seed)
+    anchor = anchor or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    genre_names = [name for name, _ in VenueForm.genres.kwargs['choices']]
+    cities = [(_name(rng, i), STATES[i % len(STATES)]) for i in range(NUM_CITIES)]
+    city_weights = zipf_weights(len(cities))
+    genre_weights = zipf_weights(len(genre_names))
+
+    _insert(Genre.__table__, ({'id': i, 'name': name} for i, name in enumerate(genre_names, 1)))
+
+    def owners(count, label, with_address):
+        links = []
+        rows = []
+        for owner_id in range(1, count + 1):
+            city, state = rng.choices(cities, cum_weights=city_weights)[0]
+            genre_ids = sorted(set(rng.choices(range(1, len(genre_names) + 1),
+                                               cum_weights=genre_weights, k=rng.randint(1, 3))))
+            name = _name(rng, f'{label} {owner_id}')
+            row = {
+                'id': owner_id,
+                'name': name,
+                'city': city,
+                'state': state,
+                'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+                'image_link': f'https://images.example.com/{label.lower()}/{owner_id}.jpg',
+                'facebook_link': f'https://www.facebook.com/{label.lower()}{owner_id}',
+                'seeking_description': 'Looking for talent' if owner_id % 5 == 0 else None,
+                'search_text': build_search_text(name, city, state, [genre_names[g - 1] for g in genre_ids]),
+            }
+            if with_address:
+                row['address'] = f'{rng.randint(1, 9999)} {rng.choice(WORDS).title()} St'
+            rows.append(row)
+            links.extend((owner_id, g) for g in genre_ids)
+        return rows, links
+
+    venue_rows, venue_links = owners(venues, 'Venue', with_address=True)
+    _insert(Venue.__table__, venue_rows)
+    _insert(venue_genres, ({'venue_id': v, 'genre_id': g} for v, g in venue_links))
+    del venue_rows, venue_links
+    artist_rows, artist_links = owners(artists, 'Artist', with_address=False)
+    _insert(Artist.__table__, artist_rows)
+    _insert(artist_genres, ({'artist_id': a, 'genre_id': g} for a, g in artist_links))
+    del artist_rows, artist_links
+
+    # popular venues and artists are spread over the id range, not clustered at the low ids
+    venue_ids = list(range(1, venues + 1))
+    artist_ids = list(range(1, artists + 1))
+    rng.shuffle(venue_ids)
+    rng.shuffle(artist_ids)
+    venue_weights = zipf_weights(venues, SHOW_SKEW)
+    artist_weights = zipf_weights(artists, SHOW_SKEW)
+    span = (PAST_DAYS + UPCOMING_DAYS) * 24
+
+    def show_rows():
+        for show_id in range(1, shows + 1):
+            yield {
+                'id': show_id,
+                'venue_id': rng.choices(venue_ids, cum_weights=venue_weights)[0],
+                'artist_id': rng.choices(artist_ids, cum_weights=artist_weights)[0],
+                'start_time': anchor + timedelta(hours=rng.randrange(span) - PAST_DAYS * 24),
+            }
+
+    _insert(Show.__table__, show_rows())
+    if db.engine.dialect.name == 'postgresql':
+        # explicit ids leave the sequences behind
+        for table in ('Genre', 'Venue', 'Artist', 'shows'):
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT MAX(id) FROM \"{table}\"))"))
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return anchor
+
+
+def sizes(scale, venues=None, artists=None, shows=None):
+    counts = dict(SCALES[scale])
+    for key, value in (('venues', venues), ('artists', artists), ('shows', shows)):
+        if value is not None:
+            counts[key] = value
+    return counts
+
+
+def parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--venues', type=int)
+    parser.add_argument('--artists', type=int)
+    parser.add_argument('--shows', type=int)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--yes-drop', action='store_true',
+                        help='allow dropping BENCHMARK_DATABASE_URL when it is not a temporary SQLite file')
+    return parser
+
+
+def main(args):
+    url = use_database('dataset.db')
+    from app import create_app
+    counts = sizes(args.scale, args.venues, args.artists, args.shows)
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        reset_schema()
+        generate(seed=args.seed, **counts)
+        print(f"{counts['venues']} venues, {counts['artists']} artists, {counts['shows']} shows "
+              f"in {time.perf_counter() - started:.1f}s -> {url}")
+
+
+if __name__ == '__main__':
+    main(parser().parse_args())
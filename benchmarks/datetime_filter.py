@@ -0,0 +1,70 @@
+"""
+Compares the template `datetime` filter with the one it replaced.
+
+    python benchmarks/datetime_filter.py [num_shows]
+
+The old filter took str(start_time), reparsed it with dateutil and had
+babel look up the pattern and locale on every call; formatting.py takes the
+datetime itself. Timed over one page worth of show tiles, cold (empty
+memo) and warm (the same page again), after checking both give the same text.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import formatting
+from formatting import format_datetime
+
+REPEAT = 20
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def timed(render, times, reset=None):
+    best = float('inf')
+    for _ in range(REPEAT):
+        if reset:
+            reset()
+        started = time.perf_counter()
+        render(times)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(num_shows):
+    rng = random.Random(1)
+    anchor = datetime(2026, 1, 1, 20)
+    times = [anchor + timedelta(hours=rng.randrange(24 * 365)) for _ in range(num_shows)]
+    for value in times[:50]:
+        for format in ('full', 'medium'):
+            assert format_datetime(value, format) == legacy_format_datetime(str(value), format)
+
+    legacy = timed(lambda ts: [legacy_format_datetime(str(t), 'full') for t in ts], times)
+    cold = timed(lambda ts: [format_datetime(t, 'full') for t in ts], times, formatting._format.cache_clear)
+    warm = timed(lambda ts: [format_datetime(t, 'full') for t in ts], times)
+    zoned = timed(lambda ts: [format_datetime(t, 'full', 'America/Chicago') for t in ts], times,
+                  formatting._format.cache_clear)
+    print(f'{num_shows} shows, best of {REPEAT}')
+    print(f'{"filter":<28} {"ms":>8} {"us/show":>8} {"speedup":>8}')
+    for name, seconds in (('dateutil + babel (old)', legacy), ('precompiled, cold', cold),
+                          ('precompiled, memoized', warm), ('precompiled, venue tz, cold', zoned)):
+        print(f'{name:<28} {seconds * 1000:>8.2f} {seconds / num_shows * 1e6:>8.2f} {legacy / seconds:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
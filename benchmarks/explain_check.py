@@ -0,0 +1,178 @@
+"""
+Fails when a route's queries would scan a large table end to end.
+
+    python benchmarks/explain_check.py [num_venues]
+
+Builds the schema through the migrations (so a missing index in a
+migration is caught, not just in models.py), seeds it, ANALYZEs it, then
+requests each route below while recording the SQL it sends. Every
+statement is re-run under EXPLAIN with its real parameters; a sequential
+scan of a table holding LARGE_TABLE_ROWS rows or more is a failure. Exits
+non-zero listing the offending route, statement and plan.
+
+Runs against a throwaway SQLite database unless BENCHMARK_DATABASE_URL is
+set (see benchmarks/scratch.py). Plans depend on the engine: run it against
+PostgreSQL before trusting a new query shape in production.
+"""
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from scratch import use_database
+use_database('explain_check.db')
+os.environ['PAGE_CACHE_BACKEND'] = 'none'
+
+from flask_migrate import upgrade
+from sqlalchemy import event, inspect, text
+
+from app import create_app
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from pagination import encode_cursor
+
+LARGE_TABLE_ROWS = 500
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL', 'GA', 'CO', 'OR']
+CITIES = [(f'City {i}', STATES[i % len(STATES)]) for i in range(40)]
+
+# Scans these routes cannot avoid on a given engine, with the reason.
+EXPECTED_SCANS = {
+    'sqlite': {
+        'POST /venues/search': 'substring LIKE needs the pg_trgm index, PostgreSQL only',
+        'POST /artists/search': 'substring LIKE needs the pg_trgm index, PostgreSQL only',
+    },
+}
+
+
+def routes(now, num_venues):
+    middle = now.replace(microsecond=0)
+    return [
+        ('GET', '/venues', None),
+        ('GET', '/venues?cursor=' + encode_cursor(['NY', 'City 1', 'Venue 1', 2], 'next'), None),
+        ('GET', '/artists', None),
+        ('GET', '/artists?cursor=' + encode_cursor(['Artist 5', 6], 'next'), None),
+        ('GET', '/shows', None),
+        ('GET', '/shows?cursor=' + encode_cursor([middle, 1], 'next'), None),
+        ('GET', f'/venues/{num_venues // 2}', None),
+        ('GET', f'/artists/{num_venues // 2}', None),
+        ('GET', f'/venues/{num_venues // 2}/shows/upcoming?cursor='
+         + encode_cursor([middle, 1], 'next'), None),
+        ('GET', f'/artists/{num_venues // 2}/shows/past?cursor='
+         + encode_cursor([middle, 1], 'next'), None),
+        ('GET', f'/artists/{num_venues // 2}/edit', None),
+        ('GET', '/api/v1/venues?cursor=' + encode_cursor([num_venues // 2], 'next'), None),
+        ('GET', f'/api/v1/artists?ids=1,2,{num_venues // 2}', None),
+        ('GET', f'/api/v1/shows/{num_venues}', None),
+        ('GET', '/export/venues?city=City%203&state=WA', None),
+        ('GET', '/export/shows?from={}&to={}'.format(
+            (now - timedelta(hours=6)).isoformat(), (now + timedelta(hours=6)).isoformat()), None),
+        ('POST', '/venues/search', {'search_term': 'venue 1'}),
+        ('POST', '/artists/search', {'search_term': 'artist 1'}),
+    ]
+
+
+def seed(num_venues, now):
+    db.session.execute(Genre.__table__.insert(), [{'name': f'Genre {i}'} for i in range(20)])
+    db.session.execute(Venue.__table__.insert(), [{
+        'name': f'Venue {i}',
+        'city': CITIES[i % len(CITIES)][0],
+        'state': CITIES[i % len(CITIES)][1],
+        'search_text': f'venue {i}'} for i in range(num_venues)])
+    db.session.execute(Artist.__table__.insert(), [{
+        'name': f'Artist {i}',
+        'search_text': f'artist {i}'} for i in range(num_venues)])
+    db.session.execute(venue_genres.insert(), [
+        {'venue_id': v, 'genre_id': v % 20 + 1} for v in range(1, num_venues + 1)])
+    db.session.execute(artist_genres.insert(), [
+        {'artist_id': a, 'genre_id': a % 20 + 1} for a in range(1, num_venues + 1)])
+    db.session.execute(Show.__table__.insert(), [{
+        'venue_id': i % num_venues + 1,
+        'artist_id': i * 7 % num_venues + 1,
+        'start_time': now + timedelta(hours=i - num_venues * 5)} for i in range(num_venues * 10)])
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+
+def large_tables():
+    sizes = {name: db.session.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
+             for name in inspect(db.engine).get_table_names()}
+    return {name.lower() for name, rows in sizes.items() if rows >= LARGE_TABLE_ROWS}
+
+
+def sqlite_scans(connection, statement, parameters, large):
+    plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    lines = [row[-1] for row in plan]
+    # "SCAN t" reads the whole table; "SCAN t USING INDEX" walks an index in
+    # order (and stops at the LIMIT), "SEARCH" seeks into one
+    scanned = [m.group(1) for m in (re.match(r'SCAN (\w+)$', line) for line in lines) if m]
+    return [t for t in scanned if t.lower() in large], lines
+
+
+def postgresql_scans(connection, statement, parameters, large):
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+    scanned, nodes = [], [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            scanned.append(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return [t for t in scanned if t.lower() in large], [str(plan)]
+
+
+def main(num_venues):
+    app = create_app()
+    now = datetime.utcnow()
+    with app.app_context():
+        db.drop_all()
+        db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        db.session.commit()
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+        seed(num_venues, now)
+        large = large_tables()
+        dialect = db.engine.dialect.name
+        explain = postgresql_scans if dialect == 'postgresql' else sqlite_scans
+        expected = EXPECTED_SCANS.get(dialect, {})
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        failures = 0
+        client = app.test_client()
+        for method, path, form in routes(now, num_venues):
+            route = f'{method} {path.split("?")[0]}'
+            statements.clear()
+            event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+            try:
+                response = client.open(path, method=method, data=form)
+                response.get_data()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+            if response.status_code != 200:
+                print(f'FAIL  {route}: status {response.status_code}')
+                failures += 1
+                continue
+            with db.engine.connect() as connection:
+                scans = [(statement, explain(connection, statement, parameters, large))
+                         for statement, parameters in statements]
+            bad = [(statement, tables, plan) for statement, (tables, plan) in scans if tables]
+            if bad and route in expected:
+                print(f'skip  {route}: {expected[route]}')
+            elif bad:
+                failures += 1
+                for statement, tables, plan in bad:
+                    print(f'FAIL  {route}: sequential scan of {", ".join(tables)}')
+                    print('      ' + ' '.join(statement.split()))
+                    print('      plan: ' + ' | '.join(plan))
+            else:
+                print(f'ok    {route} ({len(statements)} queries)')
+    print(f'{failures} route(s) scanning large tables' if failures else 'no sequential scans of large tables')
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000) else 0)
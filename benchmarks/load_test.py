@@ -0,0 +1,148 @@
+"""
+Measures requests/sec under gunicorn as the number of workers grows.
+
+    python benchmarks/load_test.py [seconds] [worker counts...]
+
+    e.g. python benchmarks/load_test.py 10 1 2 4 8
+
+Each worker count gets a fresh gunicorn (gunicorn.conf.py, preload_app) on a
+local port, hammered by twice as many client threads as server threads over
+keep-alive connections. Worker counts default to 1, 2, 4 ... up to the
+number of cores. Uses a seeded throwaway SQLite database unless
+BENCHMARK_DATABASE_URL is set, in which case that database must already
+hold data (it is only read).
+
+After each run /metrics is scraped and its request total, summed over all
+workers, is checked against the responses the clients received.
+"""
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PATHS = ['/', '/venues', '/artists', '/shows', '/venues/1', '/artists/1', '/api/v1/venues?fields=name,city']
+PORT = 5099
+THREADS = 2
+
+
+def seed():
+    from app import create_app
+    from models import db, Venue, Artist, Show
+    app = create_app()
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Artist.__table__.insert(), [{'name': f'Artist {i}'} for i in range(200)])
+        db.session.execute(Venue.__table__.insert(), [
+            {'name': f'Venue {i}', 'city': f'City {i % 20}', 'state': 'TX'} for i in range(200)])
+        db.session.execute(Show.__table__.insert(), [{
+            'artist_id': i % 200 + 1,
+            'venue_id': i * 7 % 200 + 1,
+            'start_time': now + timedelta(hours=i - 1000)} for i in range(5000)])
+        db.session.commit()
+
+
+def wait_until_up(timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return 1
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+
+def hammer(seconds, clients):
+    counts = [0] * clients
+    errors = [0] * clients
+    stop = time.perf_counter() + seconds
+
+    def client(n):
+        conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+        i = n
+        while time.perf_counter() < stop:
+            try:
+                conn.request('GET', PATHS[i % len(PATHS)])
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    errors[n] += 1
+                counts[n] += 1
+            except (OSError, http.client.HTTPException):
+                errors[n] += 1
+                conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts), sum(errors)
+
+
+def scraped_requests():
+    from metrics import parse
+    # let every worker flush its totals
+    time.sleep(2 * float(os.getenv('METRICS_FLUSH_SECONDS', '1')) + 0.5)
+    conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+    conn.request('GET', '/metrics')
+    samples = parse(conn.getresponse().read().decode())
+    return sum(value for (name, labels), value in samples.items()
+               if name == 'fyyur_http_requests_total' and ('endpoint', 'metrics.expose') not in labels)
+
+
+def run(workers, seconds):
+    scratch = tempfile.mkdtemp()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(THREADS),
+               GUNICORN_BIND=f'127.0.0.1:{PORT}', GUNICORN_MAX_REQUESTS='0',
+               ACCESS_LOG=os.path.join(scratch, 'access.jsonl'), METRICS_DIR=os.path.join(scratch, 'metrics'))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:create_app()'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        sent = wait_until_up()
+        sent += hammer(1, workers * THREADS)[0]  # warm up caches and connection pools
+        requests, errors = hammer(seconds, workers * THREADS * 2)
+        return requests, errors, scraped_requests() == sent + requests
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    counts = [int(n) for n in sys.argv[2:]]
+    if not counts:
+        n = 1
+        while n <= os.cpu_count():
+            counts.append(n)
+            n *= 2
+    if os.getenv('BENCHMARK_DATABASE_URL'):
+        # only read from, so no --yes-drop needed
+        os.environ['DATABASE_URL'] = os.environ['BENCHMARK_DATABASE_URL']
+    else:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load.db')
+        seed()
+
+    baseline = None
+    print(f'{"workers":>7} {"req/s":>10} {"speedup":>8} {"errors":>7} {"metrics":>8}')
+    for workers in counts:
+        requests, errors, counted = run(workers, seconds)
+        rate = requests / seconds
+        baseline = baseline or rate
+        print(f'{workers:>7} {rate:>10,.0f} {rate / baseline:>7.2f}x {errors:>7} {"ok" if counted else "MISMATCH":>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Asserts that an unreachable read replica does not fail requests: the
+request that finds it down reads from the primary, later ones skip it, and
+the healthy replica keeps getting its share of the reads.
+
+    python benchmarks/replica_failover.py
+
+Runs against a throwaway SQLite database unless BENCHMARK_DATABASE_URL is
+set (see benchmarks/scratch.py); the healthy replica is the primary's own
+URL, the unreachable one a SQLite file in a directory that does not exist.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from scratch import use_database
+use_database('replica_failover.db')
+os.environ['DATABASE_REPLICA_URLS'] = ','.join([
+    'sqlite:///' + os.path.join(tempfile.gettempdir(), 'no-such-dir', 'replica.db'),
+    os.environ['DATABASE_URL']])
+os.environ['PAGE_CACHE_BACKEND'] = 'none'
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, Venue, Artist, Show
+from replicas import replica_router
+
+app = create_app()
+
+PATHS = ['/venues', '/venues/1', '/artists', '/artists/1', '/shows']
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Artist.__table__.insert(), [{'name': 'Failover Artist'}])
+    db.session.execute(Venue.__table__.insert(), [{'name': 'Failover Venue', 'city': 'Austin', 'state': 'TX'}])
+    db.session.execute(Show.__table__.insert(), [{
+        'artist_id': 1, 'venue_id': 1, 'start_time': datetime.utcnow() + timedelta(days=1)}])
+    db.session.commit()
+
+
+def main(rounds=3):
+    with app.app_context():
+        seed()
+    replica_reads = []
+    event.listen(replica_router.engines['replica_1'], 'before_cursor_execute',
+                 lambda *args: replica_reads.append(1))
+    client = app.test_client()
+    for _ in range(rounds):
+        for path in PATHS:
+            response = client.get(path)
+            print(f'{path:<12} {response.status_code}')
+            assert response.status_code == 200, (path, response.status_code)
+    assert not replica_router._healthy('replica_0'), 'unreachable replica was not marked down'
+    assert replica_reads, 'the healthy replica got no reads'
+    with app.app_context():
+        db.drop_all()
+    print(f'OK: {rounds * len(PATHS)} requests answered, {len(replica_reads)} statements on the healthy replica')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+The database the benchmark scripts write to.
+
+They drop and rebuild every table, so they never use DATABASE_URL (the
+app's own database): BENCHMARK_DATABASE_URL names theirs, a new SQLite
+file in a temporary directory by default. Any other database, a server or
+a SQLite file outside the temporary directory, is only dropped when
+--yes-drop is on the command line.
+"""
+import os
+import sys
+import tempfile
+
+from sqlalchemy.engine import make_url
+
+YES_DROP = '--yes-drop'
+
+
+def is_scratch(url):
+    """True for a SQLite database in memory or under the temporary directory."""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return False
+    if not url.database or url.database == ':memory:':
+        return True
+    temp = os.path.realpath(tempfile.gettempdir())
+    return os.path.commonpath([temp, os.path.realpath(url.database)]) == temp
+
+
+def database_url(filename):
+    """
+    BENCHMARK_DATABASE_URL, or a SQLite file named filename in a new
+    temporary directory. Exits unless it is a scratch database or
+    --yes-drop was given (which is taken out of sys.argv).
+    """
+    url = os.getenv('BENCHMARK_DATABASE_URL') or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), filename)
+    if YES_DROP in sys.argv:
+        sys.argv.remove(YES_DROP)
+    elif not is_scratch(url):
+        sys.exit(f'{make_url(url).render_as_string(hide_password=True)} is not a scratch database and '
+                 f'its tables would be dropped; pass {YES_DROP} to go ahead')
+    return url
+
+
+def use_database(filename):
+    """Points the app (DATABASE_URL) at database_url(filename), for this process and its children."""
+    os.environ['DATABASE_URL'] = database_url(filename)
+    return os.environ['DATABASE_URL']
@@ -0,0 +1,73 @@
+"""
+Compares time-to-first-byte and peak RSS of buffered and streamed listings.
+
+    python benchmarks/streaming.py [num_shows]
+
+Each mode runs in its own process so peak RSS is not shared between them.
+Uses a throwaway SQLite database unless BENCHMARK_DATABASE_URL is set (see
+benchmarks/scratch.py).
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scratch import use_database
+
+
+def seed(num_shows):
+    from app import create_app
+    app = create_app()
+    from models import db, Venue, Artist, Show
+    now = datetime.utcnow()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(Artist.__table__.insert(), [
+            {'name': f'Artist {i}', 'image_link': f'https://img.example/{i}.jpg'} for i in range(100)])
+        db.session.execute(Venue.__table__.insert(), [
+            {'name': f'Venue {i}', 'city': 'Austin', 'state': 'TX'} for i in range(100)])
+        db.session.execute(Show.__table__.insert(), [{
+            'artist_id': i % 100 + 1,
+            'venue_id': i * 7 % 100 + 1,
+            'start_time': now + timedelta(hours=i)} for i in range(num_shows)])
+        db.session.commit()
+
+
+def measure(path):
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get(path, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks)
+    ttfb = time.perf_counter() - started
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - started
+    response.close()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{path:<22} ttfb {ttfb * 1000:8.1f} ms  total {total * 1000:8.1f} ms  '
+          f'{size / 1024:8.0f} KiB  peak rss {peak_kb / 1024:6.1f} MiB')
+
+
+def main(num_shows):
+    env = dict(os.environ, LISTING_PAGE_SIZE=str(num_shows))
+    subprocess.run([sys.executable, __file__, 'seed', str(num_shows)], env=env, check=True)
+    for path in ('/shows?stream=0', '/shows?stream=1', '/venues?stream=0', '/venues?stream=1'):
+        subprocess.run([sys.executable, __file__, 'measure', path], env=env, check=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'seed':
+        seed(int(sys.argv[2]))
+    elif len(sys.argv) > 2 and sys.argv[1] == 'measure':
+        measure(sys.argv[2])
+    else:
+        use_database('stream_bench.db')
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,325 @@
+"""
+Drives every route through the Flask test client and reports latency,
+queries per request and peak memory, optionally against a saved baseline.
+
+    python benchmarks/suite.py [--scale small|medium|large] [--requests N]
+                               [--save baseline.json] [--compare baseline.json]
+                               [--reuse] [--only substring]
+
+A catalog is generated first with benchmarks/dataset.py (same --scale,
+--venues, --artists, --shows, --seed options) unless --reuse says
+BENCHMARK_DATABASE_URL already holds one (see benchmarks/scratch.py; a
+database other than a temporary SQLite file also needs --yes-drop). Routes run in ROUTES order, reads before
+writes, each with a few warm-up requests; p50/p95/p99 are wall-clock
+milliseconds per request, queries are statements sent to the primary
+engine per request and peak memory is tracemalloc's peak over one extra
+request. The page cache is off unless --page-cache is given, so the
+numbers are the work a cache miss does, and QUERY_REPEAT_STRICT is on.
+
+--compare exits non-zero when a route's p95 or peak memory grew by more
+than --tolerance (default 25%, ignoring changes under 1 ms / 64 KiB) or it
+issues more queries than in the baseline. Baselines are only comparable on
+the same machine, database and scale; the suite warns when they differ.
+"""
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from dataset import ROOT, generate, parser as dataset_parser, reset_schema, sizes
+from scratch import use_database
+
+WARMUP = 3
+MIN_DELTA_MS = 1.0
+MIN_DELTA_KIB = 64
+SAMPLE_SIZE = 50
+
+
+class Route:
+    """A benchmarked request; path and form may be callables of (ctx, i)."""
+
+    def __init__(self, name, method, path, form=None, endpoint=None, before=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.form = form
+        self.endpoint = endpoint
+        self.before = before
+
+    def request(self, ctx, i):
+        path = self.path(ctx, i) if callable(self.path) else self.path
+        form = self.form(ctx, i) if callable(self.form) else self.form
+        return path, form
+
+
+class Context:
+    """Ids and cursors the route paths are built from, picked once per run."""
+
+    def __init__(self, counts, seed):
+        from aggregates import artist_listing, show_listing, venue_areas
+        from models import db, Venue
+        rng = random.Random(seed)
+        self.anchor = datetime.utcnow().replace(microsecond=0)
+        self.venue_ids = rng.sample(range(1, counts['venues'] + 1), min(SAMPLE_SIZE, counts['venues']))
+        self.artist_ids = rng.sample(range(1, counts['artists'] + 1), min(SAMPLE_SIZE, counts['artists']))
+        self.venue_names = [name for name, in db.session.query(Venue.name).filter(Venue.id.in_(self.venue_ids))]
+        self.city, self.state = (db.session.query(Venue.city, Venue.state)
+                                 .group_by(Venue.city, Venue.state)
+                                 .order_by(db.func.count().desc()).first())
+        self.venues_cursor = venue_areas(self.anchor, None, 50)[1].next_cursor
+        self.artists_cursor = artist_listing(None, 50)[1].next_cursor
+        self.shows_cursor = show_listing(None, 50)[1].next_cursor
+        self.max_seeded_venue = counts['venues']
+        self.created_venue_ids = []
+        db.session.remove()
+
+    def venue(self, i):
+        return self.venue_ids[i % len(self.venue_ids)]
+
+    def artist(self, i):
+        return self.artist_ids[i % len(self.artist_ids)]
+
+    def section_cursor(self):
+        from pagination import encode_cursor
+        return encode_cursor([self.anchor, 0], 'next')
+
+
+def _venue_form(ctx, i):
+    return {'name': f'Benchmark Venue {i}', 'city': ctx.city, 'state': ctx.state,
+            'address': '1 Benchmark St', 'phone': '555-555-5555', 'genres': ['Jazz', 'Blues'],
+            'facebook_link': 'https://www.facebook.com/benchmark', 'website_link': 'https://example.com'}
+
+
+def _artist_form(ctx, i):
+    return {'name': f'Benchmark Artist {i}', 'city': ctx.city, 'state': ctx.state,
+            'phone': '555-555-5555', 'genres': ['Rock n Roll', 'Folk'],
+            'facebook_link': 'https://www.facebook.com/benchmark'}
+
+
+def _remember_created_venues(ctx):
+    from models import db, Venue
+    ctx.created_venue_ids = [id for id, in db.session.query(Venue.id)
+                             .filter(Venue.id > ctx.max_seeded_venue).order_by(Venue.id)]
+    db.session.remove()
+
+
+ROUTES = [
+    Route('home', 'GET', '/', endpoint='main.index'),
+    Route('venues', 'GET', '/venues', endpoint='main.venues'),
+    Route('venues page 2', 'GET', lambda ctx, i: f'/venues?cursor={ctx.venues_cursor}'),
+    Route('venue', 'GET', lambda ctx, i: f'/venues/{ctx.venue(i)}', endpoint='main.show_venue'),
+    Route('venue shows', 'GET', lambda ctx, i: f'/venues/{ctx.venue(i)}/shows/'
+          f'{("past", "upcoming")[i % 2]}?cursor={ctx.section_cursor()}', endpoint='main.venue_shows'),
+    Route('venue search', 'POST', '/venues/search',
+          lambda ctx, i: {'search_term': ctx.venue_names[i % len(ctx.venue_names)].split()[0]},
+          endpoint='main.search_venues'),
+    Route('venue edit form', 'GET', lambda ctx, i: f'/venues/{ctx.venue(i)}/edit', endpoint='main.edit_venue'),
+    Route('venue create form', 'GET', '/venues/create', endpoint='main.create_venue_form'),
+    Route('artists', 'GET', '/artists', endpoint='main.artists'),
+    Route('artists page 2', 'GET', lambda ctx, i: f'/artists?cursor={ctx.artists_cursor}'),
+    Route('artist', 'GET', lambda ctx, i: f'/artists/{ctx.artist(i)}', endpoint='main.show_artist'),
+    Route('artist shows', 'GET', lambda ctx, i: f'/artists/{ctx.artist(i)}/shows/'
+          f'{("past", "upcoming")[i % 2]}?cursor={ctx.section_cursor()}', endpoint='main.artist_shows'),
+    Route('artist search', 'POST', '/artists/search', {'search_term': 'band'}, endpoint='main.search_artists'),
+    Route('artist edit form', 'GET', lambda ctx, i: f'/artists/{ctx.artist(i)}/edit', endpoint='main.edit_artist'),
+    Route('artist create form', 'GET', '/artists/create', endpoint='main.create_artist_form'),
+    Route('shows', 'GET', '/shows', endpoint='main.shows'),
+    Route('shows page 2', 'GET', lambda ctx, i: f'/shows?cursor={ctx.shows_cursor}'),
+    Route('show create form', 'GET', '/shows/create', endpoint='main.create_shows'),
+    Route('autocomplete', 'GET', lambda ctx, i: f'/api/autocomplete?type=venue&q={"abcdefghijklmnopqrstuvwxyz"[i % 26]}',
+          endpoint='main.autocomplete'),
+    Route('pool stats', 'GET', '/stats/pool', endpoint='main.pool_stats_snapshot'),
+    Route('api venues', 'GET', '/api/v1/venues?per_page=50', endpoint='api_v1.listing'),
+    Route('api venues batch', 'GET', lambda ctx, i: '/api/v1/venues?ids=' + ','.join(map(str, ctx.venue_ids[:20]))),
+    Route('api artist', 'GET', lambda ctx, i: f'/api/v1/artists/{ctx.artist(i)}', endpoint='api_v1.detail'),
+    Route('export venues', 'GET', lambda ctx, i: '/export/venues?' + urlencode({'city': ctx.city, 'state': ctx.state}),
+          endpoint='export.export'),
+    Route('export shows', 'GET', lambda ctx, i: '/export/shows?format=csv&from={}&to={}'.format(
+        ctx.anchor.date().isoformat(), (ctx.anchor + timedelta(days=7)).date().isoformat())),
+    Route('health live', 'GET', '/health/live', endpoint='health.live'),
+    Route('health ready', 'GET', '/health/ready', endpoint='health.ready'),
+    Route('metrics', 'GET', '/metrics', endpoint='metrics.expose'),
+    # writes last: they change the catalog the reads above ran against
+    Route('venue create', 'POST', '/venues/create', _venue_form, endpoint='main.create_venue_submission'),
+    Route('venue edit', 'POST', lambda ctx, i: f'/venues/{ctx.venue(i)}/edit', _venue_form,
+          endpoint='main.edit_venue_submission'),
+    Route('artist create', 'POST', '/artists/create', _artist_form, endpoint='main.create_artist_submission'),
+    Route('artist edit', 'POST', lambda ctx, i: f'/artists/{ctx.artist(i)}/edit', _artist_form,
+          endpoint='main.edit_artist_submission'),
+    Route('show create', 'POST', '/shows/create', lambda ctx, i: {
+        'artist_id': str(ctx.artist(i)), 'venue_id': str(ctx.venue(i)),
+        'start_time': (ctx.anchor + timedelta(days=i % 30)).strftime('%Y-%m-%d %H:%M:%S')},
+        endpoint='main.create_show_submission'),
+    Route('venue delete', 'DELETE', lambda ctx, i: f'/venues/{ctx.created_venue_ids[i % len(ctx.created_venue_ids)]}',
+          endpoint='main.delete_venue', before=_remember_created_venues),
+]
+
+
+def uncovered_endpoints(app):
+    covered = {route.endpoint for route in ROUTES}
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered - {'static', 'assets.built'})
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_route(app, client, ctx, route, requests):
+    from models import db
+    if route.before:
+        with app.app_context():
+            route.before(ctx)
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    statuses = Counter()
+    for i in range(WARMUP):
+        path, form = route.request(ctx, requests + i)
+        client.open(path, method=route.method, data=form).get_data()
+
+    with app.app_context():
+        engine = db.engine
+    from sqlalchemy import event
+    event.listen(engine, 'before_cursor_execute', count)
+    timings = []
+    try:
+        for i in range(requests):
+            path, form = route.request(ctx, i)
+            started = time.perf_counter()
+            response = client.open(path, method=route.method, data=form)
+            response.get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    path, form = route.request(ctx, requests + WARMUP)
+    tracemalloc.start()
+    try:
+        client.open(path, method=route.method, data=form).get_data()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'queries': round(len(statements) / requests, 2),
+        'peak_kib': round(peak / 1024, 1),
+        'status': ','.join(str(code) for code, _ in statuses.most_common()),
+    }
+
+
+def regressions(name, result, base, tolerance):
+    found = []
+    if result['p95_ms'] > base['p95_ms'] * (1 + tolerance) and result['p95_ms'] - base['p95_ms'] > MIN_DELTA_MS:
+        found.append(f"p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+    if result['queries'] > base['queries']:
+        found.append(f"queries {base['queries']} -> {result['queries']}")
+    if result['peak_kib'] > base['peak_kib'] * (1 + tolerance) and result['peak_kib'] - base['peak_kib'] > MIN_DELTA_KIB:
+        found.append(f"peak {base['peak_kib']} -> {result['peak_kib']} KiB")
+    return found
+
+
+def report(results, baseline, tolerance):
+    header = f"{'route':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6} {'peak KiB':>9}  status"
+    print(header)
+    print('-' * len(header))
+    failed = []
+    for name, result in results.items():
+        line = (f"{name:<20} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f} "
+                f"{result['queries']:6.2f} {result['peak_kib']:9.1f}  {result['status']}")
+        base = (baseline or {}).get('routes', {}).get(name)
+        if base:
+            found = regressions(name, result, base, tolerance)
+            if found:
+                failed.append(name)
+                line += '  REGRESSED: ' + '; '.join(found)
+            else:
+                line += f"  (p95 {100 * (result['p95_ms'] / base['p95_ms'] - 1):+.0f}%)" if base['p95_ms'] else ''
+        print(line)
+    return failed
+
+
+def parser():
+    parser = dataset_parser()
+    parser.description = __doc__.strip().splitlines()[0]
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--reuse', action='store_true', help='BENCHMARK_DATABASE_URL already holds a generated catalog')
+    parser.add_argument('--only', help='run the routes whose name contains this')
+    parser.add_argument('--page-cache', action='store_true', help='leave the page cache on')
+    parser.add_argument('--save', metavar='PATH', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='fail on regressions against this baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    return parser
+
+
+def main(args):
+    scratch = tempfile.mkdtemp()
+    use_database('benchmark.db')
+    os.environ.setdefault('ACCESS_LOG', os.path.join(scratch, 'requests.jsonl'))
+    os.environ.setdefault('FLASK_DEBUG', '0')
+    # a route that grows an N+1 loop answers 500 and shows up in the status column
+    os.environ.setdefault('QUERY_REPEAT_STRICT', '1')
+    if not args.page_cache:
+        os.environ['PAGE_CACHE_BACKEND'] = 'none'
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from models import db
+
+    counts = sizes(args.scale, args.venues, args.artists, args.shows)
+    app = create_app()
+    with app.app_context():
+        if not args.reuse:
+            started = time.perf_counter()
+            reset_schema()
+            generate(seed=args.seed, **counts)
+            print(f"generated {counts} in {time.perf_counter() - started:.1f}s")
+        dialect = db.engine.dialect.name
+        ctx = Context(counts, args.seed)
+
+    missing = uncovered_endpoints(app)
+    if missing:
+        print('warning: no benchmark for ' + ', '.join(missing))
+
+    meta = {'counts': counts, 'seed': args.seed, 'dialect': dialect, 'requests': args.requests,
+            'page_cache': args.page_cache, 'async_detail_pages': app.config['ASYNC_DETAIL_PAGES'],
+            'python': platform.python_version(), 'machine': platform.node()}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        differs = [key for key in meta if key != 'requests' and baseline['meta'].get(key) != meta[key]]
+        if differs:
+            print('warning: baseline differs in ' + ', '.join(differs) + '; comparisons are not like for like')
+
+    client = app.test_client()
+    results = {}
+    for route in ROUTES:
+        if args.only and args.only not in route.name:
+            continue
+        results[route.name] = run_route(app, client, ctx, route, args.requests)
+
+    failed = report(results, baseline, args.tolerance)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'meta': meta, 'routes': results}, f, indent=2, sort_keys=True)
+        print(f'baseline written to {args.save}')
+    if failed:
+        print(f'{len(failed)} route(s) regressed: ' + ', '.join(failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parser().parse_args()))
@@ -0,0 +1,76 @@
+"""
+Asserts that the /venues listing issues a fixed number of queries no matter
+how many venues exist.
+
+    python benchmarks/venues_query_count.py [sizes...]
+
+Runs against a throwaway SQLite database unless BENCHMARK_DATABASE_URL is
+set (see benchmarks/scratch.py).
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from scratch import use_database
+use_database('venues_bench.db')
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, Venue, Artist, Show
+
+app = create_app()
+
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Seattle', 'WA')]
+
+
+def seed(num_venues):
+    db.drop_all()
+    db.create_all()
+    now = datetime.utcnow()
+    db.session.execute(Artist.__table__.insert(), [{'name': 'Benchmark Artist'}])
+    db.session.execute(Venue.__table__.insert(), [{
+        'name': f'Venue {i}',
+        'city': CITIES[i % len(CITIES)][0],
+        'state': CITIES[i % len(CITIES)][1]} for i in range(num_venues)])
+    db.session.execute(Show.__table__.insert(), [{
+        'artist_id': 1,
+        'venue_id': i + 1,
+        'start_time': now + timedelta(days=(i % 7) - 3)} for i in range(num_venues)])
+    db.session.commit()
+
+
+def count_queries(path):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        started = time.perf_counter()
+        response = app.test_client().get(path)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.status_code
+    return len(statements), elapsed
+
+
+def main(sizes):
+    counts = {}
+    with app.app_context():
+        for size in sizes:
+            seed(size)
+            counts[size], elapsed = count_queries('/venues')
+            print(f'{size:>7} venues: {counts[size]} queries, {elapsed * 1000:.1f} ms')
+        db.drop_all()
+    assert len(set(counts.values())) == 1, f'query count grows with venues: {counts}'
+    print('OK: query count is constant')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10, 1000, 20000])
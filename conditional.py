@@ -0,0 +1,148 @@
+import glob
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, current_app, make_response, request, session
+from sqlalchemy import func, select
+
+from assets import assets
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Conditional GET (ETag / Last-Modified / 304).
+#----------------------------------------------------------------------------#
+# Validators come from the updated_at columns through one small aggregate
+# query, so a revalidation that ends in 304 never runs the page query or
+# renders the template. Pages also change when an upcoming show starts and
+# moves into the past section, so the start time of the latest show that
+# has already started counts as a modification time as well.
+#
+# The same rows render differently after a deploy that changes the code,
+# templates or asset bundles, so every validator also carries the build:
+# APP_VERSION when set, the modification times of the app's modules and
+# templates, and the asset manifest (see build_version).
+
+_build = {}
+
+
+def build_version():
+    """Returns (digest, modification time) of the code, templates and assets serving the pages."""
+    app = current_app
+    key = (app.config.get('APP_VERSION'), assets.version)
+    if _build.get('key') != key or app.debug:
+        paths = sorted(glob.glob(os.path.join(app.root_path, '*.py')) +
+                       glob.glob(os.path.join(app.root_path, app.template_folder, '**', '*.html'), recursive=True))
+        stats = [(path, os.stat(path)) for path in paths]
+        digest = hashlib.sha1(repr([key] + [(path, s.st_size, s.st_mtime_ns) for path, s in stats]).encode('utf-8'))
+        mtime = max(s.st_mtime for _, s in stats)
+        _build.update(key=key, digest=digest.hexdigest(),
+                      mtime=datetime.fromtimestamp(mtime, timezone.utc).replace(tzinfo=None))
+    return _build['digest'], _build['mtime']
+
+
+def _latest(*values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else datetime(1970, 1, 1)
+
+
+def _validators(*parts):
+    """Returns (etag, last_modified) for the given timestamps/counts and the build; datetimes feed Last-Modified."""
+    build, built_at = build_version()
+    last_modified = _latest(built_at, *[p for p in parts if isinstance(p, datetime)])
+    raw = '|'.join(str(p) for p in parts) + '|' + build + '|' + request.full_path
+    etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return etag, last_modified
+
+
+def _detail_validators(model, id, show_fk, counterpart, counterpart_fk, now):
+    row = db.session.execute(
+        select(
+            model.updated_at,
+            func.max(Show.updated_at),
+            func.max(counterpart.updated_at),
+            func.count(Show.id),
+            func.max(Show.start_time).filter(Show.start_time <= now))
+        .select_from(model)
+        .outerjoin(Show, show_fk == model.id)
+        .outerjoin(counterpart, counterpart.id == counterpart_fk)
+        .where(model.id == id)
+        .group_by(model.id, model.updated_at)
+    ).first()
+    if row is None:
+        return None
+    return _validators(*row)
+
+
+def venue_validators(now, venue_id):
+    return _detail_validators(Venue, venue_id, Show.venue_id, Artist, Show.artist_id, now)
+
+
+def artist_validators(now, artist_id):
+    return _detail_validators(Artist, artist_id, Show.artist_id, Venue, Show.venue_id, now)
+
+
+def venues_listing_validators(now):
+    row = db.session.execute(select(
+        select(func.max(Venue.updated_at)).scalar_subquery(),
+        select(func.count(Venue.id)).scalar_subquery(),
+        select(func.max(Show.updated_at)).scalar_subquery(),
+        select(func.count(Show.id)).scalar_subquery(),
+        select(func.max(Show.start_time)).where(Show.start_time <= now).scalar_subquery(),
+    )).first()
+    return _validators(*row)
+
+
+def artists_listing_validators(now):
+    row = db.session.execute(select(func.max(Artist.updated_at), func.count(Artist.id))).first()
+    return _validators(*row)
+
+
+def shows_listing_validators(now):
+    row = db.session.execute(select(
+        select(func.max(Show.updated_at)).scalar_subquery(),
+        select(func.count(Show.id)).scalar_subquery(),
+        select(func.max(Venue.updated_at)).scalar_subquery(),
+        select(func.max(Artist.updated_at)).scalar_subquery(),
+    )).first()
+    return _validators(*row)
+
+
+def _is_fresh(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    if since is not None:
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def conditional(compute):
+    """
+    Decorates a GET view with validators from compute(now, **view_args).
+    compute returns (etag, last_modified) or None to skip validation (e.g.
+    the entity does not exist). Requests with a pending flash message are
+    user specific and always rendered.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(**kwargs):
+            if session.get('_flashes'):
+                return view(**kwargs)
+            validators = compute(datetime.utcnow(), **kwargs)
+            if validators is None:
+                return view(**kwargs)
+            etag, last_modified = validators
+            if _is_fresh(etag, last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapped
+    return decorator
@@ -1,11 +1,13 @@
 import os
 from urllib.parse import quote_plus
+from sqlalchemy.pool import NullPool
+from pool_stats import InstrumentedQueuePool
 SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode (FLASK_DEBUG=0 turns it off; gunicorn.conf.py and asgi.py do so by default).
+DEBUG = os.getenv('FLASK_DEBUG', '1') == '1'
 
 # Connect to the database
 
@@ -18,5 +20,129 @@ DB_NAME = os.getenv('DB_NAME', 'fyyurApp')
 encoded_password = quote_plus(str(DB_PASSWORD))
 
 
-SQLALCHEMY_DATABASE_URI = f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL overrides the discrete DB_* settings (e.g. sqlite:///bench.db for benchmarks)
+SQLALCHEMY_DATABASE_URI = os.getenv(
+    'DATABASE_URL',
+    f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool. DB_PGBOUNCER=1 leaves pooling to PgBouncer in transaction
+# mode: no client-side pool (NullPool) and no server-side prepared statements,
+# which PgBouncer cannot route between backends.
+DB_POOL_SLOW_CHECKOUT_MS = float(os.getenv('DB_POOL_SLOW_CHECKOUT_MS', '100'))
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+}
+if os.getenv('DB_PGBOUNCER', '0') == '1':
+    SQLALCHEMY_ENGINE_OPTIONS['poolclass'] = NullPool
+    if SQLALCHEMY_DATABASE_URI.startswith('postgresql+psycopg:'):
+        SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {'prepare_threshold': None}
+elif SQLALCHEMY_DATABASE_URI not in ('sqlite://', 'sqlite:///:memory:'):
+    SQLALCHEMY_ENGINE_OPTIONS.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        # seconds; recycle before server or proxy idle timeouts close connections
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        pool_use_lifo=os.getenv('DB_POOL_USE_LIFO', '0') == '1',
+    )
+
+# Read replicas (comma separated URLs). GET/HEAD requests read from them
+# round-robin unless the user wrote something in the last REPLICA_PIN_SECONDS;
+# a failing replica is skipped for REPLICA_RETRY_SECONDS.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+
+# Per-request SQL instrumentation. Requests slower than SLOW_REQUEST_MS are
+# logged with their query count and DB time; a statement repeated more than
+# QUERY_REPEAT_THRESHOLD times in one request is logged as a likely N+1, and
+# fails the request when QUERY_REPEAT_STRICT=1 (for tests and benchmarks).
+# SERVER_TIMING adds Server-Timing headers; off outside debug mode so timings
+# are not handed to every client.
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '10'))
+QUERY_REPEAT_STRICT = os.getenv('QUERY_REPEAT_STRICT', '0') == '1'
+SERVER_TIMING = os.getenv('SERVER_TIMING', '1' if DEBUG else '0') == '1'
+
+# Release identifier (e.g. the git commit) mixed into the page ETags, so a
+# deploy never answers 304 for HTML rendered by the previous release. The
+# modification times of the code and templates and the asset manifest are
+# mixed in as well, so it is optional.
+APP_VERSION = os.getenv('APP_VERSION')
+
+# Logging outside debug mode: errors to ERROR_LOG and a JSON line per request
+# (route, status, latency, queries, bytes) to ACCESS_LOG (empty disables it),
+# written by a background thread in batches of up to LOG_BATCH_SIZE. Records
+# beyond LOG_QUEUE_SIZE waiting to be written are dropped and counted instead
+# of blocking requests. Both files rotate at LOG_MAX_BYTES.
+ERROR_LOG = os.getenv('ERROR_LOG', 'error.log')
+ACCESS_LOG = os.getenv('ACCESS_LOG', 'requests.jsonl')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '256'))
+
+# /metrics (Prometheus text format). With several worker processes they must
+# share METRICS_DIR, where each writes its totals every METRICS_FLUSH_SECONDS
+# (gunicorn.conf.py sets a fresh one per server start); unset, /metrics only
+# covers the process that answers it.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '1'))
+
+# Serve the hashed, minified and precompressed files `flask assets build`
+# writes to static/build (cached as immutable). Off in debug mode so edits to
+# the source files show up without a rebuild.
+ASSETS_BUILD = os.getenv('ASSETS_BUILD', '0' if DEBUG else '1') == '1'
+
+# Load the venue/artist detail pages with their queries run concurrently over
+# SQLAlchemy asyncio (asyncpg, or aiosqlite for SQLite). ASYNC_DATABASE_URL
+# defaults to SQLALCHEMY_DATABASE_URI with the async driver. Those queries go
+# around the sync engines, so the pages give up what hangs off them: they
+# always read from ASYNC_DATABASE_URL (no replica offload, even with
+# DATABASE_REPLICA_URLS set) and their queries are missing from Server-Timing,
+# the N+1 check (QUERY_REPEAT_STRICT), slow-request logs and the query
+# metrics.
+ASYNC_DETAIL_PAGES = os.getenv('ASYNC_DETAIL_PAGES', '0') == '1'
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
+
+# Number of results per page on the venue/artist search pages
+SEARCH_RESULTS_PER_PAGE = int(os.getenv('SEARCH_RESULTS_PER_PAGE', '20'))
+
+# Typeahead: maximum suggestions per request and characters indexed per key
+AUTOCOMPLETE_LIMIT = int(os.getenv('AUTOCOMPLETE_LIMIT', '10'))
+AUTOCOMPLETE_MAX_NAME_LENGTH = int(os.getenv('AUTOCOMPLETE_MAX_NAME_LENGTH', '40'))
+# Each process's index sees only its own commits; at most this often a lookup
+# also checks the tables for writes made elsewhere (other workers, `flask
+# import`) and patches them in. 0 turns the check off.
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '30'))
+
+# Rows per page on the /venues, /artists and /shows listings
+LISTING_PAGE_SIZE = int(os.getenv('LISTING_PAGE_SIZE', '50'))
+
+# Shows per section (upcoming/past) on the venue and artist pages and per "Load more" slice
+DETAIL_SHOWS_PER_SECTION = int(os.getenv('DETAIL_SHOWS_PER_SECTION', '12'))
+
+# Stream /venues and /shows from a server-side cursor while rendering
+# (also per request with ?stream=1); chunks are flushed every STREAM_CHUNK_SIZE bytes
+STREAM_LISTINGS = os.getenv('STREAM_LISTINGS', '0') == '1'
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '16384'))
+
+# Rendered venue/artist detail pages: 'memory' (per-process LRU), 'redis'
+# (shared between workers, needs PAGE_CACHE_URL) or 'none'. A memory cache
+# only sees the writes of its own process, so it is for a single process:
+# gunicorn.conf.py turns it off for several workers, and pages another
+# process changes (e.g. `flask import`) stay stale until PAGE_CACHE_TTL.
+PAGE_CACHE_BACKEND = os.getenv('PAGE_CACHE_BACKEND', 'memory')
+PAGE_CACHE_URL = os.getenv('PAGE_CACHE_URL')
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', '300'))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '1000'))
+PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Rows fetched per round trip by the /export endpoints' server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '2000'))
+
+# Upper bounds for /api/v1 listing pages and ids= batch lookups
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '200'))
+API_MAX_BATCH_IDS = int(os.getenv('API_MAX_BATCH_IDS', '100'))
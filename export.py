@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import select
+
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Streaming exports: /export/shows, /export/venues, /export/artists
+#----------------------------------------------------------------------------#
+# Rows come from a server-side cursor (yield_per, which turns on
+# stream_results) and are serialized one partition at a time, so memory
+# stays flat no matter how many rows are exported.
+
+export_bp = Blueprint('export', __name__, url_prefix='/export')
+
+VENUE_COLUMNS = [Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.phone,
+                 Venue.website, Venue.facebook_link, Venue.image_link, Venue.seeking_talent,
+                 Venue.seeking_description, Venue.updated_at]
+ARTIST_COLUMNS = [Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone,
+                  Artist.website, Artist.facebook_link, Artist.image_link, Artist.seeking_venue,
+                  Artist.seeking_description, Artist.updated_at]
+SHOW_COLUMNS = [Show.id, Show.start_time, Show.venue_id, Venue.name.label('venue_name'),
+                Venue.city.label('venue_city'), Venue.state.label('venue_state'),
+                Show.artist_id, Artist.name.label('artist_name'), Show.updated_at]
+
+
+class BadExportRequest(ValueError):
+    pass
+
+
+def _parse_datetime(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise BadExportRequest(f'{name} must be an ISO 8601 date or datetime')
+
+
+def _filter_place(stmt, model):
+    for name in ('city', 'state'):
+        value = request.args.get(name)
+        if value:
+            stmt = stmt.where(getattr(model, name) == value)
+    return stmt
+
+
+def _venues_statement():
+    return _filter_place(select(*VENUE_COLUMNS), Venue).order_by(Venue.id)
+
+
+def _artists_statement():
+    return _filter_place(select(*ARTIST_COLUMNS), Artist).order_by(Artist.id)
+
+
+def _shows_statement():
+    stmt = (
+        select(*SHOW_COLUMNS)
+        .join(Venue, Venue.id == Show.venue_id)
+        .join(Artist, Artist.id == Show.artist_id)
+    )
+    start, end = _parse_datetime('from'), _parse_datetime('to')
+    if start is not None:
+        stmt = stmt.where(Show.start_time >= start)
+    if end is not None:
+        stmt = stmt.where(Show.start_time < end)
+    return _filter_place(stmt, Venue).order_by(Show.id)
+
+
+STATEMENTS = {
+    'venues': _venues_statement,
+    'artists': _artists_statement,
+    'shows': _shows_statement,
+}
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson(result):
+    for partition in result.partitions():
+        yield ''.join(
+            json.dumps({key: _value(value) for key, value in row._mapping.items()}) + '\n'
+            for row in partition)
+
+
+def _csv(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    for partition in result.partitions():
+        writer.writerows([_value(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@export_bp.route('/<any(shows, venues, artists):kind>')
+def export(kind):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        stmt = STATEMENTS[kind]()
+    except BadExportRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = db.session.execute(
+        stmt, execution_options={'yield_per': current_app.config['EXPORT_BATCH_SIZE']})
+    if fmt == 'csv':
+        body, mimetype = _csv(result), 'text/csv'
+    else:
+        body, mimetype = _ndjson(result), 'application/x-ndjson'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{fmt}'
+    return response
@@ -1,3 +1,5 @@
+import os
+
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
@@ -5,10 +7,13 @@ from fabric.contrib.console import confirm
 
 
 def test():
+    # the unit tests and the benchmark scripts each drop and rebuild a
+    # temporary SQLite database of their own
+    command = "python -m pytest -q && python benchmarks/explain_check.py && python benchmarks/suite.py"
+    if os.path.exists("benchmarks/baseline.json"):
+        command += " --compare benchmarks/baseline.json"
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local(command, capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
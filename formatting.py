@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import dateutil.parser
+from babel import Locale
+from babel.dates import parse_pattern
+
+#----------------------------------------------------------------------------#
+# Date formatting for the templates.
+#----------------------------------------------------------------------------#
+# Show times are stored as naive UTC datetimes and handed to the templates
+# as they come from the database. The babel patterns and locales are parsed
+# once, and formatted results are memoized, since the same shows come up on
+# page after page. A timezone (IANA name, e.g. the venue's) converts the time
+# before formatting; without one, or with a name that is not known, it is
+# shown in UTC.
+
+PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=None)
+def _pattern(format):
+    return parse_pattern(PATTERNS.get(format, format))
+
+
+@lru_cache(maxsize=None)
+def _locale(name):
+    return Locale.parse(name)
+
+
+@lru_cache(maxsize=None)
+def _zone(name):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=8192)
+def _format(value, format, tz, locale):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    zone = _zone(tz) if tz else None
+    if zone is not None:
+        value = value.astimezone(zone)
+    return _pattern(format).apply(value, _locale(locale))
+
+
+def format_datetime(value, format='medium', tz=None, locale='en'):
+    """Formats a datetime (or an ISO date string) with a named or babel pattern."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            value = dateutil.parser.parse(value)
+    return _format(value, format, tz, locale)
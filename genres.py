@@ -0,0 +1,123 @@
+import threading
+
+from sqlalchemy import event, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models import db, Genre
+
+#----------------------------------------------------------------------------#
+# Bulk genre resolution.
+#----------------------------------------------------------------------------#
+# The genre vocabulary is tiny and rows are never deleted by the app, so a
+# process-wide name -> id cache answers nearly every lookup. Misses cost one
+# SELECT ... WHERE name IN (...) and one INSERT ... ON CONFLICT DO NOTHING
+# RETURNING for names that do not exist yet.
+#
+# Ids from rows inserted by the current transaction are only cached once it
+# commits. When another worker inserts the same name concurrently the
+# INSERT waits for it and returns nothing, so those names are selected
+# again. A rollback clears the cache entirely, so an id that went stale
+# outside the app is reloaded after the failed write.
+
+class GenreCache:
+    def __init__(self):
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        return self._ids.get(name)
+
+    def update(self, mapping):
+        with self._lock:
+            self._ids.update(mapping)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+genre_cache = GenreCache()
+
+
+def _normalize(genre_names):
+    names = []
+    for g in genre_names:
+        name = g.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _select_ids(names):
+    return dict(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(names)).all())
+
+
+def _insert_ids(names):
+    dialect = db.session.get_bind().dialect.name
+    rows = [{'name': name} for name in names]
+    if dialect in ('postgresql', 'sqlite'):
+        insert_ = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = (insert_(Genre).values(rows).on_conflict_do_nothing(index_elements=['name'])
+                .returning(Genre.name, Genre.id))
+        return dict(db.session.execute(stmt).all())
+    inserted = {}
+    for row in rows:
+        inserted[row['name']] = db.session.execute(
+            insert(Genre).values(row).returning(Genre.id)).scalar_one()
+    return inserted
+
+
+def resolve_genre_ids(genre_names):
+    """
+    Maps genre names to ids, creating missing genres. Returns {name: id} for
+    the stripped, non-empty names. Commit is left to the caller.
+    """
+    names = _normalize(genre_names)
+    ids = {name: genre_cache.get(name) for name in names}
+    missing = [name for name, id in ids.items() if id is None]
+    if not missing:
+        return ids
+
+    found = _select_ids(missing)
+    genre_cache.update(found)
+    ids.update(found)
+    missing = [name for name in missing if name not in found]
+    if missing:
+        inserted = _insert_ids(missing)
+        db.session.info.setdefault('genre_ids_pending', {}).update(inserted)
+        ids.update(inserted)
+        raced = [name for name in missing if name not in inserted]
+        if raced:
+            found = _select_ids(raced)
+            genre_cache.update(found)
+            ids.update(found)
+    return ids
+
+
+def get_or_create_genres(genre_names):
+    """
+    Accepts an iterable of genre names (strings).
+    Returns a list of Genre objects (existing or newly created).
+    """
+    genres = []
+    for name, id in resolve_genre_ids(genre_names).items():
+        genre = Genre(id=id, name=name)
+        # attach as an already persisted row, without querying for it
+        make_transient_to_detached(genre)
+        genres.append(db.session.merge(genre, load=False))
+    return genres
+
+
+@event.listens_for(Session, 'after_commit')
+def _cache_committed_genres(session):
+    genre_cache.update(session.info.pop('genre_ids_pending', {}))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_genre_cache(session):
+    session.info.pop('genre_ids_pending', None)
+    genre_cache.clear()
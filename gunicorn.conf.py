@@ -0,0 +1,48 @@
+import glob
+import multiprocessing
+import os
+import tempfile
+
+#----------------------------------------------------------------------------#
+# Production server: gunicorn --config gunicorn.conf.py 'app:create_app()'
+#----------------------------------------------------------------------------#
+# The app is imported once in the master (preload_app) and forked into
+# WEB_CONCURRENCY workers of GUNICORN_THREADS threads each. post_fork drops
+# the database connections and log handles each worker inherits. Workers
+# pool their /metrics totals through METRICS_DIR, a fresh directory per
+# server start unless set.
+#
+# The memory page cache is per process, so a write would only clear the
+# pages of the worker that made it and the others would serve stale pages
+# until PAGE_CACHE_TTL. Several workers need PAGE_CACHE_BACKEND=redis; left
+# unset, the page cache is off for them and asking for memory is refused.
+
+os.environ.setdefault('FLASK_DEBUG', '0')
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='fyyur-metrics-'))
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+if workers > 1:
+    os.environ.setdefault('PAGE_CACHE_BACKEND', 'none')
+    if os.environ['PAGE_CACHE_BACKEND'] == 'memory':
+        raise SystemExit(f'PAGE_CACHE_BACKEND=memory is per process and cannot be invalidated across '
+                         f'{workers} workers; use redis (PAGE_CACHE_URL), none, or WEB_CONCURRENCY=1')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# recycle workers now and then so slow leaks cannot accumulate
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+preload_app = True
+
+
+def on_starting(server):
+    # totals left by a previous server in the same directory would be counted again
+    for pattern in ('*.json', '*.retiring'):
+        for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], pattern)):
+            os.remove(path)
+
+
+def post_fork(server, worker):
+    from app import init_worker
+    init_worker(server.app.wsgi())
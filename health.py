@@ -0,0 +1,30 @@
+from flask import Blueprint, current_app, jsonify
+
+from schema import DatabaseUnavailable, schema_status
+
+#----------------------------------------------------------------------------#
+# Liveness and readiness probes.
+#----------------------------------------------------------------------------#
+# /health/live never touches the database, so a slow database does not get
+# healthy workers restarted. /health/ready answers 503 until the database is
+# reachable and its schema is at the migration head.
+
+health_bp = Blueprint('health', __name__, url_prefix='/health')
+
+
+@health_bp.route('/live')
+def live():
+    return jsonify({"status": "ok"})
+
+
+@health_bp.route('/ready')
+def ready():
+    try:
+        up_to_date, current, heads = schema_status()
+    except DatabaseUnavailable as e:
+        current_app.logger.warning("Readiness check failed: database unavailable: %s", e)
+        return jsonify({"status": "unavailable", "reason": "database unavailable"}), 503
+    body = {"revision": sorted(current), "head": sorted(heads)}
+    if not up_to_date:
+        return jsonify(dict(body, status="unavailable", reason="schema not at head")), 503
+    return jsonify(dict(body, status="ready"))
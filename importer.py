@@ -0,0 +1,263 @@
+import csv
+import io
+import json
+import os
+import time
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+from werkzeug.datastructures import MultiDict
+
+from models import db, Venue, Artist, Show, venue_genres, artist_genres, build_search_text
+from forms import VenueForm, ArtistForm, ShowForm
+from genres import resolve_genre_ids
+
+#----------------------------------------------------------------------------#
+# Bulk import: flask import venues|artists|shows FILE
+#----------------------------------------------------------------------------#
+# Rows stream from CSV or JSONL and are validated with the same WTForms
+# classes as the create pages. Valid rows are written in batches, one
+# transaction per batch, with genres resolved once per batch. On PostgreSQL,
+# shows are loaded with COPY; everything else uses executemany.
+#
+# After each committed batch the number of input rows consumed is written to
+# FILE.checkpoint, and --resume skips that many rows. A crash between a
+# commit and the checkpoint write re-imports at most one batch.
+
+import_cli = AppGroup('import', help='Bulk import venues, artists and shows from CSV or JSONL.')
+
+TRUE_VALUES = ('true', '1', 'yes', 'y')
+
+
+def read_rows(path):
+    """Yields dicts from a .csv file or a JSON-lines file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _formdata(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if key == 'genres' and isinstance(value, str):
+            value = [g for g in value.replace(';', ',').split(',') if g.strip()]
+        if key == 'website':
+            key = 'website_link'
+        if isinstance(value, list):
+            for item in value:
+                data.add(key, str(item).strip())
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+_forms = {}
+
+
+def _validate(form_class, row):
+    """Validates row with one reused form per class; binding fields dominates construction cost."""
+    form = _forms.get(form_class)
+    if form is None:
+        form = _forms[form_class] = form_class(meta={'csrf': False})
+    form.process(_formdata(row))
+    if form.validate():
+        return form, None
+    return None, '; '.join(f'{field}: {", ".join(errors)}' for field, errors in form.errors.items())
+
+
+def _flag(value):
+    return str(value).lower() in TRUE_VALUES
+
+
+def _venue_values(form):
+    return {
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'address': form.address.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'website': form.website_link.data,
+        'seeking_talent': _flag(form.seeking_talent.data),
+        'seeking_description': form.seeking_description.data,
+    }
+
+
+def _artist_values(form):
+    return {
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'website': form.website_link.data,
+        'seeking_venue': _flag(form.seeking_venue.data),
+        'seeking_description': form.seeking_description.data,
+    }
+
+
+def _load_entities(model, link_table, fk, batch):
+    """Inserts (values, genre names) pairs and their genre links; returns rows written."""
+    genre_ids = resolve_genre_ids({g for _, names in batch for g in names})
+    for values, names in batch:
+        values['search_text'] = build_search_text(values['name'], values['city'], values['state'], names)
+    ids = db.session.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        [values for values, _ in batch]).all()
+    links = [{fk: id, 'genre_id': genre_ids[g]}
+             for id, (_, names) in zip(ids, batch) for g in dict.fromkeys(names)]
+    if links:
+        db.session.execute(insert(link_table), links)
+    return len(ids)
+
+
+def _load_venues(batch):
+    return _load_entities(Venue, venue_genres, 'venue_id', batch)
+
+
+def _load_artists(batch):
+    return _load_entities(Artist, artist_genres, 'artist_id', batch)
+
+
+def _existing_ids(model, ids):
+    return set(db.session.scalars(select(model.id).where(model.id.in_(ids))))
+
+
+def _load_shows(batch):
+    artists = _existing_ids(Artist, {row['artist_id'] for row in batch})
+    venues = _existing_ids(Venue, {row['venue_id'] for row in batch})
+    rows = [row for row in batch if row['artist_id'] in artists and row['venue_id'] in venues]
+    skipped = len(batch) - len(rows)
+    if skipped:
+        click.echo(f'  skipped {skipped} shows referencing unknown artists or venues', err=True)
+    if not rows:
+        return 0
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver in COPY_DRIVERS:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (row['artist_id'], row['venue_id'], row['start_time'].isoformat()) for row in rows)
+        buffer.seek(0)
+        with connection.connection.cursor() as cursor:
+            COPY_DRIVERS[connection.dialect.driver](cursor, SHOWS_COPY, buffer)
+    else:
+        # other drivers (pg8000, asyncpg, SQLite) take the executemany path
+        db.session.execute(insert(Show), rows)
+    # bulk statements fire no flush events: queue the pages that list these
+    # shows for page_cache's invalidation when the batch commits
+    db.session.info.setdefault('page_cache_keys', set()).update(
+        [f'venue:{row["venue_id"]}' for row in rows] + [f'artist:{row["artist_id"]}' for row in rows])
+    return len(rows)
+
+
+SHOWS_COPY = 'COPY shows (artist_id, venue_id, start_time) FROM STDIN WITH (FORMAT csv)'
+
+
+def _copy_psycopg(cursor, statement, buffer):
+    with cursor.copy(statement) as copy:
+        copy.write(buffer.getvalue())
+
+
+# DBAPI driver name -> how it streams a COPY FROM STDIN
+COPY_DRIVERS = {
+    'psycopg2': lambda cursor, statement, buffer: cursor.copy_expert(statement, buffer),
+    'psycopg': _copy_psycopg,
+}
+
+
+def _prepare_venue(row):
+    form, error = _validate(VenueForm, row)
+    return error if form is None else (_venue_values(form), form.genres.data)
+
+
+def _prepare_artist(row):
+    form, error = _validate(ArtistForm, row)
+    return error if form is None else (_artist_values(form), form.genres.data)
+
+
+def _prepare_show(row):
+    form, error = _validate(ShowForm, row)
+    if form is None:
+        return error
+    try:
+        return {'artist_id': int(form.artist_id.data), 'venue_id': int(form.venue_id.data),
+                'start_time': form.start_time.data}
+    except (TypeError, ValueError):
+        return 'artist_id/venue_id: must be integers'
+
+
+KINDS = {
+    'venues': (_prepare_venue, _load_venues),
+    'artists': (_prepare_artist, _load_artists),
+    'shows': (_prepare_show, _load_shows),
+}
+
+
+def run_import(kind, path, batch_size=5000, resume=False, max_errors=20):
+    """Imports path; returns (rows written, rows rejected, seconds)."""
+    prepare, load = KINDS[kind]
+    checkpoint = path + '.checkpoint'
+    skip = 0
+    if resume and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            skip = json.load(f)['rows_done']
+        click.echo(f'resuming after {skip} rows')
+
+    started = time.perf_counter()
+    written = rejected = 0
+    consumed = skip
+    batch = []
+
+    def flush():
+        nonlocal written
+        try:
+            written += load(batch) if batch else 0
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        with open(checkpoint, 'w') as f:
+            json.dump({'rows_done': consumed}, f)
+        batch.clear()
+        elapsed = time.perf_counter() - started
+        click.echo(f'  {consumed} rows read, {written} written, {rejected} rejected '
+                   f'({written / elapsed:,.0f} rows/s)')
+
+    for line_no, row in enumerate(read_rows(path), start=1):
+        if line_no <= skip:
+            continue
+        consumed = line_no
+        prepared = prepare(row)
+        if isinstance(prepared, str):
+            rejected += 1
+            if rejected <= max_errors:
+                click.echo(f'  row {line_no}: {prepared}', err=True)
+            continue
+        batch.append(prepared)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return written, rejected, time.perf_counter() - started
+
+
+def _command(kind):
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', default=5000, show_default=True, help='Rows per transaction.')
+    @click.option('--resume', is_flag=True, help='Skip the rows recorded in PATH.checkpoint.')
+    def command(path, batch_size, resume):
+        written, rejected, elapsed = run_import(kind, path, batch_size, resume)
+        click.echo(f'imported {written} {kind} in {elapsed:.1f}s '
+                   f'({written / max(elapsed, 1e-9):,.0f} rows/s), {rejected} rejected')
+    command.__doc__ = f'Import {kind} from a CSV or JSONL file.'
+    return import_cli.command(kind)(command)
+
+
+for _kind in KINDS:
+    _command(_kind)
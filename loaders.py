@@ -0,0 +1,233 @@
+import asyncio
+
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import selectinload
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from async_db import async_db
+from pagination import encode_cursor, decode_cursor
+
+#----------------------------------------------------------------------------#
+# Read-side loaders for the venue and artist detail pages.
+#----------------------------------------------------------------------------#
+# Each loader costs a fixed number of queries regardless of how many shows
+# the venue or artist has: the entity with its genres (selectinload), then
+# the first `limit` shows of the upcoming and past sections, with both
+# section sizes, from one windowed query. The async variants send the same
+# three queries concurrently. The rest of a section is paged in by cursor
+# with load_venue_shows/load_artist_shows.
+
+def _sections(rows, make_item):
+    """
+    Splits ranked show rows (see _ranked_shows) into the page's sections.
+    Returns (past_shows, past count, upcoming_shows, upcoming count,
+    start time of the next upcoming show).
+    """
+    past_shows, upcoming_shows = [], []
+    counts = {True: 0, False: 0}
+    next_show_start = None
+    for row in rows:
+        upcoming = bool(row.upcoming)
+        counts[upcoming] = row.section_count
+        if upcoming:
+            if next_show_start is None:
+                next_show_start = row.start_time
+            upcoming_shows.append(make_item(row))
+        else:
+            past_shows.append(make_item(row))
+    return past_shows, counts[False], upcoming_shows, counts[True], next_show_start
+
+
+def _section_order(upcoming):
+    # upcoming shows soonest first, past shows most recent first
+    return [case((upcoming, Show.start_time)), case((upcoming, Show.id)),
+            Show.start_time.desc(), Show.id.desc()]
+
+
+def _with_venue_timezone(query, counterpart):
+    # the times on the tiles are shown in the venue's timezone
+    query = query.add_columns(Venue.timezone.label('venue_timezone'))
+    if counterpart is not Venue:
+        query = query.join(Venue, Venue.id == Show.venue_id)
+    return query
+
+
+def _ranked_shows(counterpart, counterpart_fk, show_fk, id, now, limit):
+    """
+    The first limit shows of each section in one windowed query, with the
+    section sizes counted over the same window.
+    """
+    upcoming = Show.start_time > now
+    ranked = _with_venue_timezone(
+        select(Show.id.label('show_id'), Show.start_time, counterpart.id, counterpart.name,
+               counterpart.image_link, upcoming.label('upcoming'),
+               func.row_number().over(partition_by=upcoming, order_by=_section_order(upcoming)).label('rank'),
+               func.count().over(partition_by=upcoming).label('section_count'))
+        .join(counterpart, counterpart.id == counterpart_fk)
+        .where(show_fk == id), counterpart
+    ).subquery()
+    return select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.upcoming, ranked.c.rank)
+
+
+def _venue_shows(venue_id, now, limit):
+    return _ranked_shows(Artist, Show.artist_id, Show.venue_id, venue_id, now, limit)
+
+
+def _artist_shows(artist_id, now, limit):
+    return _ranked_shows(Venue, Show.venue_id, Show.artist_id, artist_id, now, limit)
+
+
+def _section_cursor(items, count, limit):
+    if count <= limit or not items:
+        return None
+    return encode_cursor([items[-1]["start_time"], items[-1]["show_id"]], 'next')
+
+
+def _venue_item(row):
+    return {
+        "show_id": row.show_id,
+        "artist_id": row.id,
+        "artist_name": row.name,
+        "artist_image_link": row.image_link,
+        "start_time": row.start_time,
+        "venue_timezone": row.venue_timezone}
+
+
+def _artist_item(row):
+    return {
+        "show_id": row.show_id,
+        "venue_id": row.id,
+        "venue_name": row.name,
+        "venue_image_link": row.image_link,
+        "start_time": row.start_time,
+        "venue_timezone": row.venue_timezone}
+
+
+def _venue_detail(venue, genres, rows, limit):
+    past_shows, past_count, upcoming_shows, upcoming_count, next_show_start = _sections(rows, _venue_item)
+
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "city": venue.city,
+        "state": venue.state,
+        "address": venue.address,
+        "genres": genres,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "upcoming_shows_count": upcoming_count,
+        "upcoming_shows": upcoming_shows,
+        "upcoming_shows_cursor": _section_cursor(upcoming_shows, upcoming_count, limit),
+        "past_shows_count": past_count,
+        "past_shows": past_shows,
+        "past_shows_cursor": _section_cursor(past_shows, past_count, limit),
+        "next_show_start": next_show_start,
+    }
+
+
+def _artist_detail(artist, genres, rows, limit):
+    past_shows, past_count, upcoming_shows, upcoming_count, next_show_start = _sections(rows, _artist_item)
+
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "facebook_link": artist.facebook_link,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_cursor": _section_cursor(past_shows, past_count, limit),
+        "upcoming_shows_cursor": _section_cursor(upcoming_shows, upcoming_count, limit),
+        "next_show_start": next_show_start,
+    }
+
+
+def load_venue_detail(venue_id, now, limit=12):
+    """Returns the show_venue page data for venue_id, or None if it does not exist."""
+    venue = db.session.get(Venue, venue_id, options=[selectinload(Venue.genres)])
+    if venue is None:
+        return None
+    rows = db.session.execute(_venue_shows(venue_id, now, limit))
+    return _venue_detail(venue, [g.name for g in venue.genres], rows, limit)
+
+
+def load_artist_detail(artist_id, now, limit=12):
+    """Returns the show_artist page data for artist_id, or None if it does not exist."""
+    artist = db.session.get(Artist, artist_id, options=[selectinload(Artist.genres)])
+    if artist is None:
+        return None
+    rows = db.session.execute(_artist_shows(artist_id, now, limit))
+    return _artist_detail(artist, [g.name for g in artist.genres], rows, limit)
+
+
+def _genre_names(link, fk, id):
+    return select(Genre.name).join(link, link.c.genre_id == Genre.id).where(fk == id)
+
+
+async def _load_async(model, id, link, fk, shows, build, now, limit):
+    entity, genres, rows = await asyncio.gather(
+        async_db.first(select(model.__table__).where(model.id == id)),
+        async_db.scalars(_genre_names(link, fk, id)),
+        async_db.all(shows(id, now, limit)))
+    if entity is None:
+        return None
+    return build(entity, list(genres), rows, limit)
+
+
+async def load_venue_detail_async(venue_id, now, limit=12):
+    """load_venue_detail with the venue, genre and show queries in flight at once."""
+    return await async_db.run(_load_async(
+        Venue, venue_id, venue_genres, venue_genres.c.venue_id, _venue_shows, _venue_detail, now, limit))
+
+
+async def load_artist_detail_async(artist_id, now, limit=12):
+    """load_artist_detail with the artist, genre and show queries in flight at once."""
+    return await async_db.run(_load_async(
+        Artist, artist_id, artist_genres, artist_genres.c.artist_id, _artist_shows, _artist_detail, now, limit))
+
+
+#----------------------------------------------------------------------------#
+# "Load more" slices of a detail page section.
+#----------------------------------------------------------------------------#
+
+def _show_slice(counterpart, counterpart_fk, show_fk, id, section, now, cursor, limit, make_item):
+    upcoming = section == 'upcoming'
+    query = _with_venue_timezone(
+        select(Show.id.label('show_id'), Show.start_time, counterpart.id, counterpart.name, counterpart.image_link)
+        .join(counterpart, counterpart.id == counterpart_fk)
+        .where(show_fk == id, Show.start_time > now if upcoming else Show.start_time <= now), counterpart)
+    if cursor:
+        values, _ = decode_cursor(cursor, [Show.start_time, Show.id])
+        key = tuple_(Show.start_time, Show.id)
+        query = query.where(key > tuple_(*values) if upcoming else key < tuple_(*values))
+    if upcoming:
+        query = query.order_by(Show.start_time, Show.id)
+    else:
+        query = query.order_by(Show.start_time.desc(), Show.id.desc())
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    items = [make_item(row) for row in rows[:limit]]
+    next_cursor = encode_cursor([rows[limit - 1].start_time, rows[limit - 1].show_id], 'next') \
+        if len(rows) > limit else None
+    return items, next_cursor
+
+
+def load_venue_shows(venue_id, section, now, cursor=None, limit=12):
+    """Returns (shows, next cursor) for one section of a venue page, continuing after cursor."""
+    return _show_slice(Artist, Show.artist_id, Show.venue_id, venue_id, section, now, cursor, limit, _venue_item)
+
+
+def load_artist_shows(artist_id, section, now, cursor=None, limit=12):
+    """Returns (shows, next cursor) for one section of an artist page, continuing after cursor."""
+    return _show_slice(Venue, Show.venue_id, Show.artist_id, artist_id, section, now, cursor, limit, _artist_item)
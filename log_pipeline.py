@@ -0,0 +1,268 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, request
+from flask.logging import default_handler
+
+#----------------------------------------------------------------------------#
+# Non-blocking error and access logging.
+#----------------------------------------------------------------------------#
+# Request threads only put records on a bounded queue. One listener thread
+# per process formats them and writes them out: errors to ERROR_LOG, app log
+# records to stderr (in place of Flask's default handler) and one JSON line
+# per request to ACCESS_LOG. It takes whatever has queued up (up
+# to LOG_BATCH_SIZE records) and writes each file once per batch, so batches
+# grow with load instead of adding a flush per record. Files rotate at
+# LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files. When the queue is full
+# (LOG_QUEUE_SIZE) records are dropped and counted rather than blocking the
+# request; the count goes to the error log at most every DROP_REPORT_SECONDS.
+# stop() writes out everything queued before it, even from a full queue.
+
+ERROR_FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+ACCESS_LOGGER = 'fyyur.access'
+DROP_REPORT_SECONDS = 5
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that counts records it cannot queue instead of blocking."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # merge the arguments now, while they hold the values being logged,
+        # but leave formatting (and tracebacks) to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class BatchFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that writes a list of records with one write and
+    flush (rotating midway if the batch crosses maxBytes). Worker processes
+    share the file: appends of whole batches do not interleave, and a
+    handler notices another process rotated the file and reopens it rather
+    than rotating again.
+    """
+
+    def emit_batch(self, records):
+        with self.lock:
+            try:
+                self._reopen_if_moved()
+                pending, size = [], self.stream.tell()
+                for record in records:
+                    line = self.format(record) + self.terminator
+                    if self.maxBytes and size and size + len(line) >= self.maxBytes:
+                        self._write(pending)
+                        pending, size = [], 0
+                        self.doRollover()
+                        self._reopen_if_moved()
+                    pending.append(line)
+                    size += len(line)
+                self._write(pending)
+            except Exception:
+                self.handleError(records[-1])
+
+    def _write(self, lines):
+        if lines:
+            self.stream.write(''.join(lines))
+            self.stream.flush()
+
+    def _reopen_if_moved(self):
+        if self.stream is not None:
+            try:
+                if os.stat(self.baseFilename).st_ino == os.fstat(self.stream.fileno()).st_ino:
+                    return
+            except FileNotFoundError:
+                pass
+            self.stream.close()
+        self.stream = self._open()
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler that writes a list of records with one flush."""
+
+    def emit_batch(self, records):
+        with self.lock:
+            try:
+                self.stream.write(''.join(self.format(record) + self.terminator for record in records))
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.access, separators=(',', ':'), default=str)
+
+
+class BatchingQueueListener(QueueListener):
+    def __init__(self, log_queue, *handlers, batch_size=256, queue_handler=None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.queue_handler = queue_handler
+        self.reported_drops = 0
+        self.reported_at = 0.0
+
+    def _monitor(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is self._sentinel
+            if stopping:
+                batch.pop()
+            if stopping or time.monotonic() - self.reported_at >= DROP_REPORT_SECONDS:
+                self._report_drops(batch)
+            for handler in self.handlers:
+                records = [r for r in batch if r.levelno >= handler.level and handler.filter(r)]
+                if records:
+                    handler.emit_batch(records)
+            if stopping:
+                break
+
+    def enqueue_sentinel(self):
+        # QueueListener puts it with put_nowait, which raises queue.Full when
+        # stop() comes during a burst; wait for the thread to make room instead
+        while self._thread is not None and self._thread.is_alive():
+            try:
+                self.queue.put(self._sentinel, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def _report_drops(self, batch):
+        dropped = self.queue_handler.dropped if self.queue_handler else 0
+        if dropped > self.reported_drops:
+            batch.append(logging.LogRecord(
+                __name__, logging.ERROR, __file__, 0,
+                'Log queue full: dropped %d records (%d since start)',
+                (dropped - self.reported_drops, dropped), None))
+            self.reported_drops = dropped
+            self.reported_at = time.monotonic()
+
+
+class LogPipeline:
+    def __init__(self):
+        self.listener = None
+        self.queue_handler = None
+        self.pid = None
+        self.loggers = []
+        self.access_logger = logging.getLogger(ACCESS_LOGGER)
+        self.access_logger.propagate = False
+        self.access_logger.setLevel(logging.INFO)
+
+    @property
+    def dropped(self):
+        return self.queue_handler.dropped if self.queue_handler else 0
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._log_request)
+
+    def start(self, app):
+        """(Re)starts the listener for this process; file handles are never shared across a fork."""
+        self.stop()
+        config = app.config
+        log_queue = queue.Queue(config.get('LOG_QUEUE_SIZE', 10000))
+        self.queue_handler = DroppingQueueHandler(log_queue)
+
+        rotation = {'maxBytes': config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+                    'backupCount': config.get('LOG_BACKUP_COUNT', 5),
+                    'encoding': 'utf-8', 'delay': True}
+        errors = BatchFileHandler(config.get('ERROR_LOG', 'error.log'), **rotation)
+        errors.setFormatter(logging.Formatter(ERROR_FORMAT))
+        errors.setLevel(logging.ERROR)
+        # takes over from Flask's default handler, which writes to stderr on the request thread
+        console = BatchStreamHandler()
+        console.setFormatter(default_handler.formatter)
+        console.addFilter(lambda record: record.name != ACCESS_LOGGER)
+        handlers = [errors, console]
+        if config.get('ACCESS_LOG'):
+            access = BatchFileHandler(config['ACCESS_LOG'], **rotation)
+            access.setFormatter(JsonLinesFormatter())
+            access.addFilter(logging.Filter(ACCESS_LOGGER))
+            handlers.append(access)
+            self.loggers.append(self.access_logger)
+
+        self.listener = BatchingQueueListener(log_queue, *handlers,
+                                              batch_size=config.get('LOG_BATCH_SIZE', 256),
+                                              queue_handler=self.queue_handler)
+        self.listener.start()
+        self.pid = os.getpid()
+        self.loggers.append(app.logger)
+        for logger in self.loggers:
+            logger.addHandler(self.queue_handler)
+        app.logger.removeHandler(default_handler)
+        app.logger.setLevel(logging.INFO)
+
+    def stop(self):
+        """Flushes what is queued and closes the files (in the process that started them)."""
+        for logger in self.loggers:
+            logger.removeHandler(self.queue_handler)
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+        self.listener = self.queue_handler = None
+        self.loggers = []
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+
+    def _log_request(self, response):
+        if self.access_logger not in self.loggers:
+            return response
+        record = {
+            'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'path': request.path,
+            'status': response.status_code,
+        }
+        started = g.get('request_started', time.perf_counter())
+        stats = g.get('query_stats')
+        if response.is_streamed and not response.direct_passthrough:
+            # streamed bodies are counted as they are sent; logged once the server closes them
+            sent = [0]
+            response.response = _counting(response.response, sent)
+            response.call_on_close(lambda: self._emit(record, started, stats, sent[0]))
+        else:
+            self._emit(record, started, stats, response.calculate_content_length())
+        return response
+
+    def _emit(self, record, started, stats, size):
+        record['ms'] = round((time.perf_counter() - started) * 1000, 2)
+        record['queries'] = stats.count if stats else None
+        record['db_ms'] = round(stats.seconds * 1000, 2) if stats else None
+        record['bytes'] = size
+        self.access_logger.info('access', extra={'access': record})
+
+
+def _counting(chunks, sent):
+    for chunk in chunks:
+        sent[0] += len(chunk)
+        yield chunk
+
+
+log_pipeline = LogPipeline()
+atexit.register(log_pipeline.stop)
@@ -0,0 +1,396 @@
+import atexit
+import glob
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, g, request, template_rendered, before_render_template
+
+from log_pipeline import log_pipeline
+from pool_stats import pool_stats
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+#----------------------------------------------------------------------------#
+# Prometheus-style metrics.
+#----------------------------------------------------------------------------#
+# Every thread counts into its own Accumulator (plain dicts, no locks on the
+# request path); a scrape sums the accumulators of all threads, folding those
+# of finished threads into a retired total. Per-request series are keyed by
+# endpoint, not path, so unknown URLs cannot create new series.
+#
+# With several worker processes set METRICS_DIR to a directory they share
+# (gunicorn.conf.py does): each process writes its totals there as
+# <pid>.json every METRICS_FLUSH_SECONDS and on exit, and /metrics adds up
+# the files of all processes. A scrape folds the files of exited workers
+# into retired.json (counters and histograms kept so totals never go
+# backwards when a worker is recycled, gauges dropped) and deletes them, so
+# the directory does not grow with every recycled worker and a new process
+# that gets a reused pid starts from zero. Scrapes hold a lock on the
+# directory while they read and fold, and are up to METRICS_FLUSH_SECONDS
+# behind for the other workers.
+#
+# parse() reads the text format back, for tests and scripts.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RENDER_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+METRICS = {
+    'fyyur_http_requests_total': ('counter', 'Requests handled, by endpoint, method and status.'),
+    'fyyur_http_request_duration_seconds': ('histogram', 'Time to produce the response headers.', LATENCY_BUCKETS),
+    'fyyur_http_requests_in_flight': ('gauge', 'Requests being handled right now.'),
+    'fyyur_db_queries_total': ('counter', 'SQL statements sent, by endpoint.'),
+    'fyyur_db_query_seconds_total': ('counter', 'Time spent in SQL statements, by endpoint.'),
+    'fyyur_template_render_seconds': ('histogram', 'Jinja template render time.', RENDER_BUCKETS),
+    'fyyur_db_pool_connections': ('gauge', 'Pooled connections by engine and state.'),
+    'fyyur_db_pool_checkouts_total': ('counter', 'Connection checkouts by engine.'),
+    'fyyur_db_pool_checkout_timeouts_total': ('counter', 'Checkouts that timed out waiting for a connection.'),
+    'fyyur_db_pool_invalidations_total': ('counter', 'Connections invalidated, by engine.'),
+    'fyyur_log_records_dropped_total': ('counter', 'Log records dropped because the log queue was full.'),
+}
+
+
+class Accumulator:
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1.0):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def add_gauge(self, name, labels, value):
+        key = (name, labels)
+        self.gauges[key] = self.gauges.get(key, 0.0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        buckets = METRICS[name][2]
+        counts = self.histograms.get(key)
+        if counts is None:
+            # one count per bucket, then +Inf, sum
+            counts = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[len(buckets)] += 1
+        counts[-1] += value
+
+
+def _merge(totals, part):
+    for kind in ('counters', 'gauges'):
+        target = totals[kind]
+        for key, value in part[kind].items():
+            target[key] = target.get(key, 0.0) + value
+    for key, counts in part['histograms'].items():
+        target = totals['histograms'].get(key)
+        if target is None:
+            totals['histograms'][key] = list(counts)
+        else:
+            for i, value in enumerate(counts):
+                target[i] += value
+
+
+def _empty():
+    return {'counters': {}, 'gauges': {}, 'histograms': {}}
+
+
+class Metrics:
+    def __init__(self):
+        self.directory = None
+        self.flush_seconds = 1.0
+        self._local = threading.local()
+        self._accumulators = []
+        self._retired = _empty()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def init_app(self, app):
+        self.directory = app.config.get('METRICS_DIR') or None
+        self.flush_seconds = app.config.get('METRICS_FLUSH_SECONDS', 1.0)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._finish_render, app)
+        app.register_blueprint(metrics_bp)
+
+    @property
+    def local(self):
+        accumulator = getattr(self._local, 'accumulator', None)
+        if accumulator is None:
+            accumulator = self._local.accumulator = Accumulator()
+            with self._lock:
+                self._accumulators.append(accumulator)
+            if self.directory and self._pid != os.getpid():
+                self._start_flusher()
+        return accumulator
+
+    # request hooks
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_endpoint = request.endpoint or 'unmatched'
+        self.local.add_gauge('fyyur_http_requests_in_flight', (('endpoint', g.metrics_endpoint),), 1)
+
+    def _finish_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        labels = (('endpoint', g.metrics_endpoint), ('method', request.method))
+        local = self.local
+        local.inc('fyyur_http_requests_total', labels + (('status', str(response.status_code)),))
+        local.observe('fyyur_http_request_duration_seconds', labels, time.perf_counter() - started)
+        stats = g.get('query_stats')
+        if stats is not None and stats.count:
+            endpoint = (('endpoint', g.metrics_endpoint),)
+            local.inc('fyyur_db_queries_total', endpoint, stats.count)
+            local.inc('fyyur_db_query_seconds_total', endpoint, stats.seconds)
+        return response
+
+    def _teardown_request(self, exc):
+        if g.pop('metrics_started', None) is not None:
+            self.local.add_gauge('fyyur_http_requests_in_flight', (('endpoint', g.metrics_endpoint),), -1)
+
+    def _start_render(self, app, template, context, **extra):
+        stack = self._local.__dict__.setdefault('renders', [])
+        stack.append(time.perf_counter())
+
+    def _finish_render(self, app, template, context, **extra):
+        stack = self._local.__dict__.get('renders')
+        if stack:
+            self.local.observe('fyyur_template_render_seconds',
+                               (('template', template.name or 'string'),), time.perf_counter() - stack.pop())
+
+    # collection
+
+    def collect(self):
+        """This process's totals: all threads plus the live pool and log gauges."""
+        totals = _empty()
+        with self._lock:
+            live = []
+            for accumulator in self._accumulators:
+                if accumulator.thread.is_alive():
+                    live.append(accumulator)
+                else:
+                    _merge(self._retired, _snapshot(accumulator))
+            self._accumulators = live
+            _merge(totals, self._retired)
+        for accumulator in live:
+            _merge(totals, _snapshot(accumulator))
+        self._collect_process(totals)
+        return totals
+
+    def _collect_process(self, totals):
+        for name, stats in pool_stats.snapshot().items():
+            engine = (('engine', name),)
+            totals['counters'][('fyyur_db_pool_checkouts_total', engine)] = stats['checkouts']
+            totals['counters'][('fyyur_db_pool_checkout_timeouts_total', engine)] = stats['checkout_timeouts']
+            totals['counters'][('fyyur_db_pool_invalidations_total', engine)] = stats['invalidations']
+            totals['gauges'][('fyyur_db_pool_connections', engine + (('state', 'checked_out'),))] = stats['checked_out']
+            if 'idle' in stats:
+                totals['gauges'][('fyyur_db_pool_connections', engine + (('state', 'idle'),))] = stats['idle']
+        totals['counters'][('fyyur_log_records_dropped_total', ())] = log_pipeline.dropped
+
+    def collect_all(self):
+        """Totals over every process writing to METRICS_DIR (just this one without it)."""
+        totals = self.collect()
+        if not self.directory:
+            return totals
+        self._write(totals)
+        with self._locked():
+            _merge(totals, self._retire_exited())
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                name = os.path.basename(path)[:-len('.json')]
+                if not name.isdigit() or int(name) == os.getpid():
+                    continue
+                part = _read(path)
+                if part is not None:
+                    _merge(totals, part)
+        return totals
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, 'retired.lock'), 'a') as f:
+            # without fcntl there is no gunicorn, so no other process to race
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _retire_exited(self):
+        """
+        Moves the files of exited processes into retired.json and returns its
+        totals. Files are first renamed to *.retiring and only deleted once
+        retired.json lists them, so a scrape that dies halfway neither loses
+        nor double counts them.
+        """
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            name = os.path.basename(path)[:-len('.json')]
+            if name.isdigit() and not _alive(int(name)):
+                os.replace(path, f'{path}.{time.time_ns()}.retiring')
+        retired_path = os.path.join(self.directory, 'retired.json')
+        try:
+            with open(retired_path) as f:
+                data = json.load(f)
+            retired, folded = _decode(data['totals']), set(data['folded'])
+        except FileNotFoundError:
+            retired, folded = _empty(), set()
+        retiring = glob.glob(os.path.join(self.directory, '*.retiring'))
+        if not retiring:
+            return retired
+        for path in retiring:
+            if os.path.basename(path) in folded:
+                continue
+            part = _read(path)
+            if part is not None:
+                part['gauges'] = {}
+                _merge(retired, part)
+        tmp = retired_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'totals': _encode(retired), 'folded': [os.path.basename(path) for path in retiring]}, f)
+        os.replace(tmp, retired_path)
+        for path in retiring:
+            os.remove(path)
+        return retired
+
+    # multi-process files
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._flush_forever, name='metrics-flush', daemon=True).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        if self.directory and self._pid == os.getpid():
+            self._write(self.collect())
+
+    def _write(self, totals):
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(_encode(totals), f)
+        os.replace(tmp, path)
+
+    def render(self):
+        return render_text(self.collect_all())
+
+
+def _snapshot(accumulator):
+    # dict.copy() is atomic under the GIL, so the owning thread may keep counting
+    return {'counters': accumulator.counters.copy(),
+            'gauges': accumulator.gauges.copy(),
+            'histograms': {key: list(counts) for key, counts in accumulator.histograms.copy().items()}}
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return _decode(json.load(f))
+    except (OSError, ValueError):
+        return None  # replaced or retired right now; next scrape has it
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _encode(totals):
+    return {kind: [[name, [list(label) for label in labels], value] for (name, labels), value in series.items()]
+            for kind, series in totals.items()}
+
+
+def _decode(data):
+    return {kind: {(name, tuple(tuple(label) for label in labels)): value for name, labels, value in series}
+            for kind, series in data.items()}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_text(totals):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    series_by_name = {}
+    for kind in ('counters', 'gauges', 'histograms'):
+        for (name, labels), value in totals[kind].items():
+            series_by_name.setdefault(name, []).append((labels, value))
+    for name, (kind, help_text, *rest) in METRICS.items():
+        series = series_by_name.get(name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(series):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(rest[0] + (math.inf,), value):
+                cumulative += count
+                le = labels + (('le', _format_value(bound)),)
+                lines.append(f'{name}_bucket{_format_labels(le)} {int(cumulative)}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {int(cumulative)}')
+    return '\n'.join(lines) + '\n'
+
+
+def parse(text):
+    """Reads the text format back into {(sample name, ((label, value), ...)): value}."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        head, value = line.rsplit(' ', 1)
+        name, _, label_text = head.partition('{')
+        labels = tuple((key, re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), raw))
+                       for key, raw in _LABEL.findall(label_text))
+        samples[(name, labels)] = float(value)
+    return samples
+
+
+metrics = Metrics()
+atexit.register(metrics.flush)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics')
+def expose():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,55 @@
+"""search text columns with trigram indexes
+
+Revision ID: 3f9c1d2e7a10
+Revises: aa51b218dd7d
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1d2e7a10'
+down_revision = 'aa51b218dd7d'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(bind, table, link_table, fk):
+    genres = {}
+    rows = bind.execute(sa.text(
+        f'SELECT l.{fk}, g.name FROM {link_table} l JOIN "Genre" g ON g.id = l.genre_id'))
+    for owner_id, name in rows:
+        genres.setdefault(owner_id, []).append(name)
+    for owner_id, name, city, state in bind.execute(sa.text(
+            f'SELECT id, name, city, state FROM "{table}"')).fetchall():
+        parts = [name, city, state] + genres.get(owner_id, [])
+        text = ' '.join(p.strip().lower() for p in parts if p and p.strip())
+        bind.execute(sa.text(f'UPDATE "{table}" SET search_text = :text WHERE id = :id'),
+                     {'text': text, 'id': owner_id})
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.add_column('Venue', sa.Column('search_text', sa.Text(), nullable=True))
+    op.add_column('Artist', sa.Column('search_text', sa.Text(), nullable=True))
+    _backfill(bind, 'Venue', 'venue_genres', 'venue_id')
+    _backfill(bind, 'Artist', 'artist_genres', 'artist_id')
+
+    op.create_index('ix_venue_search_text_trgm', 'Venue', ['search_text'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.create_index('ix_artist_search_text_trgm', 'Artist', ['search_text'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_artist_search_text_trgm', table_name='Artist')
+    op.drop_index('ix_venue_search_text_trgm', table_name='Venue')
+    with op.batch_alter_table('Artist') as batch_op:
+        batch_op.drop_column('search_text')
+    with op.batch_alter_table('Venue') as batch_op:
+        batch_op.drop_column('search_text')
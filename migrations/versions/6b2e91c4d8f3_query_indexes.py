@@ -0,0 +1,32 @@
+"""indexes for the listing, detail page and export queries
+
+Revision ID: 6b2e91c4d8f3
+Revises: 473e0b53ba49
+Create Date: 2026-10-18 14:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2e91c4d8f3'
+down_revision = '473e0b53ba49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time', 'id'], unique=False)
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time', 'id'], unique=False)
+    op.create_index('ix_shows_start_time', 'shows', ['start_time', 'id'], unique=False)
+    op.create_index('ix_venue_state_city', 'Venue', ['state', 'city', 'name', 'id'], unique=False)
+    op.create_index('ix_artist_name', 'Artist', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_artist_name', table_name='Artist')
+    op.drop_index('ix_venue_state_city', table_name='Venue')
+    op.drop_index('ix_shows_start_time', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
@@ -0,0 +1,26 @@
+"""venue timezone
+
+Revision ID: 9c4e7d1a2b5f
+Revises: 6b2e91c4d8f3
+Create Date: 2026-10-18 16:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e7d1a2b5f'
+down_revision = '6b2e91c4d8f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timezone', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('Venue', schema=None) as batch_op:
+        batch_op.drop_column('timezone')
@@ -0,0 +1,40 @@
+"""not null listing sort keys
+
+Revision ID: d3a8f5b07e21
+Revises: 9c4e7d1a2b5f
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f5b07e21'
+down_revision = '9c4e7d1a2b5f'
+branch_labels = None
+depends_on = None
+
+# The /venues and /artists keyset cursors seek with (state, city, name, id) >
+# (...) and (name, id) > (...); a NULL in any of them compares as NULL and
+# would drop that row, and every row after it, from the listing.
+COLUMNS = {
+    'Venue': [('name', sa.String()), ('city', sa.String(length=120)), ('state', sa.String(length=120))],
+    'Artist': [('name', sa.String())],
+}
+
+
+def upgrade():
+    for table, columns in COLUMNS.items():
+        for name, type_ in columns:
+            op.execute(sa.text(f'UPDATE "{table}" SET {name} = \'\' WHERE {name} IS NULL'))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, type_ in columns:
+                batch_op.alter_column(name, existing_type=type_, nullable=False)
+
+
+def downgrade():
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, type_ in columns:
+                batch_op.alter_column(name, existing_type=type_, nullable=True)
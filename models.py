@@ -1,6 +1,11 @@
+from datetime import datetime
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 #----------------------------------------------------------------------------#
 # Association tables
 venue_genres = db.Table(
@@ -24,9 +29,10 @@ class Venue(db.Model):
     __tablename__ = 'Venue'
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    # the /venues keyset order; NOT NULL so no row drops out of the seek
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
@@ -36,6 +42,20 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500))
     website = db.Column(db.String(120))
+    # IANA zone (e.g. America/Chicago) show times are displayed in; UTC when unset
+    timezone = db.Column(db.String(64))
+    # lowercased name/city/state/genres, kept current by maintain_search_text
+    search_text = db.Column(db.Text)
+    # bumped on every write; drives the ETag/Last-Modified validators
+    updated_at = db.Column(db.DateTime, nullable=False, index=True, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index('ix_venue_search_text_trgm', 'search_text',
+                 postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}),
+        # /venues keyset order
+        db.Index('ix_venue_state_city', 'state', 'city', 'name', 'id'),
+    )
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
     def add(self):
@@ -57,7 +77,8 @@ class Artist(db.Model):
     __tablename__ = 'Artist'
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    # the /artists keyset order; NOT NULL so no row drops out of the seek
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
@@ -68,6 +89,18 @@ class Artist(db.Model):
     seeking_description = db.Column(db.String(500))
     website = db.Column(db.String(120))
     shows = db.relationship('Show', backref='artist', lazy=True)
+    # lowercased name/city/state/genres, kept current by maintain_search_text
+    search_text = db.Column(db.Text)
+    # bumped on every write; drives the ETag/Last-Modified validators
+    updated_at = db.Column(db.DateTime, nullable=False, index=True, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index('ix_artist_search_text_trgm', 'search_text',
+                 postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}),
+        # /artists keyset order
+        db.Index('ix_artist_name', 'name', 'id'),
+    )
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
     def add(self):
@@ -95,6 +128,18 @@ class Show(db.Model):
     artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id"), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id"), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+    # bumped on every write; drives the ETag/Last-Modified validators
+    updated_at = db.Column(db.DateTime, nullable=False, index=True, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.current_timestamp())
+
+    __table_args__ = (
+        # detail page sections and upcoming counts: one venue's or artist's
+        # shows in start_time order; id ends the keyset cursor
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time', 'id'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time', 'id'),
+        # /shows keyset order and export date ranges
+        db.Index('ix_shows_start_time', 'start_time', 'id'),
+    )
 
     def add(self):
         db.session.add(self)
@@ -110,4 +155,19 @@ class Show(db.Model):
 
     def __repr__(self):
         return f"<Show of artist with id: {self.artist_id} and venue with id: {self.venue_id}>"
-#----------------------------------------------------------------------------#
\ No newline at end of file
+#----------------------------------------------------------------------------#
+# Search text maintenance.
+
+def build_search_text(name, city, state, genre_names):
+    """Returns the normalized text the search indexes match against."""
+    parts = [name, city, state] + list(genre_names)
+    return ' '.join(p.strip().lower() for p in parts if p and p.strip())
+
+
+@event.listens_for(Venue, 'before_insert')
+@event.listens_for(Venue, 'before_update')
+@event.listens_for(Artist, 'before_insert')
+@event.listens_for(Artist, 'before_update')
+def maintain_search_text(mapper, connection, target):
+    target.search_text = build_search_text(
+        target.name, target.city, target.state, [g.name for g in target.genres])
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models import Venue, Artist, Show
+from replicas import replica_router
+
+#----------------------------------------------------------------------------#
+# Rendered-page cache for the venue and artist detail pages.
+#----------------------------------------------------------------------------#
+# Pages are cached per entity ("venue:3", "artist:7") until the earlier of
+# PAGE_CACHE_TTL and the start of the entity's next upcoming show, when that
+# show moves from the upcoming to the past section. Writes invalidate the
+# pages they affect once their transaction commits; see the session events
+# at the bottom of this module.
+#
+# A replica may not have the write yet when a page is rendered right after
+# its invalidation, so pages read from a replica are not stored within
+# REPLICA_PIN_SECONDS of their key being invalidated (the same lag the
+# writer's own pin to the primary allows for).
+
+class MemoryBackend:
+    """Per-process LRU bounded by entry count and total size of the cached pages."""
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._invalidated = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            html, expires_at = entry
+            if expires_at <= time.time():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html, ttl):
+        if len(html) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (html, time.time() + ttl)
+            self._bytes += len(html)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, keys, remember=0):
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+                if remember:
+                    self._invalidated[key] = now + remember
+            if len(self._invalidated) > self.max_entries:
+                self._invalidated = {key: until for key, until in self._invalidated.items() if until > now}
+
+    def invalidated_recently(self, key):
+        return self._invalidated.get(key, 0) > time.time()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+
+class RedisBackend:
+    """Shared backend so every worker sees the same entries and invalidations."""
+
+    def __init__(self, url, prefix='fyyur:page:'):
+        if not url:
+            raise ValueError('PAGE_CACHE_BACKEND=redis needs PAGE_CACHE_URL (e.g. redis://localhost:6379/0)')
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('PAGE_CACHE_BACKEND=redis needs the redis package (see requirements.txt)') from e
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        html = self._client.get(self.prefix + key)
+        return html.decode('utf-8') if html is not None else None
+
+    def set(self, key, html, ttl):
+        self._client.setex(self.prefix + key, max(int(ttl), 1), html.encode('utf-8'))
+
+    def delete(self, keys, remember=0):
+        if not keys:
+            return
+        with self._client.pipeline() as pipe:
+            pipe.delete(*[self.prefix + key for key in keys])
+            if remember:
+                for key in keys:
+                    pipe.set(f'{self.prefix}invalidated:{key}', b'1', px=max(int(remember * 1000), 1))
+            pipe.execute()
+
+    def invalidated_recently(self, key):
+        return bool(self._client.exists(f'{self.prefix}invalidated:{key}'))
+
+
+class PageCache:
+    def __init__(self):
+        self.backend = None
+        self.ttl = 300
+        self.replica_lag = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PAGE_CACHE_TTL', 300)
+        self.replica_lag = app.config.get('REPLICA_PIN_SECONDS', 5) if app.config.get('DATABASE_REPLICA_URLS') else 0
+        kind = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        if kind == 'memory':
+            self.backend = MemoryBackend(app.config.get('PAGE_CACHE_MAX_ENTRIES', 1000),
+                                         app.config.get('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        elif kind == 'redis':
+            self.backend = RedisBackend(app.config['PAGE_CACHE_URL'])
+        elif kind == 'none':
+            self.backend = None
+        else:
+            raise ValueError(f'Unknown PAGE_CACHE_BACKEND: {kind}')
+
+    def get(self, kind, id):
+        if self.backend is None:
+            return None
+        return self.backend.get(f'{kind}:{id}')
+
+    def set(self, kind, id, html, now, next_show_start=None):
+        """Caches html until the TTL passes or the next show starts, whichever is first."""
+        if self.backend is None:
+            return
+        key = f'{kind}:{id}'
+        if self.replica_lag and replica_router.reading_from_replica() and self.backend.invalidated_recently(key):
+            return
+        ttl = self.ttl
+        if next_show_start is not None:
+            ttl = min(ttl, (next_show_start - now).total_seconds())
+        if ttl > 0:
+            self.backend.set(key, html, ttl)
+
+    def invalidate(self, keys):
+        if self.backend is not None and keys:
+            self.backend.delete(list(keys), self.replica_lag)
+
+
+page_cache = PageCache()
+
+
+#----------------------------------------------------------------------------#
+# Write-driven invalidation.
+#----------------------------------------------------------------------------#
+# Venue pages list artist names and images and artist pages list venue names
+# and images, so renaming one side also invalidates the pages on the other
+# side that show it.
+
+COUNTERPART_COLUMNS = ('name', 'image_link')
+
+
+def _display_changed(obj, session):
+    state = inspect(obj)
+    return obj in session.deleted or any(
+        state.attrs[column].history.has_changes() for column in COUNTERPART_COLUMNS)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_page_keys(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    keys = session.info.setdefault('page_cache_keys', set())
+    changed_venues, changed_artists = [], []
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Show):
+            keys.add(f'venue:{int(obj.venue_id)}')
+            keys.add(f'artist:{int(obj.artist_id)}')
+        elif isinstance(obj, Venue) and obj.id is not None:
+            keys.add(f'venue:{obj.id}')
+            if _display_changed(obj, session):
+                changed_venues.append(obj.id)
+        elif isinstance(obj, Artist) and obj.id is not None:
+            keys.add(f'artist:{obj.id}')
+            if _display_changed(obj, session):
+                changed_artists.append(obj.id)
+    if changed_venues:
+        rows = session.connection().execute(select(Show.artist_id).where(Show.venue_id.in_(changed_venues)).distinct())
+        keys.update(f'artist:{id}' for id in rows.scalars())
+    if changed_artists:
+        rows = session.connection().execute(select(Show.venue_id).where(Show.artist_id.in_(changed_artists)).distinct())
+        keys.update(f'venue:{id}' for id in rows.scalars())
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_pages(session):
+    page_cache.invalidate(session.info.pop('page_cache_keys', None))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_page_keys(session):
+    session.info.pop('page_cache_keys', None)
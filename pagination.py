@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset (cursor) pagination.
+#----------------------------------------------------------------------------#
+# Pages are found by seeking past the sort key of the last row shown instead
+# of OFFSET, so page N costs the same index range scan as page 1. Cursors are
+# opaque url-safe strings holding the sort key and the direction to seek in.
+# Sort columns must be NOT NULL: a row whose key compares as NULL would be
+# skipped by the seek, along with everything after it.
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def encode_cursor(values, direction):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps({"k": values, "d": direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Returns (key values, direction) or raises InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        values, direction = data["k"], data["d"]
+        if direction not in ('next', 'prev') or len(values) != len(columns):
+            raise InvalidCursor(cursor)
+        return [datetime.fromisoformat(v) if isinstance(c.type, DateTime) else v
+                for v, c in zip(values, columns)], direction
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def paginate(query, columns, cursor=None, per_page=50):
+    """
+    Returns a KeysetPage of query rows ordered by columns, which must be
+    unique together (end them with the primary key) and selected by name
+    in every row.
+    """
+    key = lambda row: [getattr(row, c.key) for c in columns]
+    direction = 'next'
+    if cursor:
+        values, direction = decode_cursor(cursor, columns)
+        if direction == 'next':
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+        else:
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+
+    order = columns if direction == 'next' else [c.desc() for c in columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == 'prev':
+        rows.reverse()
+        next_cursor = encode_cursor(key(rows[-1]), 'next') if rows else None
+        prev_cursor = encode_cursor(key(rows[0]), 'prev') if has_more else None
+    else:
+        next_cursor = encode_cursor(key(rows[-1]), 'next') if has_more else None
+        prev_cursor = encode_cursor(key(rows[0]), 'prev') if cursor and rows else None
+    return KeysetPage(rows, next_cursor, prev_cursor)
+
+
+class StreamingKeysetPage(KeysetPage):
+    """
+    KeysetPage whose items are produced lazily from a server-side cursor.
+    next_cursor and prev_cursor are filled in as the rows are consumed, so
+    templates must read them after iterating over items.
+    """
+
+    def __init__(self, rows, columns, cursor, per_page):
+        super().__init__(self._generate(rows, columns, cursor, per_page))
+
+    def _generate(self, rows, columns, cursor, per_page):
+        key = lambda row: [getattr(row, c.key) for c in columns]
+        last = None
+        for count, row in enumerate(rows):
+            if count == per_page:
+                # the one extra row fetched only tells us there is a next page
+                self.next_cursor = encode_cursor(key(last), 'next')
+                continue
+            if count == 0 and cursor:
+                self.prev_cursor = encode_cursor(key(row), 'prev')
+            last = row
+            yield row
+
+
+def paginate_stream(query, columns, cursor=None, per_page=50, yield_per=500):
+    """
+    Like paginate, but rows are fetched yield_per at a time instead of being
+    materialized. Backward pages need their rows reversed and are buffered.
+    """
+    if cursor:
+        values, direction = decode_cursor(cursor, columns)
+        if direction == 'prev':
+            return paginate(query, columns, cursor, per_page)
+        query = query.filter(tuple_(*columns) > tuple_(*values))
+    rows = query.order_by(*columns).limit(per_page + 1).yield_per(yield_per)
+    return StreamingKeysetPage(rows, columns, cursor, per_page)
@@ -0,0 +1,137 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+#----------------------------------------------------------------------------#
+# Connection pool instrumentation.
+#----------------------------------------------------------------------------#
+# Counters are kept per engine from the pool events (connect, checkout,
+# checkin, invalidate) plus the time each checkout waited for a connection,
+# which needs InstrumentedQueuePool since no event fires before a checkout
+# starts waiting. Invalidations, checkout timeouts and slow checkouts are
+# logged as they happen; snapshot() feeds the /stats/pool endpoint.
+
+class PoolStats:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self):
+        pool = self.engine.pool
+        with self.lock:
+            data = {
+                "pool": type(pool).__name__,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checked_out": self.checkouts - self.checkins,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_avg_ms": round(1000 * self.wait_total / self.wait_count, 3) if self.wait_count else 0.0,
+                "checkout_wait_max_ms": round(1000 * self.wait_max, 3),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), idle=pool.checkedin(), overflow=max(pool.overflow(), 0))
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    stats = None
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.stats is not None:
+                with self.stats.lock:
+                    self.stats.timeouts += 1
+                pool_stats.logger.error("Connection pool %s exhausted: %s", self.stats.name, self.status())
+            raise
+        finally:
+            if self.stats is not None:
+                waited = time.perf_counter() - started
+                self.stats.record_wait(waited)
+                if waited * 1000 >= pool_stats.slow_checkout_ms:
+                    pool_stats.logger.warning("Slow connection checkout on %s: waited %.1f ms (%s)",
+                                              self.stats.name, waited * 1000, self.status())
+
+
+class PoolStatsRegistry:
+    def __init__(self):
+        self.stats = {}
+        self.logger = None
+        self.slow_checkout_ms = 100
+
+    def init_app(self, app, db, extra_engines=None):
+        self.logger = app.logger
+        self.slow_checkout_ms = app.config.get('DB_POOL_SLOW_CHECKOUT_MS', 100)
+        with app.app_context():
+            for bind, engine in db.engines.items():
+                self.instrument(bind or 'default', engine)
+        for name, engine in (extra_engines or {}).items():
+            self.instrument(name, engine)
+
+    def instrument(self, name, engine):
+        stats = self.stats[name] = PoolStats(name, engine)
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.stats = stats
+
+        # listeners on the engine carry over when dispose() recreates the pool
+        @event.listens_for(engine, 'connect')
+        def _connect(dbapi_connection, record):
+            with stats.lock:
+                stats.connects += 1
+
+        @event.listens_for(engine, 'checkout')
+        def _checkout(dbapi_connection, record, proxy):
+            with stats.lock:
+                stats.checkouts += 1
+
+        @event.listens_for(engine, 'checkin')
+        def _checkin(dbapi_connection, record):
+            with stats.lock:
+                stats.checkins += 1
+
+        @event.listens_for(engine, 'invalidate')
+        def _invalidate(dbapi_connection, record, exception):
+            with stats.lock:
+                stats.invalidations += 1
+            self.logger.warning("Connection invalidated on %s: %s", name, exception)
+
+        @event.listens_for(engine, 'soft_invalidate')
+        def _soft_invalidate(dbapi_connection, record, exception):
+            with stats.lock:
+                stats.soft_invalidations += 1
+
+    def snapshot(self):
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+pool_stats = PoolStatsRegistry()
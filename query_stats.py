@@ -0,0 +1,124 @@
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+#----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+#----------------------------------------------------------------------------#
+# Cursor events on every engine add each statement a request sends to
+# g.query_stats: how many, how long they took and how often each statement
+# shape (fingerprint) repeated. A shape repeating more than
+# QUERY_REPEAT_THRESHOLD times in one request is the mark of an N+1 loop; it
+# is logged, and raised as RepeatedQueryError when QUERY_REPEAT_STRICT is on
+# (meant for tests and benchmarks). Requests slower than SLOW_REQUEST_MS are
+# logged with their query totals; SERVER_TIMING adds a Server-Timing header.
+#
+# Only statements sent before the response headers are counted: rows a
+# streamed page reads while sending its body are not in the header or log.
+# Queries the async detail loaders (ASYNC_DETAIL_PAGES) run on the async_db
+# loop thread are not counted either: they run outside the request context
+# and on an engine of their own.
+
+_PLACEHOLDER = r'\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*'
+_IN_LIST = re.compile(rf'\((?:{_PLACEHOLDER},)*{_PLACEHOLDER}\)')
+_SPACE = re.compile(r'\s+')
+
+
+class RepeatedQueryError(RuntimeError):
+    pass
+
+
+def fingerprint(statement):
+    """Statement shape: whitespace collapsed, IN lists of any length alike."""
+    return _IN_LIST.sub('(...)', _SPACE.sub(' ', statement).strip())
+
+
+class RequestQueries:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+class QueryStats:
+    def __init__(self):
+        self.logger = None
+        self.slow_request_ms = 500
+        self.repeat_threshold = 10
+        self.strict = False
+        self.server_timing = False
+
+    def init_app(self, app, db, extra_engines=None):
+        self.logger = app.logger
+        self.slow_request_ms = app.config.get('SLOW_REQUEST_MS', 500)
+        self.repeat_threshold = app.config.get('QUERY_REPEAT_THRESHOLD', 10)
+        self.strict = app.config.get('QUERY_REPEAT_STRICT', False)
+        self.server_timing = app.config.get('SERVER_TIMING', False)
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines + list((extra_engines or {}).values()):
+            self.instrument(engine)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def instrument(self, engine):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info['query_started'].pop()
+            stats = g.get('query_stats') if has_request_context() else None
+            if stats is not None:
+                stats.record(statement, elapsed)
+
+        @event.listens_for(engine, 'handle_error')
+        def _failed(context):
+            started = context.connection.info.get('query_started') if context.connection is not None else None
+            if started:
+                started.pop()
+
+    def _start(self):
+        g.query_stats = RequestQueries()
+
+    def _finish(self, response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.seconds * 1000
+        repeated = stats.repeated(self.repeat_threshold)
+
+        if self.server_timing:
+            response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{stats.count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+        path = request.full_path.rstrip('?')
+        for shape, n in repeated:
+            self.logger.warning("Statement repeated %d times in %s %s (possible N+1): %s",
+                                n, request.method, path, shape[:300])
+        if total_ms >= self.slow_request_ms:
+            self.logger.warning("Slow request %s %s: %.1f ms, %d queries in %.1f ms; top statements: %s",
+                                request.method, path, total_ms, stats.count, db_ms,
+                                '; '.join(f'{n}x {shape[:120]}' for shape, n in stats.shapes.most_common(3)))
+        if repeated and self.strict:
+            shape, n = repeated[0]
+            raise RepeatedQueryError(
+                f"{request.method} {request.path} repeated a statement {n} times "
+                f"(QUERY_REPEAT_THRESHOLD={self.repeat_threshold}): {shape}")
+        return response
+
+
+query_stats = QueryStats()
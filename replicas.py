@@ -0,0 +1,163 @@
+import itertools
+import threading
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+
+#----------------------------------------------------------------------------#
+# Read-replica routing.
+#----------------------------------------------------------------------------#
+# Replica engines ("replica_0", "replica_1", ...) are built from
+# DATABASE_REPLICA_URLS with the primary's engine options. They are not
+# SQLALCHEMY_BINDS, so create_all/drop_all never touch them. GET and HEAD requests read from one replica, picked
+# round-robin per request; everything else, flushes and DML statements, and
+# work outside a request (CLI, imports) use the primary. A user whose
+# request wrote anything is pinned to the primary for REPLICA_PIN_SECONDS so
+# they see their own write despite replication lag.
+#
+# A replica whose connections fail is skipped for REPLICA_RETRY_SECONDS and
+# then probed with SELECT 1 before it gets traffic again. With no healthy
+# replica, reads go to the primary. When the request's replica cannot even
+# hand out a connection, RoutingSession marks it down and the request reads
+# from the primary instead of failing; errors after that (a query that
+# breaks halfway) still fail the request.
+
+PIN_KEY = '_primary_until'
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.engines = {}
+        self.pin_seconds = 5
+        self.retry_seconds = 30
+        self._cycle = None
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        self.engines = {f'replica_{i}': create_engine(url, **options)
+                        for i, url in enumerate(app.config.get('DATABASE_REPLICA_URLS', []))}
+        self.pin_seconds = app.config.get('REPLICA_PIN_SECONDS', 5)
+        self.retry_seconds = app.config.get('REPLICA_RETRY_SECONDS', 30)
+        self._cycle = itertools.cycle(self.engines)
+        self._down_until = {}
+        self.logger = app.logger
+        if not self.engines:
+            return
+
+        for key, engine in self.engines.items():
+            self._watch(key, engine)
+        app.before_request(self._route_request)
+        app.after_request(self._pin_writer)
+
+    def _watch(self, key, engine):
+        @event.listens_for(engine, 'handle_error')
+        def _failed(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(key, context.original_exception)
+
+    def mark_down(self, key, reason=None):
+        now = time.monotonic()
+        with self._lock:
+            was_down = self._down_until.get(key, 0) > now
+            self._down_until[key] = now + self.retry_seconds
+        if not was_down:
+            self.logger.warning("Replica %s marked down: %s", key, reason)
+
+    def _healthy(self, key):
+        down_until = self._down_until.get(key)
+        if down_until is None:
+            return True
+        if down_until > time.monotonic():
+            return False
+        # retry period is over: probe before sending traffic again
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_seconds
+        try:
+            with self.engines[key].connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            self.mark_down(key, e)
+            return False
+        with self._lock:
+            self._down_until.pop(key, None)
+        self.logger.info("Replica %s is back", key)
+        return True
+
+    def pick(self):
+        """Returns the next healthy replica's engine, or None to use the primary."""
+        for _ in range(len(self.engines)):
+            with self._lock:
+                key = next(self._cycle)
+            if self._healthy(key):
+                return self.engines[key]
+        return None
+
+    def fail_over(self, engine, reason):
+        """Marks engine's replica down and sends the rest of the request to the primary.
+
+        Returns False when engine is not a replica.
+        """
+        for key, replica in self.engines.items():
+            if replica is engine:
+                self.mark_down(key, reason)
+                g.replica_engine = None
+                return True
+        return False
+
+    def reading_from_replica(self):
+        """Whether this request's reads are going to a replica."""
+        return has_request_context() and g.get('replica_engine') is not None
+
+    def _route_request(self):
+        g.replica_engine = None
+        if request.method in ('GET', 'HEAD') and session.get(PIN_KEY, 0) <= time.time():
+            g.replica_engine = self.pick()
+
+    def _pin_writer(self, response):
+        if g.get('wrote'):
+            session[PIN_KEY] = time.time() + self.pin_seconds
+        return response
+
+    def engine_for(self, clause):
+        if not has_request_context():
+            return None
+        if isinstance(clause, UpdateBase):
+            # bulk INSERT/UPDATE/DELETE statements bypass the flush
+            g.wrote = True
+            return None
+        return g.get('replica_engine')
+
+
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of GET/HEAD requests to replica_router's pick."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            engine = replica_router.engine_for(clause)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except DBAPIError as e:
+            # nothing ran on the replica yet, so the primary can answer in its place
+            if not has_request_context() or not replica_router.fail_over(engine, e.orig):
+                raise
+        return super()._connection_for_bind(self.get_bind(), execution_options, **kw)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _remember_write(session, flush_context):
+    if has_request_context():
+        g.wrote = True
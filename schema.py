@@ -0,0 +1,85 @@
+import functools
+
+import click
+from alembic.script import ScriptDirectory
+from flask import current_app
+from flask.cli import AppGroup
+from flask_migrate import upgrade
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Schema revision checks for startup and readiness.
+#----------------------------------------------------------------------------#
+# The head revision is read from the checked-in migrations once per process;
+# the database side is a single SELECT on alembic_version. `flask schema
+# ensure` upgrades only when the two differ, so a container starting against
+# an up-to-date database does no migration work at all.
+
+schema_cli = AppGroup('schema', help='Check or bring the database schema up to the migration head.')
+
+
+class DatabaseUnavailable(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def _heads(directory):
+    config = current_app.extensions['migrate'].migrate.get_config(directory)
+    return frozenset(ScriptDirectory.from_config(config).get_heads())
+
+
+def head_revisions():
+    return _heads(current_app.extensions['migrate'].directory)
+
+
+def current_revisions():
+    """Returns the revisions stamped in the database; empty before the first upgrade."""
+    try:
+        connection = db.engine.connect()
+    except OperationalError as e:
+        raise DatabaseUnavailable(str(e.orig)) from e
+    with connection:
+        try:
+            return frozenset(connection.execute(text('SELECT version_num FROM alembic_version')).scalars())
+        except (OperationalError, ProgrammingError):
+            # no alembic_version table yet
+            return frozenset()
+
+
+def schema_status():
+    """Returns (up to date, current revisions, head revisions)."""
+    current, heads = current_revisions(), head_revisions()
+    return current == heads, current, heads
+
+
+def _revs(revisions):
+    return ', '.join(sorted(revisions)) or 'none'
+
+
+@schema_cli.command('status')
+def status():
+    """Print the database and head revisions; exit 1 if they differ."""
+    try:
+        up_to_date, current, heads = schema_status()
+    except DatabaseUnavailable as e:
+        raise click.ClickException(f'database unavailable: {e}')
+    click.echo(f'database: {_revs(current)}  head: {_revs(heads)}')
+    if not up_to_date:
+        raise SystemExit(1)
+
+
+@schema_cli.command('ensure')
+def ensure():
+    """Upgrade to head unless the database is already there."""
+    try:
+        up_to_date, current, heads = schema_status()
+    except DatabaseUnavailable as e:
+        raise click.ClickException(f'database unavailable: {e}')
+    if up_to_date:
+        click.echo(f'schema at head ({_revs(heads)}), nothing to do')
+        return
+    click.echo(f'upgrading schema from {_revs(current)} to {_revs(heads)}')
+    upgrade()
@@ -0,0 +1,67 @@
+from sqlalchemy import case, func
+
+from models import db, Venue, Artist, Show
+from aggregates import upcoming_show_counts
+
+#----------------------------------------------------------------------------#
+# Ranked search over the maintained search_text column.
+#----------------------------------------------------------------------------#
+
+# Show.<column> holding the foreign key for each searchable model.
+SHOW_FOREIGN_KEYS = {
+    Venue: Show.venue_id,
+    Artist: Show.artist_id,
+}
+
+
+def _like_pattern(term, prefix=False):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%' if prefix else f'%{escaped}%'
+
+
+def _rank(model, search_term):
+    """
+    Relevance expression, highest first. On PostgreSQL this is the pg_trgm
+    similarity of the whole term; elsewhere name prefix and name matches are
+    ranked above matches on city, state or genre only.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.similarity(model.search_text, search_term)
+    name = func.lower(model.name)
+    return case(
+        (name == search_term, 3),
+        (name.like(_like_pattern(search_term, prefix=True), escape='\\'), 2),
+        (name.like(_like_pattern(search_term), escape='\\'), 1),
+        else_=0)
+
+
+def search_entities(model, search_term, now, page=1, per_page=20):
+    """
+    Searches venues or artists by name, city, state and genre names.
+    Every whitespace separated word must match; results are ranked by
+    relevance and paginated. Returns the dict the search templates expect,
+    extended with page/pages.
+    """
+    search_term = ' '.join(search_term.lower().split())
+    response = {"count": 0, "data": [], "page": page, "pages": 0}
+    query = db.session.query(model.id, model.name)
+    for word in search_term.split():
+        query = query.filter(model.search_text.like(_like_pattern(word), escape='\\'))
+
+    response["count"] = query.order_by(None).count()
+    if not response["count"]:
+        return response
+    response["pages"] = -(-response["count"] // per_page)
+
+    rows = (
+        query.order_by(_rank(model, search_term).desc(), model.name, model.id)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+        .all()
+    )
+    counts = upcoming_show_counts(SHOW_FOREIGN_KEYS[model], [row.id for row in rows], now)
+    response["data"] = [{
+        "id": row.id,
+        "name": row.name,
+        "num_upcoming_shows": counts.get(row.id, 0)} for row in rows]
+    return response
@@ -2,3 +2,41 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Fills the search box datalist from /api/autocomplete as the user types.
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var timer = null;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var q = input.value.trim();
+        if (!q) { list.innerHTML = ''; return; }
+        var url = '/api/autocomplete?type=' + input.getAttribute('data-autocomplete') +
+          '&q=' + encodeURIComponent(q);
+        fetch(url).then(function (res) { return res.json(); }).then(function (body) {
+          list.innerHTML = '';
+          (body.data || []).forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = item.name;
+            list.appendChild(option);
+          });
+        });
+      }, 100);
+    });
+  });
+});
+
+// Replaces a "Load more" button on the venue/artist pages with the next slice of shows.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest && event.target.closest('a[data-load-more]');
+  if (!link) { return; }
+  event.preventDefault();
+  var container = link.parentNode;
+  fetch(link.href).then(function (res) { return res.text(); }).then(function (html) {
+    container.insertAdjacentHTML('beforebegin', html);
+    container.parentNode.removeChild(container);
+  });
+});
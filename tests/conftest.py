@@ -0,0 +1,113 @@
+"""
+Shared fixtures: an app from create_app() over a throwaway SQLite file and a
+fresh schema for every test.
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+SCRATCH = tempfile.mkdtemp()
+# config.py reads the environment once, when it is first imported
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(SCRATCH, 'test.db'),
+    'FLASK_DEBUG': '0',
+    'ERROR_LOG': os.path.join(SCRATCH, 'error.log'),
+    'ACCESS_LOG': '',
+    'PAGE_CACHE_BACKEND': 'memory',
+    'ASSETS_BUILD': '0',
+    'ASYNC_DETAIL_PAGES': '0',
+    'STREAM_LISTINGS': '0',
+    # any request that repeats a statement like an N+1 loop fails its test
+    'QUERY_REPEAT_STRICT': '1',
+})
+for name in ('DATABASE_REPLICA_URLS', 'METRICS_DIR', 'APP_VERSION', 'PAGE_CACHE_URL'):
+    os.environ.pop(name, None)
+
+import config
+import typeahead
+from app import create_app
+from genres import genre_cache, get_or_create_genres
+from models import db as _db, Venue, Artist, Show
+from page_cache import page_cache
+from replicas import replica_router
+
+
+def make_app(**overrides):
+    """create_app() with config.py's settings and overrides on top."""
+    settings = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    settings.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    settings.update(overrides)
+    return create_app(type('TestConfig', (), settings))
+
+
+@pytest.fixture(scope='session')
+def app():
+    return make_app()
+
+
+@pytest.fixture
+def db(app):
+    """An empty schema, with the process-wide caches that outlive it emptied too."""
+    with app.app_context():
+        _db.drop_all()
+        _db.create_all()
+    genre_cache.clear()
+    page_cache.init_app(app)
+    for index in typeahead.indexes.values():
+        index.loaded = False
+        index._keys, index._names = [], {}
+    yield _db
+    with app.app_context():
+        _db.session.remove()
+    # an app made by make_app() in a test may have pointed the router at its replicas
+    replica_router.init_app(app)
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+def add_venue(name, city='San Francisco', state='CA', genres=('Jazz',), **values):
+    venue = Venue(name=name, city=city, state=state, **values)
+    venue.genres = get_or_create_genres(genres)
+    _db.session.add(venue)
+    _db.session.commit()
+    return venue.id
+
+
+def add_artist(name, city='San Francisco', state='CA', genres=('Jazz',), **values):
+    artist = Artist(name=name, city=city, state=state, **values)
+    artist.genres = get_or_create_genres(genres)
+    _db.session.add(artist)
+    _db.session.commit()
+    return artist.id
+
+
+def add_show(artist_id, venue_id, start_time):
+    show = Show(artist_id=artist_id, venue_id=venue_id, start_time=start_time)
+    _db.session.add(show)
+    _db.session.commit()
+    return show.id
+
+
+@pytest.fixture
+def catalog(app, db):
+    """Two venues and two artists with a past and an upcoming show each; returns their ids."""
+    now = datetime.utcnow()
+    with app.app_context():
+        ids = {
+            'hop': add_venue('The Musical Hop', genres=('Jazz', 'Reggae'), address='1015 Folsom Street',
+                             phone='123-123-1234', image_link='https://img.example/hop.jpg'),
+            'dueling': add_venue('The Dueling Pianos Bar', city='New York', state='NY', genres=('Classical',),
+                                 address='335 Delancey Street', phone='914-003-1132'),
+            'guns': add_artist('Guns N Petals', genres=('Rock n Roll',), image_link='https://img.example/guns.jpg'),
+            'sax': add_artist('The Wild Sax Band', genres=('Jazz', 'Classical')),
+        }
+        add_show(ids['guns'], ids['hop'], now - timedelta(days=30))
+        add_show(ids['guns'], ids['hop'], now + timedelta(days=30))
+        add_show(ids['sax'], ids['dueling'], now - timedelta(days=10))
+        add_show(ids['sax'], ids['dueling'], now + timedelta(days=10))
+    return ids
@@ -0,0 +1,57 @@
+import pytest
+
+from .conftest import add_artist
+
+
+def get(client, url, status=200):
+    response = client.get(url)
+    assert response.status_code == status, response.get_json()
+    assert response.mimetype == 'application/json'
+    return response.get_json()
+
+
+def test_fields_limit_the_response(client, catalog):
+    data = get(client, f"/api/v1/venues/{catalog['hop']}?fields=name,city,genres")['data']
+    assert data == {'id': catalog['hop'], 'name': 'The Musical Hop', 'city': 'San Francisco',
+                    'genres': ['Jazz', 'Reggae']}
+    full = get(client, f"/api/v1/artists/{catalog['guns']}")['data']
+    assert {'name', 'seeking_venue', 'updated_at', 'genres'} <= set(full)
+
+
+def test_show_fields_join_only_what_they_need(client, catalog):
+    shows = get(client, '/api/v1/shows?fields=venue_name,artist_id')['data']
+    assert len(shows) == 4
+    assert set(shows[0]) == {'id', 'venue_name', 'artist_id'}
+    assert {show['venue_name'] for show in shows} == {'The Musical Hop', 'The Dueling Pianos Bar'}
+
+
+def test_ids_fetch_a_batch_in_request_order(client, catalog):
+    payload = get(client, f"/api/v1/artists?ids={catalog['sax']},999,{catalog['guns']},{catalog['sax']}&fields=name")
+    assert [item['name'] for item in payload['data']] == ['The Wild Sax Band', 'Guns N Petals']
+    assert payload['missing'] == [999]
+
+
+def test_listing_pages_with_cursors(app, client, db):
+    with app.app_context():
+        for i in range(5):
+            add_artist(f'Artist {i}')
+    first = get(client, '/api/v1/artists?per_page=2&fields=name')
+    second = get(client, f"/api/v1/artists?per_page=2&fields=name&cursor={first['next_cursor']}")
+    last = get(client, f"/api/v1/artists?per_page=2&fields=name&cursor={second['next_cursor']}")
+    assert [a['name'] for a in first['data'] + second['data'] + last['data']] == [f'Artist {i}' for i in range(5)]
+    assert first['prev_cursor'] is None and last['next_cursor'] is None
+
+
+@pytest.mark.parametrize('url, message', [
+    ('/api/v1/venues?fields=name,secret', 'unknown fields: secret'),
+    ('/api/v1/venues?ids=1,two', 'ids must be a comma separated list of integers'),
+    ('/api/v1/venues?ids=' + ','.join(str(i) for i in range(101)), 'at most 100 ids per request'),
+    ('/api/v1/shows?cursor=garbage', 'invalid cursor'),
+])
+def test_bad_requests_are_400(client, db, url, message):
+    assert message in get(client, url, 400)['error']
+
+
+def test_unknown_ids_are_404(client, db):
+    assert get(client, '/api/v1/venues/42', 404) == {'error': 'venue 42 not found'}
+    assert client.get('/api/v1/genres').status_code == 404
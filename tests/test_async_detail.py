@@ -0,0 +1,25 @@
+import pytest
+
+from async_db import async_db
+
+from .conftest import make_app
+
+
+@pytest.fixture
+def async_client(app, catalog):
+    async_app = make_app(ASYNC_DETAIL_PAGES=True, PAGE_CACHE_BACKEND='none', DEBUG=True)
+    return async_app.test_client()
+
+
+@pytest.mark.parametrize('kind, key', [('venues', 'hop'), ('artists', 'sax'), ('venues', 'dueling')])
+def test_async_loaders_render_the_same_page(client, async_client, catalog, kind, key):
+    url = f'/{kind}/{catalog[key]}'
+    sync_page, async_page = client.get(url), async_client.get(url)
+    assert async_page.status_code == 200
+    assert async_page.headers['ETag'] == sync_page.headers['ETag']
+    assert async_page.data == sync_page.data
+    assert async_db._engine is not None
+
+
+def test_async_loaders_report_missing_entities(async_client, catalog):
+    assert b'This artist does not exist' in async_client.get('/artists/999').data
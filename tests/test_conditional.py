@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from models import db, Venue
+
+from .conftest import add_show
+
+
+def test_detail_page_revalidates_to_304(client, catalog):
+    url = f"/venues/{catalog['hop']}"
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['Last-Modified']
+
+    revalidated = client.get(url, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+    since = client.get(url, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_writes_change_the_etag(app, client, catalog):
+    url = f"/venues/{catalog['hop']}"
+    etag = client.get(url).headers['ETag']
+    with app.app_context():
+        venue = db.session.get(Venue, catalog['hop'])
+        venue.phone = '555-555-5555'
+        venue.updated_at = datetime.utcnow() + timedelta(seconds=1)
+        db.session.commit()
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+    etag = response.headers['ETag']
+    with app.app_context():
+        add_show(catalog['sax'], catalog['hop'], datetime.utcnow() + timedelta(days=2))
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_listing_etags_follow_their_rows(app, client, catalog):
+    etag = client.get('/shows').headers['ETag']
+    assert client.get('/shows', headers={'If-None-Match': etag}).status_code == 304
+    with app.app_context():
+        add_show(catalog['guns'], catalog['dueling'], datetime.utcnow() + timedelta(days=5))
+    assert client.get('/shows', headers={'If-None-Match': etag}).status_code == 200
+    # the query string is part of the page
+    assert client.get('/shows?cursor=x').headers['ETag'] != client.get('/shows').headers['ETag']
+
+
+def test_a_new_release_changes_the_etag(app, client, catalog):
+    url = f"/artists/{catalog['sax']}"
+    etag = client.get(url).headers['ETag']
+    app.config['APP_VERSION'] = 'next-release'
+    try:
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+    finally:
+        app.config['APP_VERSION'] = None
+
+
+def test_missing_and_flashed_pages_are_not_validated(client, catalog):
+    assert 'ETag' not in client.get('/venues/999').headers
+    with client.session_transaction() as session:
+        session['_flashes'] = [('message', 'saved')]
+    assert 'ETag' not in client.get(f"/venues/{catalog['hop']}").headers
@@ -0,0 +1,93 @@
+import csv
+import json
+
+from sqlalchemy import func, select
+
+from importer import run_import
+from models import db, Venue, Artist, Show, Genre
+
+VENUE_FIELDS = ['name', 'city', 'state', 'address', 'phone', 'genres', 'website', 'seeking_talent']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=VENUE_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def write_jsonl(path, rows):
+    with open(path, 'w') as f:
+        f.writelines(json.dumps(row) + '\n' for row in rows)
+    return str(path)
+
+
+def venue_row(name, **values):
+    row = {'name': name, 'city': 'Austin', 'state': 'TX', 'address': '1 Main St', 'phone': '5125550100',
+           'genres': 'Jazz;Blues', 'website': '', 'seeking_talent': 'True'}
+    row.update(values)
+    return row
+
+
+def test_invalid_rows_are_rejected_and_the_rest_imported(app, db, tmp_path, capsys):
+    path = write_csv(tmp_path / 'venues.csv', [
+        venue_row('Good One'),
+        venue_row('', city='Nowhere'),
+        venue_row('Bad State', state='XX'),
+        venue_row('Bad Phone', phone='call us'),
+        venue_row('Bad Genre', genres='Polka'),
+        venue_row('Good Two', genres='Jazz', website='https://two.example', seeking_talent='False'),
+    ])
+    with app.app_context():
+        written, rejected, _ = run_import('venues', path, batch_size=2)
+        venues = {venue.name: venue for venue in db.session.scalars(select(Venue))}
+        assert (written, rejected) == (2, 4)
+        assert sorted(venues) == ['Good One', 'Good Two']
+        assert sorted(g.name for g in venues['Good One'].genres) == ['Blues', 'Jazz']
+        assert venues['Good One'].seeking_talent and not venues['Good Two'].seeking_talent
+        assert venues['Good Two'].website == 'https://two.example'
+        # maintained by the importer itself: bulk inserts fire no mapper events
+        assert 'blues' in venues['Good One'].search_text
+        assert db.session.scalar(select(func.count(Genre.id))) == 2
+    err = capsys.readouterr().err
+    # rows are numbered from the first data row
+    assert 'row 2: name:' in err and 'row 3: state:' in err and 'row 5: genres:' in err
+
+
+def test_resume_skips_the_checkpointed_rows(app, db, tmp_path):
+    path = write_csv(tmp_path / 'venues.csv', [venue_row(f'Venue {i}') for i in range(5)])
+    with open(path + '.checkpoint', 'w') as f:
+        json.dump({'rows_done': 3}, f)
+    with app.app_context():
+        written, _, _ = run_import('venues', path, resume=True)
+        assert written == 2
+        assert sorted(db.session.scalars(select(Venue.name))) == ['Venue 3', 'Venue 4']
+    with open(path + '.checkpoint') as f:
+        assert json.load(f) == {'rows_done': 5}
+
+
+def test_shows_for_unknown_ids_are_skipped(app, catalog, tmp_path):
+    path = write_jsonl(tmp_path / 'shows.jsonl', [
+        {'artist_id': catalog['guns'], 'venue_id': catalog['dueling'], 'start_time': '2031-01-02 20:00:00'},
+        {'artist_id': 999, 'venue_id': catalog['dueling'], 'start_time': '2031-01-03 20:00:00'},
+        {'artist_id': 'abc', 'venue_id': catalog['dueling'], 'start_time': '2031-01-03 20:00:00'},
+        {'artist_id': catalog['sax'], 'venue_id': catalog['hop'], 'start_time': 'not a time'},
+    ])
+    with app.app_context():
+        before = db.session.scalar(select(func.count(Show.id)))
+        written, rejected, _ = run_import('shows', path)
+        assert (written, rejected) == (1, 2)
+        assert db.session.scalar(select(func.count(Show.id))) == before + 1
+
+
+def test_artists_from_jsonl(app, db, tmp_path):
+    path = write_jsonl(tmp_path / 'artists.jsonl', [
+        {'name': 'Imported Band', 'city': 'Austin', 'state': 'TX', 'phone': '5125550100',
+         'image_link': 'https://img.example/band.jpg', 'genres': ['Funk', 'Soul'], 'seeking_venue': True},
+        {'name': 'No Image', 'city': 'Austin', 'state': 'TX', 'phone': '5125550100', 'genres': ['Funk']},
+    ])
+    with app.app_context():
+        assert run_import('artists', path)[:2] == (1, 1)
+        artist = db.session.scalars(select(Artist)).one()
+        assert artist.seeking_venue and sorted(g.name for g in artist.genres) == ['Funk', 'Soul']
@@ -0,0 +1,89 @@
+import json
+import logging
+import queue
+import threading
+
+from log_pipeline import BatchFileHandler, BatchingQueueListener, DroppingQueueHandler, JsonLinesFormatter
+
+
+class RecordingHandler(logging.Handler):
+    """Collects the batches a listener hands over; blocks on gate when one is given."""
+
+    def __init__(self, gate=None):
+        super().__init__()
+        self.batches = []
+        self.gate = gate
+
+    def emit_batch(self, records):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append([record.getMessage() for record in records])
+
+
+def pipeline(size, handler, batch_size=256):
+    log_queue = queue.Queue(size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    listener = BatchingQueueListener(log_queue, handler, batch_size=batch_size, queue_handler=queue_handler)
+    logger = logging.getLogger(f'test.pipeline.{id(listener)}')
+    logger.propagate = False
+    logger.addHandler(queue_handler)
+    return logger, queue_handler, listener
+
+
+def test_queued_records_are_written_in_batches():
+    handler = RecordingHandler()
+    logger, _, listener = pipeline(100, handler, batch_size=4)
+    for i in range(10):
+        logger.warning('record %d', i)
+    listener.start()
+    listener.stop()
+    assert [len(batch) for batch in handler.batches] == [4, 4, 2]
+    assert [m for batch in handler.batches for m in batch] == [f'record {i}' for i in range(10)]
+
+
+def test_arguments_are_merged_when_logged():
+    handler = RecordingHandler()
+    logger, _, listener = pipeline(10, handler)
+    values = ['before']
+    logger.warning('value %s', values)
+    values[0] = 'after'
+    listener.start()
+    listener.stop()
+    assert handler.batches == [["value ['before']"]]
+
+
+def test_a_full_queue_drops_counts_and_reports():
+    gate = threading.Event()
+    handler = RecordingHandler(gate)
+    logger, queue_handler, listener = pipeline(5, handler, batch_size=1)
+    listener.start()
+    for i in range(50):
+        logger.warning('record %d', i)
+    assert queue_handler.dropped > 0
+    accepted = 50 - queue_handler.dropped
+    gate.set()
+    # stop() must not raise queue.Full and must write everything accepted
+    listener.stop()
+    messages = [m for batch in handler.batches for m in batch]
+    assert [m for m in messages if m.startswith('record')] == [f'record {i}' for i in range(accepted)]
+    # reported with the next batch written after the drops
+    assert f'Log queue full: dropped {queue_handler.dropped} records ({queue_handler.dropped} since start)' in messages
+
+
+def test_batch_file_handler_writes_json_lines_and_rotates(tmp_path):
+    path = tmp_path / 'access.jsonl'
+    handler = BatchFileHandler(str(path), maxBytes=100, backupCount=2, encoding='utf-8', delay=True)
+    handler.setFormatter(JsonLinesFormatter())
+    records = []
+    for i in range(10):
+        record = logging.LogRecord('fyyur.access', logging.INFO, __file__, 0, 'access', None, None)
+        record.access = {'path': f'/venues/{i}', 'status': 200}
+        records.append(record)
+    handler.emit_batch(records)
+    handler.close()
+    files = sorted(tmp_path.iterdir(), key=lambda p: p.name, reverse=True)
+    assert [p.name for p in files] == ['access.jsonl.2', 'access.jsonl.1', 'access.jsonl']
+    assert all(p.stat().st_size < 100 for p in files)
+    # the backups keep the newest records; the oldest rotated away
+    paths = [json.loads(line)['path'] for p in files for line in p.read_text().splitlines()]
+    assert paths == [f'/venues/{i}' for i in range(4, 10)]
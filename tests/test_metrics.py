@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from metrics import Accumulator, metrics, parse, render_text, _encode
+
+REQUESTS = ('fyyur_http_requests_total', (('endpoint', 'main.venues'), ('method', 'GET'), ('status', '200')))
+IN_FLIGHT = ('fyyur_http_requests_in_flight', (('endpoint', 'main.venues'),))
+LATENCY = ('fyyur_http_request_duration_seconds', (('endpoint', 'main.venues'), ('method', 'GET')))
+
+
+def process_totals(requests, in_flight, latencies):
+    """What one worker would have written to METRICS_DIR."""
+    accumulator = Accumulator()
+    accumulator.inc(*REQUESTS, requests)
+    accumulator.add_gauge(*IN_FLIGHT, in_flight)
+    for seconds in latencies:
+        accumulator.observe(*LATENCY, seconds)
+    return {'counters': accumulator.counters, 'gauges': accumulator.gauges, 'histograms': accumulator.histograms}
+
+
+def write(directory, pid, totals):
+    with open(os.path.join(directory, f'{pid}.json'), 'w') as f:
+        json.dump(_encode(totals), f)
+
+
+@pytest.fixture
+def live_pids():
+    processes = [subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']) for _ in range(2)]
+    yield [process.pid for process in processes]
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+@pytest.fixture
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'directory', str(tmp_path))
+    return tmp_path
+
+
+def test_render_text_round_trips_through_parse():
+    totals = process_totals(3, 2, [0.003, 0.2, 30])
+    totals['counters'][('fyyur_db_pool_checkouts_total', (('engine', 'say "hi"\\\n'),))] = 7
+    samples = parse(render_text(totals))
+
+    assert samples[REQUESTS] == 3
+    assert samples[IN_FLIGHT] == 2
+    assert samples[('fyyur_db_pool_checkouts_total', (('engine', 'say "hi"\\\n'),))] == 7
+    buckets = {dict(labels)['le']: value for (name, labels), value in samples.items()
+               if name == 'fyyur_http_request_duration_seconds_bucket'}
+    # cumulative, ending in +Inf
+    assert (buckets['0.005'], buckets['0.1'], buckets['0.25'], buckets['10'], buckets['+Inf']) == (1, 1, 2, 2, 3)
+    assert samples[('fyyur_http_request_duration_seconds_count', LATENCY[1])] == 3
+    assert samples[('fyyur_http_request_duration_seconds_sum', LATENCY[1])] == pytest.approx(30.203)
+
+
+def test_metrics_endpoint_counts_requests(client, db):
+    client.get('/venues')
+    samples = parse(client.get('/metrics').get_data(as_text=True))
+    assert samples[REQUESTS] >= 1
+    assert samples[('fyyur_http_request_duration_seconds_count', LATENCY[1])] >= 1
+
+
+def test_processes_sharing_metrics_dir_are_added_up(metrics_dir, live_pids):
+    own = metrics.collect_all()
+    write(metrics_dir, live_pids[0], process_totals(5, 1, [0.003, 0.2]))
+    write(metrics_dir, live_pids[1], process_totals(2, 3, [0.2]))
+
+    totals = metrics.collect_all()
+    assert totals['counters'][REQUESTS] - own['counters'].get(REQUESTS, 0) == 5 + 2
+    assert totals['gauges'][IN_FLIGHT] - own['gauges'].get(IN_FLIGHT, 0) == 1 + 3
+    # one in the 0.005 bucket, two in the 0.25 bucket, sum last
+    own_latency = own['histograms'].get(LATENCY, [0] * 13)
+    merged = [a - b for a, b in zip(totals['histograms'][LATENCY], own_latency)]
+    assert merged[0] == 1 and merged[5] == 2 and merged[-1] == pytest.approx(0.403)
+
+
+def test_exited_processes_are_folded_into_retired_json(metrics_dir, exited_pid):
+    own = metrics.collect_all()['counters'].get(REQUESTS, 0)
+    write(metrics_dir, exited_pid, process_totals(5, 1, [0.2]))
+    first = metrics.collect_all()
+    assert not (metrics_dir / f'{exited_pid}.json').exists()
+    assert (metrics_dir / 'retired.json').exists()
+    assert first['counters'][REQUESTS] - own == 5
+    assert first['histograms'][LATENCY][5] >= 1
+    assert first['gauges'].get(IN_FLIGHT, 0) == metrics.collect()['gauges'].get(IN_FLIGHT, 0)
+
+    # the pid comes round again: the new process counts from zero, the total does not go back
+    write(metrics_dir, exited_pid, process_totals(1, 0, []))
+    assert metrics.collect_all()['counters'][REQUESTS] - own == 6
+    assert metrics.collect_all()['counters'][REQUESTS] - own == 6
+
+
+def test_a_fold_interrupted_after_writing_retired_json_is_not_counted_twice(metrics_dir, exited_pid):
+    own = metrics.collect_all()['counters'].get(REQUESTS, 0)
+    write(metrics_dir, exited_pid, process_totals(5, 0, []))
+    metrics.collect_all()
+    # as if the files had not been deleted yet
+    name = json.loads((metrics_dir / 'retired.json').read_text())['folded'][0]
+    write(metrics_dir, 'x', process_totals(5, 0, []))
+    os.replace(metrics_dir / 'x.json', metrics_dir / name)
+
+    assert metrics.collect_all()['counters'][REQUESTS] - own == 5
+    assert not (metrics_dir / name).exists()
@@ -0,0 +1,145 @@
+import json
+import os
+import runpy
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from importer import run_import
+from models import db, Venue, Artist
+from page_cache import MemoryBackend, PageCache, page_cache
+from replicas import replica_router
+
+from .conftest import add_show
+
+
+def cached(key):
+    return key in page_cache.backend._entries
+
+
+def test_lru_is_bounded_by_entries_and_bytes():
+    backend = MemoryBackend(max_entries=2, max_bytes=10)
+    backend.set('a', 'aaaa', 60)
+    backend.set('b', 'bbbb', 60)
+    backend.get('a')
+    backend.set('c', 'cccc', 60)
+    assert backend.get('b') is None and backend.get('a') == 'aaaa'
+    backend.set('d', 'dddddddd', 60)
+    assert list(backend._entries) == ['d'] and backend._bytes == 8
+    backend.set('huge', 'x' * 11, 60)
+    assert backend.get('huge') is None
+
+
+def test_entries_expire():
+    backend = MemoryBackend()
+    backend.set('a', 'page', 0.05)
+    assert backend.get('a') == 'page'
+    time.sleep(0.06)
+    assert backend.get('a') is None
+
+
+def test_ttl_ends_when_the_next_show_starts(app, db):
+    now = datetime.utcnow()
+    page_cache.set('venue', 1, 'page', now, now + timedelta(seconds=30))
+    page_cache.set('venue', 2, 'page', now, now + timedelta(days=1))
+    page_cache.set('venue', 3, 'page', now, now - timedelta(seconds=1))
+    expiry = {key: expires_at for key, (_, expires_at) in page_cache.backend._entries.items()}
+    assert 25 < expiry['venue:1'] - time.time() <= 30
+    assert page_cache.ttl - 5 < expiry['venue:2'] - time.time() <= page_cache.ttl
+    assert 'venue:3' not in expiry
+
+
+def test_detail_pages_are_served_from_the_cache(client, catalog):
+    first = client.get(f"/venues/{catalog['hop']}")
+    assert cached(f"venue:{catalog['hop']}")
+    page_cache.backend._entries[f"venue:{catalog['hop']}"] = ('from the cache', time.time() + 60)
+    second = client.get(f"/venues/{catalog['hop']}")
+    assert b'The Musical Hop' in first.data and second.data == b'from the cache'
+
+
+def test_writes_invalidate_the_pages_showing_them(app, client, catalog):
+    for kind, id in [('venues', catalog['hop']), ('venues', catalog['dueling']),
+                     ('artists', catalog['guns']), ('artists', catalog['sax'])]:
+        client.get(f'/{kind}/{id}')
+    assert len(page_cache.backend._entries) == 4
+
+    with app.app_context():
+        # the venue page lists the artist's name, so renaming the artist invalidates it too
+        db.session.get(Artist, catalog['guns']).name = 'Guns N Roses'
+        db.session.commit()
+    assert not cached(f"artist:{catalog['guns']}") and not cached(f"venue:{catalog['hop']}")
+    assert cached(f"venue:{catalog['dueling']}") and cached(f"artist:{catalog['sax']}")
+    assert b'Guns N Roses' in client.get(f"/venues/{catalog['hop']}").data
+
+    with app.app_context():
+        add_show(catalog['guns'], catalog['dueling'], datetime.utcnow() + timedelta(days=3))
+    assert not cached(f"venue:{catalog['dueling']}") and not cached(f"artist:{catalog['guns']}")
+    assert cached(f"artist:{catalog['sax']}")
+
+
+def test_rolled_back_writes_keep_the_cache(app, client, catalog):
+    client.get(f"/venues/{catalog['hop']}")
+    with app.app_context():
+        db.session.get(Venue, catalog['hop']).name = 'Renamed'
+        db.session.flush()
+        db.session.rollback()
+    assert cached(f"venue:{catalog['hop']}")
+
+
+def test_flashed_pages_are_not_cached(client, catalog):
+    with client.session_transaction() as session:
+        session['_flashes'] = [('message', 'hello')]
+    response = client.get(f"/venues/{catalog['hop']}")
+    assert b'hello' in response.data
+    assert not cached(f"venue:{catalog['hop']}")
+
+
+def test_imported_shows_invalidate_their_pages(app, client, catalog, tmp_path):
+    client.get(f"/venues/{catalog['dueling']}")
+    client.get(f"/artists/{catalog['sax']}")
+    path = tmp_path / 'shows.jsonl'
+    path.write_text(json.dumps({'artist_id': catalog['guns'], 'venue_id': catalog['dueling'],
+                                'start_time': '2031-01-02 20:00:00'}) + '\n')
+    with app.app_context():
+        assert run_import('shows', str(path))[0] == 1
+    assert not cached(f"venue:{catalog['dueling']}") and cached(f"artist:{catalog['sax']}")
+
+
+def test_replica_reads_right_after_an_invalidation_are_not_stored(monkeypatch):
+    cache = PageCache()
+    cache.backend, cache.replica_lag = MemoryBackend(), 0.05
+    now = datetime.utcnow()
+    monkeypatch.setattr(replica_router, 'reading_from_replica', lambda: True)
+    cache.invalidate(['venue:1'])
+    # the replica may not have the write yet
+    cache.set('venue', 1, 'maybe stale', now)
+    cache.set('venue', 2, 'page', now)
+    assert cache.get('venue', 1) is None and cache.get('venue', 2) == 'page'
+
+    monkeypatch.setattr(replica_router, 'reading_from_replica', lambda: False)
+    cache.set('venue', 1, 'from the primary', now)
+    assert cache.get('venue', 1) == 'from the primary'
+
+    monkeypatch.setattr(replica_router, 'reading_from_replica', lambda: True)
+    cache.invalidate(['venue:1'])
+    time.sleep(0.06)
+    cache.set('venue', 1, 'caught up', now)
+    assert cache.get('venue', 1) == 'caught up'
+
+
+@pytest.mark.parametrize('backend, expected', [(None, 'none'), ('redis', 'redis'), ('memory', SystemExit)])
+def test_gunicorn_keeps_the_memory_cache_to_one_worker(monkeypatch, tmp_path, backend, expected):
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    monkeypatch.setenv('METRICS_DIR', str(tmp_path))
+    if backend is None:
+        monkeypatch.delenv('PAGE_CACHE_BACKEND')
+    else:
+        monkeypatch.setenv('PAGE_CACHE_BACKEND', backend)
+    conf = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+    if expected is SystemExit:
+        with pytest.raises(SystemExit, match='memory is per process'):
+            runpy.run_path(conf)
+    else:
+        runpy.run_path(conf)
+        assert os.environ['PAGE_CACHE_BACKEND'] == expected
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from aggregates import artist_listing, show_listing
+from models import Artist, Show
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+
+from .conftest import add_artist
+
+
+def test_cursor_round_trip_keeps_datetimes():
+    start = datetime(2030, 5, 1, 20, 30)
+    cursor = encode_cursor([start, 7], 'next')
+    assert '=' not in cursor
+    assert decode_cursor(cursor, [Show.start_time, Show.id]) == ([start, 7], 'next')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64 !',
+    encode_cursor(['a', 1], 'sideways'),
+    encode_cursor(['a'], 'next'),
+    'eyJrIjpbXX0',  # {"k":[]} without a direction
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, [Artist.name, Artist.id])
+
+
+def test_pages_walk_forward_and_back(app, db):
+    with app.app_context():
+        for i in range(7):
+            add_artist(f'Artist {i}')
+        first, page1 = artist_listing(None, per_page=3)
+        second, page2 = artist_listing(page1.next_cursor, per_page=3)
+        third, page3 = artist_listing(page2.next_cursor, per_page=3)
+        back, _ = artist_listing(page3.prev_cursor, per_page=3)
+
+    assert [a['name'] for a in first] == ['Artist 0', 'Artist 1', 'Artist 2']
+    assert [a['name'] for a in second] == ['Artist 3', 'Artist 4', 'Artist 5']
+    assert [a['name'] for a in third] == ['Artist 6']
+    assert page1.prev_cursor is None and page3.next_cursor is None
+    assert back == second
+
+
+def test_streamed_page_matches_the_buffered_one(app, catalog):
+    with app.app_context():
+        buffered, page = show_listing(None, per_page=3)
+        streamed, streamed_page = show_listing(None, per_page=3, stream=True)
+        streamed = list(streamed)
+    assert streamed == buffered
+    assert streamed_page.next_cursor == page.next_cursor
+
+
+def test_listing_ignores_a_bad_cursor(client, catalog):
+    response = client.get('/artists?cursor=garbage')
+    assert response.status_code == 200
+    assert b'Guns N Petals' in response.data
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import db
+from page_cache import page_cache
+
+from .conftest import add_artist, add_show, add_venue
+
+MORE = 15  # past QUERY_REPEAT_THRESHOLD, so a per-row query fails the request
+
+
+def grow(catalog):
+    """Adds MORE venues, artists and shows around The Musical Hop and Guns N Petals."""
+    now = datetime.utcnow()
+    cities = [('Austin', 'TX'), ('Seattle', 'WA'), ('Chicago', 'IL')]
+    for i in range(MORE):
+        city, state = cities[i % len(cities)]
+        venue = add_venue(f'Extra Hop {i}', city=city, state=state, genres=('Jazz', 'Blues'))
+        artist = add_artist(f'Extra Band {i}', genres=('Funk', 'Jazz'))
+        add_show(catalog['guns'], venue, now + timedelta(days=i + 1))
+        add_show(catalog['guns'], venue, now - timedelta(days=i + 1))
+        add_show(artist, catalog['hop'], now + timedelta(days=i + 1))
+        add_show(artist, catalog['hop'], now - timedelta(days=i + 1))
+
+
+def count_queries(client, method, url, **kwargs):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # a page served from the cache would hide its queries
+    page_cache.init_app(client.application)
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.open(url, method=method, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, url
+    return len(statements)
+
+
+# statements per request once the genre and autocomplete caches are warm
+ROUTES = [
+    ('GET', '/venues', {}, 2),
+    ('GET', '/artists', {}, 2),
+    ('GET', '/shows', {}, 2),
+    ('POST', '/venues/search', {'data': {'search_term': 'hop'}}, 3),
+    ('POST', '/artists/search', {'data': {'search_term': 'band'}}, 3),
+    ('GET', '/venues/{hop}', {}, 4),
+    ('GET', '/artists/{guns}', {}, 4),
+    ('GET', '/venues/{hop}/shows/upcoming', {}, 1),
+    ('GET', '/artists/{guns}/shows/past', {}, 1),
+    ('GET', '/artists/{guns}/edit', {}, 2),
+    ('GET', '/api/autocomplete?type=venue&q=ext', {}, 0),
+    ('GET', '/api/v1/venues', {}, 2),
+    ('GET', '/api/v1/artists/{guns}', {}, 2),
+    ('GET', '/api/v1/shows?fields=venue_name,artist_name,start_time', {}, 1),
+]
+
+
+@pytest.mark.parametrize('method, url, kwargs, expected', ROUTES)
+def test_query_count_does_not_grow_with_the_catalog(app, client, catalog, method, url, kwargs, expected):
+    url = url.format(**catalog)
+    count_queries(client, method, url, **kwargs)  # loads the genre and autocomplete caches
+    before = count_queries(client, method, url, **kwargs)
+    with app.app_context():
+        grow(catalog)
+    after = count_queries(client, method, url, **kwargs)
+    assert (before, after) == (expected, expected)
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from sqlalchemy import event
+
+import config
+from replicas import replica_router
+
+from .conftest import SCRATCH, make_app
+
+UNREACHABLE = 'sqlite:///' + os.path.join(SCRATCH, 'no-such-dir', 'replica.db')
+
+
+@pytest.fixture
+def replica_app(catalog):
+    # the primary's own file stands in for a healthy replica; DEBUG leaves the log pipeline alone
+    app = make_app(DATABASE_REPLICA_URLS=[UNREACHABLE, config.SQLALCHEMY_DATABASE_URI], DEBUG=True)
+    yield app
+    for engine in replica_router.engines.values():
+        engine.dispose()
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_an_unreachable_replica_falls_back_to_the_primary(replica_app, catalog):
+    client = replica_app.test_client()
+    replica_reads = count_statements(replica_router.engines['replica_1'])
+    for url in ['/venues', f"/venues/{catalog['hop']}", f"/artists/{catalog['sax']}", '/shows', '/artists'] * 2:
+        assert client.get(url).status_code == 200, url
+    assert not replica_router._healthy('replica_0')
+    assert replica_reads
+
+
+def test_a_writer_reads_from_the_primary(replica_app, catalog):
+    client = replica_app.test_client()
+    replica_reads = count_statements(replica_router.engines['replica_1'])
+    client.get('/artists')
+    client.get('/artists')
+    assert replica_reads
+
+    client.post(f"/artists/{catalog['guns']}/edit",
+                data={'name': 'Guns N Roses', 'city': 'Austin', 'state': 'TX', 'genres': ['Jazz']})
+    del replica_reads[:]
+    assert b'Guns N Roses' in client.get('/artists').data
+    assert replica_reads == []
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from models import Venue, Artist
+from search import search_entities
+
+from .conftest import add_venue
+
+
+def names(response):
+    return [item['name'] for item in response['data']]
+
+
+def test_exact_then_prefix_then_substring_then_other_columns(app, db):
+    with app.app_context():
+        add_venue('Jazz Corner')
+        add_venue('Blue Note', city='Jazzville')
+        add_venue('Late Night Jazz')
+        add_venue('Jazz')
+        add_venue('Cafe Opera', genres=('Classical',))
+        response = search_entities(Venue, 'JAZZ', datetime.utcnow())
+    # every venue is in the Jazz genre except the cafe
+    assert response['count'] == 4
+    assert names(response) == ['Jazz', 'Jazz Corner', 'Late Night Jazz', 'Blue Note']
+
+
+def test_every_word_must_match(app, catalog):
+    with app.app_context():
+        assert names(search_entities(Venue, 'hop  folsom', datetime.utcnow())) == []
+        assert names(search_entities(Venue, 'musical francisco', datetime.utcnow())) == ['The Musical Hop']
+        assert names(search_entities(Artist, 'band', datetime.utcnow())) == ['The Wild Sax Band']
+
+
+def test_like_wildcards_are_literal(app, catalog):
+    with app.app_context():
+        assert search_entities(Venue, '%', datetime.utcnow())['count'] == 0
+        assert search_entities(Venue, '_', datetime.utcnow())['count'] == 0
+
+
+def test_pages_and_upcoming_show_counts(app, catalog):
+    with app.app_context():
+        add_venue('The Hop Annex')
+        first = search_entities(Venue, 'hop', datetime.utcnow(), page=1, per_page=1)
+        second = search_entities(Venue, 'hop', datetime.utcnow(), page=2, per_page=1)
+    assert (first['count'], first['pages']) == (2, 2)
+    assert names(first) + names(second) == ['The Hop Annex', 'The Musical Hop']
+    assert second['data'][0]['num_upcoming_shows'] == 1
+    assert first['data'][0]['num_upcoming_shows'] == 0
+
+
+def test_search_page(client, catalog):
+    response = client.post('/artists/search', data={'search_term': 'a'})
+    assert response.status_code == 200
+    assert b'Guns N Petals' in response.data and b'The Wild Sax Band' in response.data
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, update
+
+import typeahead
+from models import db, Venue, Artist
+from typeahead import PrefixIndex, normalize
+
+from .conftest import add_artist, add_venue
+
+
+def suggest(client, kind, q):
+    response = client.get('/api/autocomplete', query_string={'type': kind, 'q': q})
+    assert response.status_code == 200
+    return [item['name'] for item in response.get_json()['data']]
+
+
+def test_normalize():
+    assert normalize('  Café   del  MAR ') == 'cafe del mar'
+    assert normalize('x' * 50, max_length=40) == 'x' * 40
+
+
+def test_any_word_of_the_name_is_a_prefix():
+    index = PrefixIndex(Venue)
+    index.upsert(1, 'The Musical Hop')
+    index.upsert(2, 'Park Square Live Music & Coffee')
+    # in key order: "music & coffee" sorts before "musical hop"
+    assert [r['id'] for r in index.lookup('music')] == [2, 1]
+    assert [r['id'] for r in index.lookup('hop')] == [1]
+    assert index.lookup('') == [] and index.lookup('usical') == []
+    index.upsert(1, 'The Hop')
+    assert [r['name'] for r in index.lookup('hop')] == ['The Hop']
+    assert index.lookup('musical') == []
+    index.remove(2)
+    assert index.lookup('coffee') == []
+
+
+def test_commits_update_the_index(app, client, catalog):
+    assert suggest(client, 'venue', 'the') == ['The Dueling Pianos Bar', 'The Musical Hop']
+
+    with app.app_context():
+        new_id = add_venue('The Jazz Cellar')
+        venue = db.session.get(Venue, catalog['hop'])
+        venue.name = 'Hop Street'
+        db.session.commit()
+    assert suggest(client, 'venue', 'the') == ['The Dueling Pianos Bar', 'The Jazz Cellar']
+    assert suggest(client, 'venue', 'hop') == ['Hop Street']
+
+    with app.app_context():
+        db.session.delete(db.session.get(Venue, new_id))
+        db.session.commit()
+    assert suggest(client, 'venue', 'jazz') == []
+
+
+def test_rolled_back_changes_are_not_indexed(app, client, catalog):
+    assert suggest(client, 'artist', 'guns') == ['Guns N Petals']
+    with app.app_context():
+        db.session.add(Artist(name='Gunslinger'))
+        db.session.flush()
+        db.session.rollback()
+    assert suggest(client, 'artist', 'guns') == ['Guns N Petals']
+
+
+def test_limit_and_bad_type(client, db, app):
+    with app.app_context():
+        for i in range(5):
+            add_artist(f'Echo {i}')
+    response = client.get('/api/autocomplete?type=artist&q=echo&limit=2')
+    assert len(response.get_json()['data']) == 2
+    assert client.get('/api/autocomplete?type=show&q=x').status_code == 400
+
+
+def test_writes_made_elsewhere_are_picked_up_by_the_refresh(app, client, catalog, monkeypatch):
+    index = typeahead.indexes['venue']
+    assert suggest(client, 'venue', 'the') == ['The Dueling Pianos Bar', 'The Musical Hop']
+    # as another worker or `flask import` would: no mapper events in this process
+    later = datetime.utcnow() + timedelta(seconds=1)
+    with app.app_context():
+        db.session.execute(insert(Venue), [{'name': 'The Jazz Cellar', 'city': 'Austin', 'state': 'TX'}])
+        db.session.execute(update(Venue).where(Venue.id == catalog['hop']).values(name='Hop Street', updated_at=later))
+        db.session.commit()
+    assert suggest(client, 'venue', 'the') == ['The Dueling Pianos Bar', 'The Musical Hop']
+
+    monkeypatch.setattr(index, '_checked_at', 0.0)
+    assert suggest(client, 'venue', 'the') == ['The Dueling Pianos Bar', 'The Jazz Cellar']
+    assert suggest(client, 'venue', 'hop') == ['Hop Street']
+
+    with app.app_context():
+        db.session.execute(delete(Venue).where(Venue.id == catalog['dueling']))
+        db.session.commit()
+    monkeypatch.setattr(index, '_checked_at', 0.0)
+    assert suggest(client, 'venue', 'the') == ['The Jazz Cellar']
+
+
+def test_an_unchanged_table_is_not_reloaded(app, catalog):
+    index = PrefixIndex(Venue)
+    with app.app_context():
+        index.load()
+        index.upsert(-1, 'Stale Entry')  # would be dropped by a reload
+        index.refresh()
+    assert index.lookup('stale') == [{'id': -1, 'name': 'Stale Entry'}]
@@ -0,0 +1,208 @@
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# In-process prefix index for the search box typeahead.
+#----------------------------------------------------------------------------#
+
+def normalize(text, max_length=40):
+    """Casefolds, strips accents and collapses whitespace."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.casefold().split())[:max_length]
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, id) pairs searched with bisect. Every word suffix of
+    a name is a key, so "hop" finds "The Musical Hop". Lookups never touch
+    the database; the array is loaded once and then patched from model events
+    and, every refresh_seconds, from a check for writes made elsewhere.
+    """
+
+    def __init__(self, model, max_name_length=40):
+        self.model = model
+        self.max_name_length = max_name_length
+        self.refresh_seconds = 30
+        self.loaded = False
+        self._keys = []
+        self._names = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _keys_for(self, id, name):
+        words = normalize(name, self.max_name_length).split()
+        return [(' '.join(words[i:]), id) for i in range(len(words))]
+
+    def _table_version(self):
+        return tuple(db.session.query(func.count(self.model.id), func.max(self.model.updated_at)).one())
+
+    def load(self):
+        # read first: rows written meanwhile are loaded and then patched again, never missed
+        version = self._table_version()
+        rows = db.session.query(self.model.id, self.model.name).all()
+        keys, names = [], {}
+        for id, name in rows:
+            names[id] = name
+            keys.extend(self._keys_for(id, name))
+        keys.sort()
+        with self._lock:
+            self._keys, self._names = keys, names
+            self._version, self._checked_at = version, time.monotonic()
+            self.loaded = True
+
+    def refresh_due(self):
+        return bool(self.refresh_seconds) and time.monotonic() - self._checked_at >= self.refresh_seconds
+
+    def refresh(self):
+        """
+        Catches up with writes no model event here saw. One count and
+        max(updated_at) query when nothing changed; otherwise the rows
+        updated since the last check are upserted, and a full reload follows
+        if the count still disagrees (rows deleted elsewhere).
+        """
+        self._checked_at = time.monotonic()
+        version = self._table_version()
+        if version == self._version:
+            return
+        count, latest = version
+        since = self._version[1] if self._version else None
+        if since is not None:
+            changed = db.session.query(self.model.id, self.model.name).filter(self.model.updated_at >= since).all()
+            for id, name in changed:
+                self.upsert(id, name)
+            with self._lock:
+                if len(self._names) == count:
+                    self._version = version
+                    return
+        self.load()
+
+    def upsert(self, id, name):
+        with self._lock:
+            self._discard(id)
+            self._names[id] = name
+            for key in self._keys_for(id, name):
+                insort(self._keys, key)
+
+    def remove(self, id):
+        with self._lock:
+            self._discard(id)
+
+    def _discard(self, id):
+        if id not in self._names:
+            return
+        name = self._names.pop(id)
+        for key in self._keys_for(id, name):
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def lookup(self, prefix, limit=10):
+        """Returns up to limit {"id", "name"} dicts whose name has a word starting with prefix."""
+        prefix = normalize(prefix, self.max_name_length)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(results) < limit:
+                key, id = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                if id not in seen:
+                    seen.add(id)
+                    results.append({"id": id, "name": self._names[id]})
+                i += 1
+        return results
+
+    def stats(self):
+        """Entry counts and an estimate of the bytes held by the index."""
+        with self._lock:
+            keys, names = list(self._keys), dict(self._names)
+        size = sys.getsizeof(keys) + sys.getsizeof(names)
+        size += sum(sys.getsizeof(pair) + sys.getsizeof(pair[0]) for pair in keys)
+        size += sum(sys.getsizeof(name) for name in names.values())
+        return {"entities": len(names), "keys": len(keys), "bytes": size}
+
+
+indexes = {
+    'venue': PrefixIndex(Venue),
+    'artist': PrefixIndex(Artist),
+}
+_index_by_model = {index.model: index for index in indexes.values()}
+
+
+def lookup(kind, prefix, limit=10):
+    index = indexes[kind]
+    if not index.loaded:
+        index.load()
+    elif index.refresh_due():
+        index.refresh()
+    return index.lookup(prefix, limit)
+
+
+#----------------------------------------------------------------------------#
+# Keeping the indexes current.
+#----------------------------------------------------------------------------#
+# Mapper events fire inside the flush, before we know whether the transaction
+# commits, so changes are queued on the session and applied on commit. They
+# only cover this process's ORM writes: commits in other workers and the
+# importer's bulk inserts are picked up by PrefixIndex.refresh() instead.
+
+def _queue(action, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('typeahead_pending', []).append(
+            (action, type(target), target.id, target.name))
+
+
+def _after_save(mapper, connection, target):
+    _queue('upsert', target)
+
+
+def _after_delete(mapper, connection, target):
+    _queue('remove', target)
+
+
+def _after_commit(session):
+    for action, model, id, name in session.info.pop('typeahead_pending', []):
+        index = _index_by_model[model]
+        if not index.loaded:
+            continue
+        if action == 'upsert':
+            index.upsert(id, name)
+        else:
+            index.remove(id)
+
+
+def _after_rollback(session):
+    session.info.pop('typeahead_pending', None)
+
+
+def init_app(app):
+    max_length = app.config.get('AUTOCOMPLETE_MAX_NAME_LENGTH', 40)
+    for index in indexes.values():
+        index.max_name_length = max_length
+        index.refresh_seconds = app.config.get('AUTOCOMPLETE_REFRESH_SECONDS', 30)
+        if not event.contains(index.model, 'after_insert', _after_save):
+            event.listen(index.model, 'after_insert', _after_save)
+            event.listen(index.model, 'after_update', _after_save)
+            event.listen(index.model, 'after_delete', _after_delete)
+    if not event.contains(Session, 'after_commit', _after_commit):
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+
+
+def warm():
+    """Loads every index up front; call from an app context at worker start."""
+    for index in indexes.values():
+        index.load()